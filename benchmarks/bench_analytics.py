@@ -0,0 +1,164 @@
+"""
+analyticsモジュールのベンチマーク
+
+合成した約定・板について、analyticsの関数と同じ指標をpandasで求めた場合(rolling、および約定ごとにapplyする素朴な実装)の時間を比較する。
+素朴な実装は遅いため、先頭の--naive-rows件のみで計測して約定数に比例させた推定値を出力する。
+
+    python benchmarks/bench_analytics.py --executions 200000 --window 1min
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from python_liquid_api.analytics import ExecutionAnalytics, book_features, execution_features  # noqa: E402
+from python_liquid_api.candles import parse_resolution  # noqa: E402
+from python_liquid_api.order_book import OrderBook  # noqa: E402
+from python_liquid_api.parser import SIDE_CATEGORIES, parse_price_levels  # noqa: E402
+
+# 定数
+BASE_TIMESTAMP = 1640995200.0
+DAY_SECONDS = 24 * 60 * 60
+
+
+def make_executions(execution_num):
+    random_state = np.random.default_rng(0)
+    timestamps = BASE_TIMESTAMP + np.sort(random_state.uniform(0, DAY_SECONDS, execution_num))
+    return pd.DataFrame({
+        "quantity": random_state.uniform(0.001, 1.0, execution_num),
+        "price": 5000000 + np.cumsum(random_state.normal(0, 100, execution_num)),
+        "taker_side": pd.Categorical.from_codes(random_state.integers(0, 2, execution_num),
+                                                categories=SIDE_CATEGORIES),
+        "timestamp": pd.to_datetime(timestamps, unit="s"),
+    })
+
+
+def make_books(book_num, level_num):
+    random_state = np.random.default_rng(0)
+    books = []
+    for i in range(book_num):
+        order_book = OrderBook("btc")
+        order_book.update({
+            "buy_price_levels": np.column_stack([5000000 - np.arange(level_num), random_state.random(level_num)]),
+            "sell_price_levels": np.column_stack([5000001 + np.arange(level_num), random_state.random(level_num)]),
+            "timestamp": BASE_TIMESTAMP + i,
+        })
+        books.append(order_book)
+    return books
+
+
+def pandas_rolling(executions_df, window):
+    """
+    pandasのrollingで同じ指標を求める
+    """
+    df = executions_df.set_index("timestamp")
+    window = str(parse_resolution(window)) + "s"
+    signs = np.where(df["taker_side"] == "sell", -1.0, 1.0)
+    volume = df["quantity"].rolling(window).sum()
+    squared_returns = np.log(df["price"]).diff().fillna(0.0) ** 2
+    return pd.DataFrame({
+        "vwap": (df["price"] * df["quantity"]).rolling(window).sum() / volume,
+        "order_flow_imbalance": (df["quantity"] * signs).rolling(window).sum() / volume,
+        "trade_intensity": df["price"].rolling(window).count() / parse_resolution(window),
+        "realized_volatility": np.sqrt(squared_returns.rolling(window).sum().clip(lower=0.0)),
+    })
+
+
+def pandas_naive(executions_df, window):
+    """
+    約定ごとに時間窓の約定を取り出して指標を求める素朴な実装
+    """
+    df = executions_df.set_index("timestamp")
+    width = pd.Timedelta(seconds=parse_resolution(window))
+
+    def features(timestamp):
+        window_df = df.loc[timestamp - width + pd.Timedelta(1, "ns"):timestamp]
+        volume = window_df["quantity"].sum()
+        signed = window_df.apply(lambda row: row["quantity"] if row["taker_side"] == "buy" else -row["quantity"],
+                                 axis=1).sum()
+        returns = np.log(window_df["price"]).diff().dropna()
+        return pd.Series({
+            "vwap": (window_df["price"] * window_df["quantity"]).sum() / volume,
+            "order_flow_imbalance": signed / volume,
+            "trade_intensity": len(window_df) / width.total_seconds(),
+            "realized_volatility": np.sqrt((returns ** 2).sum()),
+        })
+
+    return pd.Series(df.index.unique()).apply(features)
+
+
+def pandas_book_features(books):
+    """
+    板ごとにDataFrameを作成して指標を求める
+    """
+    rows = []
+    for order_book in books:
+        bid_df = parse_price_levels(np.column_stack([order_book.bid_prices, order_book.bid_volumes]),
+                                    "price", "volume")
+        ask_df = parse_price_levels(np.column_stack([order_book.ask_prices, order_book.ask_volumes]),
+                                    "price", "volume")
+        best_bid, best_ask = bid_df.iloc[0], ask_df.iloc[0]
+        rows.append({
+            "imbalance": (best_bid["volume"] - best_ask["volume"]) / (best_bid["volume"] + best_ask["volume"]),
+            "microprice": (best_bid["price"] * best_ask["volume"] + best_ask["price"] * best_bid["volume"])
+            / (best_bid["volume"] + best_ask["volume"]),
+        })
+    return pd.DataFrame(rows)
+
+
+def measure(func, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="analyticsモジュールのベンチマーク")
+    parser.add_argument("--executions", type=int, default=200000, help="約定の件数(1日に分布)")
+    parser.add_argument("--window", default="1min", help="時間窓")
+    parser.add_argument("--batch", type=int, default=100, help="ExecutionAnalyticsに1回で渡す約定数")
+    parser.add_argument("--naive-rows", type=int, default=2000, help="素朴な実装で計測する約定数")
+    parser.add_argument("--books", type=int, default=2000, help="板のスナップショット数")
+    parser.add_argument("--levels", type=int, default=40, help="片側の価格帯数")
+    args = parser.parse_args()
+
+    executions_df = make_executions(args.executions)
+    books = make_books(args.books, args.levels)
+
+    print("%-40s %12s" % ("case", "time[ms]"))
+    numpy_time, features = measure(lambda: execution_features(executions_df, args.window))
+    print("%-40s %12.1f" % ("analytics.execution_features", numpy_time * 1000))
+
+    rolling_time, rolling_df = measure(lambda: pandas_rolling(executions_df, args.window))
+    print("%-40s %12.1f" % ("pandas rolling", rolling_time * 1000))
+    for column in rolling_df.columns:
+        if not np.allclose(features[column].to_numpy(), rolling_df[column].to_numpy(), rtol=1e-8, equal_nan=True):
+            print("  mismatch:", column)
+
+    naive_time, _ = measure(lambda: pandas_naive(executions_df.iloc[:args.naive_rows], args.window), repeat=1)
+    print("%-40s %12.1f" % ("pandas naive apply (estimated)", naive_time * args.executions / args.naive_rows * 1000))
+
+    def incremental():
+        analytics = ExecutionAnalytics(args.window)
+        for start in range(0, len(executions_df), args.batch):
+            analytics.update(executions_df.iloc[start:start + args.batch])
+
+    incremental_time, _ = measure(incremental, repeat=1)
+    print("%-40s %12.1f" % ("analytics.ExecutionAnalytics (batch=%d)" % args.batch, incremental_time * 1000))
+
+    book_time, _ = measure(lambda: book_features(books))
+    print("%-40s %12.1f" % ("analytics.book_features", book_time * 1000))
+    pandas_book_time, _ = measure(lambda: pandas_book_features(books), repeat=1)
+    print("%-40s %12.1f" % ("pandas per-snapshot DataFrame", pandas_book_time * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+LiquidPublic・LiquidPrivateのベンチマーク
+
+スタブサーバ(mock_server.py)に対して各メソッドを繰り返し呼び出し、
+スループット・レイテンシのパーセンタイル・ピークメモリを出力する。
+
+    python benchmarks/bench_api.py --executions 20000 --levels 200 --latency 0.005
+    python benchmarks/bench_api.py --save baseline.json
+    python benchmarks/bench_api.py --compare baseline.json
+    python benchmarks/bench_api.py --filter fan_in --latency 0.02 --coalesce-ttl 0.2
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_server import BASE_TIMESTAMP, MockConfig, MockLiquidServerProcess  # noqa: E402
+from python_liquid_api import (  # noqa: E402
+    LiquidPrivate, LiquidPublic, OrderTracker, configure_rate_limit, enable_coalescing, enable_instrumentation,
+)
+
+# 定数
+FAN_IN = 16  # fan_inで同時に呼び出すスレッド数
+
+
+def percentile(values, q):
+    values = sorted(values)
+    if len(values) == 0:
+        return float("nan")
+    index = min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def measure(func, repeat):
+    """
+    関数を繰り返し実行して計測する
+    :return: 計測結果の辞書(秒・バイト)
+    """
+    latencies = []
+    # cancel_orderなどのメッセージ出力を抑制する
+    with contextlib.redirect_stdout(io.StringIO()):
+        # ウォームアップ(コネクションの確立など)
+        func()
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            t = time.perf_counter()
+            func()
+            latencies.append(time.perf_counter() - t)
+        elapsed = time.perf_counter() - start
+
+        # tracemallocは処理を遅くするため、ピークメモリは別に1回だけ計測する
+        tracemalloc.start()
+        func()
+        _, peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return {
+        "calls_per_second": repeat / elapsed,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "peak_memory": peak_memory,
+    }
+
+
+def make_cases(pub, pri, executor):
+    start = datetime.datetime.fromtimestamp(BASE_TIMESTAMP)
+    date = start.strftime("%Y%m%d")
+    hour = start.strftime("%H")
+    tracker = OrderTracker(pri)
+
+    def fan_in(func):
+        # 複数のスレッドから同じメソッドを同時に呼び出す
+        return lambda: list(executor.map(lambda _: func(), range(FAN_IN)))
+
+    return {
+        "public.get_candlestick_raw": lambda: pub.get_candlestick_raw("btc", "1min"),
+        "public.get_candlestick": lambda: pub.get_candlestick("btc", date, "1min"),
+        "public.get_order_book_raw": lambda: pub.get_order_book_raw("btc"),
+        "public.get_order_book": lambda: pub.get_order_book("btc"),
+        "public.update_order_book": lambda: pub.update_order_book("btc"),
+        "public.get_order_book.fan_in": fan_in(lambda: pub.get_order_book("btc")),
+        "public.get_executions_raw": lambda: pub.get_executions_raw("btc", BASE_TIMESTAMP),
+        "public.get_executions": lambda: pub.get_executions("btc", date, hour),
+        "public.get_candlestick_from_executions": lambda: pub.get_candlestick_from_executions(
+            "btc", BASE_TIMESTAMP, BASE_TIMESTAMP + 3600, "10s"),
+        "private.create_order": lambda: pri.create_order("btc", "buy", 0.01, 5000000),
+        "private.get_order_info": lambda: pri.get_order_info(limit_num=100),
+        "private.cancel_order": lambda: pri.cancel_order("1"),
+        "private.order_tracker.poll": tracker.poll,
+        "private.get_asset_info": lambda: pri.get_asset_info("btc"),
+    }
+
+
+def print_results(results, baseline=None):
+    header = "%-40s %10s %10s %10s %10s %12s" % ("method", "calls/s", "p50[ms]", "p95[ms]", "p99[ms]", "peak[KiB]")
+    if baseline is not None:
+        header += " %10s" % "vs base"
+    print(header)
+
+    for name, result in results.items():
+        line = "%-40s %10.1f %10.2f %10.2f %10.2f %12.1f" % (
+            name, result["calls_per_second"], result["p50"] * 1000, result["p95"] * 1000,
+            result["p99"] * 1000, result["peak_memory"] / 1024,
+        )
+        if baseline is not None and name in baseline:
+            # スループットの比(1より大きければ改善)
+            line += " %9.2fx" % (result["calls_per_second"] / baseline[name]["calls_per_second"])
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LiquidPublic・LiquidPrivateのベンチマーク")
+    parser.add_argument("--repeat", type=int, default=20, help="各メソッドの実行回数")
+    parser.add_argument("--candles", type=int, default=1000, help="ローソク足の本数")
+    parser.add_argument("--levels", type=int, default=40, help="片側の価格帯数")
+    parser.add_argument("--executions", type=int, default=7200, help="約定の総数")
+    parser.add_argument("--latency", type=float, default=0.0, help="スタブサーバの遅延(秒)")
+    parser.add_argument("--record-dir", default=None, help="記録したレスポンスのディレクトリ")
+    parser.add_argument("--filter", default=None, help="名前にこの文字列を含むメソッドのみ実行")
+    parser.add_argument("--save", default=None, help="結果をJSONで保存")
+    parser.add_argument("--compare", default=None, help="保存した結果と比較")
+    parser.add_argument("--prometheus", default=None, help="エンドポイントごとの計測値をPrometheusのテキスト形式で保存")
+    parser.add_argument("--coalesce-ttl", type=float, default=None,
+                        help="Public APIのGETリクエストをまとめ、レスポンスをこの秒数保持する(0は共有のみ)")
+    args = parser.parse_args()
+
+    # ベンチマークではレート制限を無効にする
+    configure_rate_limit("public", None)
+    configure_rate_limit("private", None)
+
+    coalescer = None
+    if args.coalesce_ttl is not None:
+        coalescer = enable_coalescing(default_ttl=args.coalesce_ttl)
+
+    instrumentation = None
+    if args.prometheus is not None:
+        # スパンは保持せずヒストグラムのみ集計する
+        instrumentation = enable_instrumentation()
+        instrumentation.record_spans = False
+
+    config = MockConfig(candle_num=args.candles, level_num=args.levels, execution_num=args.executions,
+                        latency=args.latency, record_dir=args.record_dir)
+
+    results = {}
+    with MockLiquidServerProcess(config) as server:
+        with LiquidPublic(endpoint=server.endpoint) as pub, \
+                LiquidPrivate("0", "0" * 32, endpoint=server.endpoint) as pri, \
+                ThreadPoolExecutor(max_workers=FAN_IN) as executor:
+            for name, func in make_cases(pub, pri, executor).items():
+                if args.filter is not None and args.filter not in name:
+                    continue
+                results[name] = measure(func, args.repeat)
+
+    baseline = None
+    if args.compare is not None:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+
+    print_results(results, baseline)
+    if coalescer is not None:
+        print("coalescer:", coalescer.metrics())
+
+    if args.save is not None:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if instrumentation is not None:
+        with open(args.prometheus, "w") as f:
+            f.write(instrumentation.to_prometheus())
+
+
+if __name__ == "__main__":
+    main()
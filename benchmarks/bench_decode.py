@@ -0,0 +1,84 @@
+"""
+JSONデコーダのベンチマーク
+
+約定(1000件)・板情報・注文一覧と同じ形式のJSONを、使用できるデコーダごとにデコードして時間を比較する。
+
+    python benchmarks/bench_decode.py --repeat 200
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from python_liquid_api.decoder import (  # noqa: E402
+    JSON_BACKENDS, NUMERIC_FIELDS, decode_json, get_json_backend, parse_numeric, set_json_backend,
+)
+
+
+def make_payloads(execution_num, level_num, order_num):
+    random_state = random.Random(0)
+    executions = [
+        {
+            "id": i,
+            "quantity": "%.8f" % random_state.uniform(0.001, 1.0),
+            "price": "%.1f" % (5000000 + random_state.uniform(-10000, 10000)),
+            "taker_side": random_state.choice(["buy", "sell"]),
+            "created_at": 1640995200 + i,
+            "timestamp": "%.5f" % (1640995200 + i * 0.5),
+        }
+        for i in range(execution_num)
+    ]
+    price_levels = {
+        "buy_price_levels": [["%.1f" % (5000000 - i), "%.8f" % random_state.random()] for i in range(level_num)],
+        "sell_price_levels": [["%.1f" % (5000001 + i), "%.8f" % random_state.random()] for i in range(level_num)],
+        "timestamp": "1640995200.123",
+    }
+    orders = {"models": [
+        {
+            "id": i, "order_type": "limit", "quantity": "0.01000000", "price": "5000000.0", "filled_quantity": "0.0",
+            "side": "buy", "status": "live", "created_at": 1640995200, "updated_at": 1640995200,
+            "currency_pair_code": "BTCJPY",
+        }
+        for i in range(order_num)
+    ]}
+
+    return {
+        "executions": json.dumps(executions).encode(),
+        "price_levels": json.dumps(price_levels).encode(),
+        "orders": json.dumps(orders).encode(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSONデコーダのベンチマーク")
+    parser.add_argument("--repeat", type=int, default=200, help="各デコードの実行回数")
+    parser.add_argument("--executions", type=int, default=1000, help="約定の件数")
+    parser.add_argument("--levels", type=int, default=1000, help="片側の価格帯数")
+    parser.add_argument("--orders", type=int, default=100, help="注文の件数")
+    args = parser.parse_args()
+
+    payloads = make_payloads(args.executions, args.levels, args.orders)
+    default_backend = get_json_backend()
+
+    print("%-10s %-14s %12s %12s" % ("backend", "payload", "decode[us]", "+numeric[us]"))
+    for backend in JSON_BACKENDS:
+        try:
+            set_json_backend(backend)
+        except ValueError:
+            continue
+        for name, payload in payloads.items():
+            decode_time = timeit.timeit(lambda: decode_json(payload), number=args.repeat) / args.repeat
+            numeric_time = timeit.timeit(
+                lambda: parse_numeric(decode_json(payload), NUMERIC_FIELDS), number=args.repeat
+            ) / args.repeat
+            print("%-10s %-14s %12.1f %12.1f" % (backend, name, decode_time * 1e6, numeric_time * 1e6))
+
+    set_json_backend(default_backend)
+
+
+if __name__ == "__main__":
+    main()
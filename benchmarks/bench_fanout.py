@@ -0,0 +1,100 @@
+"""
+共有メモリによる板情報の配信のベンチマーク
+
+N個のプロセスがそれぞれget_order_bookでポーリングする場合(direct)と、
+1つのMarketDataPublisherが共有メモリに書き込み、N個のプロセスがMarketDataReaderで読み込む場合(shared)について、
+スタブサーバが受けたリクエスト数と1回の取得にかかった時間を比較する。
+sharedのリクエスト数はMarketDataPublisherのポーリング間隔と計測時間(プロセスの起動を含む)のみで決まり、プロセス数によらない。
+
+    python benchmarks/bench_fanout.py --processes 8 --duration 3 --latency 0.02
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_server import MockConfig, MockLiquidServer  # noqa: E402
+from python_liquid_api import LiquidPublic, configure_rate_limit  # noqa: E402
+from python_liquid_api.fanout import MarketDataPublisher, MarketDataReader  # noqa: E402
+
+# 定数
+SEGMENT_NAME = "liquid_bench"
+
+
+def run_worker(mode, endpoint, duration, interval, queue):
+    configure_rate_limit("public", None)
+    if mode == "direct":
+        client = LiquidPublic(endpoint=endpoint)
+        fetch = lambda: client.get_order_book("btc")  # noqa: E731
+    else:
+        reader = MarketDataReader(name=SEGMENT_NAME)
+        fetch = lambda: reader.order_book("btc")  # noqa: E731
+
+    # 初回の読み込み(pandasなど)は計測しない
+    fetch()
+    latencies = []
+    end_time = time.perf_counter() + duration
+    while time.perf_counter() < end_time:
+        start = time.perf_counter()
+        fetch()
+        latencies.append(time.perf_counter() - start)
+        time.sleep(interval)
+    queue.put(latencies)
+
+
+def run(mode, endpoint, args):
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    processes = [
+        context.Process(target=run_worker, args=(mode, endpoint, args.duration, args.interval, queue))
+        for _ in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    latencies = []
+    for _ in processes:
+        latencies.extend(queue.get())
+    for process in processes:
+        process.join()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="共有メモリによる板情報の配信のベンチマーク")
+    parser.add_argument("--processes", type=int, default=8, help="板情報を使用するプロセス数")
+    parser.add_argument("--duration", type=float, default=3.0, help="計測する秒数")
+    parser.add_argument("--interval", type=float, default=0.05, help="各プロセスが板情報を取得する間隔(秒)")
+    parser.add_argument("--latency", type=float, default=0.02, help="スタブサーバの遅延(秒)")
+    args = parser.parse_args()
+
+    configure_rate_limit("public", None)
+    print("%-8s %10s %10s %12s %12s" % ("mode", "requests", "reads", "p50[us]", "p99[us]"))
+    with MockLiquidServer(MockConfig(latency=args.latency, book_change_interval=args.interval)) as server:
+        for mode in ("direct", "shared"):
+            publisher = None
+            if mode == "shared":
+                publisher = MarketDataPublisher(LiquidPublic(endpoint=server.endpoint), ["btc"], name=SEGMENT_NAME,
+                                                order_book_interval=args.interval).start()
+                # 最初の板が書き込まれるまで待つ
+                while publisher.sequences()[("btc", "book")] == 0:
+                    time.sleep(0.01)
+
+            request_count = server.request_count
+            latencies = sorted(run(mode, server.endpoint, args))
+            request_count = server.request_count - request_count
+            if publisher is not None:
+                publisher.close()
+
+            print("%-8s %10d %10d %12.1f %12.1f" % (
+                mode, request_count, len(latencies), statistics.median(latencies) * 1e6,
+                latencies[int(0.99 * (len(latencies) - 1))] * 1e6,
+            ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+パッケージの読み込み時間のベンチマーク
+
+新しいPythonプロセスで各文を実行し、読み込みにかかった時間の中央値と読み込まれた重い依存パッケージを出力する。
+eagerは以前の__init__.pyと同じくすべてのモジュールを読み込んだ場合の時間。
+
+    python benchmarks/bench_import.py --repeat 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# 定数
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ["pandas", "numpy", "requests", "jwt"]
+CASES = {
+    "import python_liquid_api": "import python_liquid_api",
+    "from ... import LiquidPrivate": "from python_liquid_api import LiquidPrivate",
+    "LiquidPrivate(...)": "from python_liquid_api import LiquidPrivate; LiquidPrivate('0', '0' * 32)",
+    "from ... import LiquidPublic": "from python_liquid_api import LiquidPublic",
+    "eager": (
+        "import python_liquid_api.public_api, python_liquid_api.private_api, python_liquid_api.parser, "
+        "python_liquid_api.async_api, python_liquid_api.order_book, python_liquid_api.candles, "
+        "python_liquid_api.stream, python_liquid_api.order_tracker"
+    ),
+}
+TEMPLATE = """
+import sys, time, json
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"elapsed": elapsed, "modules": [m for m in {heavy} if m in sys.modules]}}))
+"""
+
+
+def measure(statement, repeat):
+    code = TEMPLATE.format(statement=statement, heavy=HEAVY_MODULES)
+    times = []
+    modules = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", code], cwd=PACKAGE_DIR, check=True,
+                                capture_output=True, text=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        times.append(result["elapsed"])
+        modules = result["modules"]
+    return statistics.median(times), modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description="パッケージの読み込み時間のベンチマーク")
+    parser.add_argument("--repeat", type=int, default=10, help="各文の実行回数(新しいプロセスで実行)")
+    args = parser.parse_args()
+
+    print("%-32s %12s  %s" % ("statement", "median[ms]", "loaded"))
+    for name, statement in CASES.items():
+        elapsed, modules = measure(statement, args.repeat)
+        print("%-32s %12.1f  %s" % (name, elapsed * 1000, ", ".join(modules) or "-"))
+
+
+if __name__ == "__main__":
+    main()
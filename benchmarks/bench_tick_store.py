@@ -0,0 +1,95 @@
+"""
+TickStoreのベンチマーク
+
+合成した約定(既定で1か月分・約500万件)をTickStoreとpickleに保存し、
+新しいプロセスで開いて1時間分を取り出すまでの時間(パッケージの読み込みは除く)と、その時点のメモリ使用量(RSS、Linuxのみ)を比較する。
+
+    python benchmarks/bench_tick_store.py --executions 5000000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from python_liquid_api.tick_store import EXECUTION_DTYPE, TickStore  # noqa: E402
+
+# 定数
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASE_TIMESTAMP = 1640995200.0
+MONTH_SECONDS = 30 * 24 * 60 * 60
+TEMPLATE = """
+import sys, time, json
+sys.path.insert(0, {package_dir!r})
+import pandas as pd
+from python_liquid_api.tick_store import TickStore
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+rss = [int(line.split()[1]) for line in open("/proc/self/status") if line.startswith("VmRSS")][0]
+print(json.dumps({{"elapsed": elapsed, "rows": rows, "rss": rss}}))
+"""
+STATEMENTS = {
+    "tick_store": "rows = len(TickStore({directory!r}).executions('btc', {start}, {end}))",
+    "pickle": (
+        "df = pd.read_pickle({pickle_path!r})\n"
+        "rows = int(((df['timestamp'] >= {start}) & (df['timestamp'] < {end})).sum())"
+    ),
+}
+
+
+def make_records(execution_num):
+    random_state = np.random.default_rng(0)
+    records = np.empty(execution_num, dtype=EXECUTION_DTYPE)
+    records["timestamp"] = BASE_TIMESTAMP + np.sort(random_state.uniform(0, MONTH_SECONDS, execution_num))
+    records["price"] = 5000000 + random_state.normal(0, 10000, execution_num)
+    records["quantity"] = random_state.uniform(0.001, 1.0, execution_num)
+    records["id"] = np.arange(1, execution_num + 1)
+    records["side"] = random_state.integers(0, 2, execution_num)
+    return records
+
+
+def measure(statement):
+    code = TEMPLATE.format(package_dir=PACKAGE_DIR, statement=statement)
+    output = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TickStoreのベンチマーク")
+    parser.add_argument("--executions", type=int, default=5000000, help="約定の件数(1か月に均等に分布)")
+    args = parser.parse_args()
+
+    records = make_records(args.executions)
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        TickStore(directory).append_executions("btc", records)
+        print("write tick_store: %.2fs" % (time.perf_counter() - start))
+
+        # 比較用にUNIX時間のままのDataFrameを保存する
+        pickle_path = os.path.join(directory, "executions.pkl")
+        pd.DataFrame({name: records[name] for name in EXECUTION_DTYPE.names}).to_pickle(pickle_path)
+
+        # 月の中ほどの1時間を取り出す
+        params = {
+            "directory": directory,
+            "pickle_path": pickle_path,
+            "start": BASE_TIMESTAMP + MONTH_SECONDS / 2,
+            "end": BASE_TIMESTAMP + MONTH_SECONDS / 2 + 3600,
+        }
+        print("%-12s %12s %10s %14s" % ("case", "open[ms]", "rows", "rss[MB]"))
+        for name, statement in STATEMENTS.items():
+            result = measure(statement.format(**params))
+            print("%-12s %12.1f %10d %14.1f" % (name, result["elapsed"] * 1000, result["rows"],
+                                                 result["rss"] / 1024))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,382 @@
+"""
+Liquid APIのスタブサーバ
+
+/products, /products/{id}/ohlc, /products/{id}/price_levels, /executions と
+Private APIの /orders(注文の状態を保持する), /fiat_accounts, /crypto_accounts に合成データもしくは記録したレスポンスを返す。
+
+単体で起動する場合:
+    python benchmarks/mock_server.py --port 8080 --executions 100000 --latency 0.02
+"""
+import argparse
+import bisect
+import json
+import multiprocessing
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# 定数
+BASE_TIMESTAMP = 1640995200.0  # 2022-01-01 00:00:00 UTC
+PRODUCT_CODES = {"5": "BTCJPY", "29": "ETHJPY", "83": "XRPJPY", "41": "BCHJPY", "50": "QASHJPY", "847": "LTCJPY",
+                 "846": "BATJPY"}
+
+
+class MockConfig:
+    def __init__(self, candle_num=1000, level_num=40, execution_num=10000, execution_interval=0.5,
+                 latency=0.0, record_dir=None, order_num=100, book_change_interval=None, product_num=0):
+        """
+        スタブサーバの設定
+        :param candle_num: ohlcで返すローソク足の本数
+        :param level_num: price_levelsで返す片側の価格帯数
+        :param execution_num: executionsで返す約定の総数
+        :param execution_interval: 約定の間隔(秒)
+        :param latency: レスポンスを返すまでの遅延(秒)
+        :param record_dir: 記録したレスポンスを置いたディレクトリ。パスに対応するJSONファイルがあればそれを返す
+        :param order_num: 起動時に作成しておく未約定の注文数
+        :param book_change_interval: 板が変化する間隔(秒)。{プロダクトID: 秒}の辞書も指定可能。
+        Noneの場合は内容が常に同じで、timestampのみリクエストごとに変わる
+        :param product_num: productsでPRODUCT_CODESの通貨ペアに加えて返す合成の通貨ペア数(USD建て・BTC建て)
+        """
+        self.candle_num = candle_num
+        self.level_num = level_num
+        self.execution_num = execution_num
+        self.execution_interval = execution_interval
+        self.latency = latency
+        self.record_dir = record_dir
+        self.order_num = order_num
+        self.book_change_interval = book_change_interval
+        self.product_num = product_num
+
+
+def _make_products(config):
+    products = [
+        {"id": int(product_id), "currency_pair_code": code, "base_currency": code[:-3], "quoted_currency": code[-3:]}
+        for product_id, code in PRODUCT_CODES.items()
+    ]
+    for i in range(config.product_num):
+        base_currency = "C%03d" % i
+        quoted_currency = "USD" if i % 2 == 0 else "BTC"
+        products.append({"id": 10000 + i, "currency_pair_code": base_currency + quoted_currency,
+                         "base_currency": base_currency, "quoted_currency": quoted_currency})
+
+    for product in products:
+        product.update({"product_type": "CurrencyPair", "tick_size": "1.0", "disabled": False,
+                        "market_bid": "5000000.0", "market_ask": "5001000.0"})
+    return products
+
+
+def _make_executions(config):
+    random_state = random.Random(0)
+    executions = []
+    for i in range(config.execution_num):
+        timestamp = BASE_TIMESTAMP + i * config.execution_interval
+        executions.append({
+            "id": i + 1,
+            "quantity": "%.8f" % random_state.uniform(0.001, 1.0),
+            "price": "%.1f" % (5000000 + random_state.uniform(-10000, 10000)),
+            "taker_side": random_state.choice(["buy", "sell"]),
+            "created_at": int(timestamp),
+            "timestamp": "%.5f" % timestamp,
+        })
+    return executions
+
+
+def _make_order(order_id, order_type="limit", quantity=0.01, price=5000000.0, side="buy", product_id="5"):
+    timestamp = int(time.time())
+    return {
+        "id": order_id,
+        "order_type": order_type,
+        "quantity": "%.8f" % float(quantity),
+        "price": "%.1f" % float(price),
+        "filled_quantity": "0.0",
+        "side": side,
+        "status": "live",
+        "product_id": str(product_id),
+        "created_at": timestamp,
+        "updated_at": timestamp,
+        "currency_pair_code": PRODUCT_CODES.get(str(product_id), "BTCJPY"),
+    }
+
+
+class MockLiquidServer:
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        """
+        スタブサーバ(別スレッドで起動する)
+        :param config: MockConfig
+        :param host: 待ち受けるホスト
+        :param port: 待ち受けるポート(0の場合は空いているポート)
+        """
+        self.config = config or MockConfig()
+        self.request_count = 0
+        self._executions = _make_executions(self.config)
+        self._execution_timestamps = [float(e["timestamp"]) for e in self._executions]
+        self._order_id = 0
+        self._orders = {}
+        self._lock = threading.Lock()
+        for _ in range(self.config.order_num):
+            order_id = self._next_order_id()
+            self._orders[order_id] = _make_order(order_id)
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def endpoint(self):
+        host, port = self._server.server_address[:2]
+        return "http://" + host + ":" + str(port) + "/"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def _recorded(self, path):
+        if self.config.record_dir is None:
+            return None
+        file_path = os.path.join(self.config.record_dir, path.strip("/").replace("/", "_") + ".json")
+        if not os.path.exists(file_path):
+            return None
+        with open(file_path, "rb") as f:
+            return f.read()
+
+    def _executions_after(self, timestamp, limit):
+        index = bisect.bisect_right(self._execution_timestamps, timestamp)
+        return self._executions[index:index + limit]
+
+    def _next_order_id(self):
+        with self._lock:
+            self._order_id += 1
+            return self._order_id
+
+    def fill_order(self, order_id, quantity=None):
+        """
+        注文を約定させる(約定イベントの確認用)
+        :param order_id: 取引ID
+        :param quantity: 約定させる数量(省略時は全量)
+        """
+        with self._lock:
+            order = self._orders[int(order_id)]
+            total = float(order["quantity"])
+            filled = float(order["filled_quantity"])
+            filled = total if quantity is None else min(total, filled + quantity)
+            order["filled_quantity"] = "%.8f" % filled
+            order["status"] = "filled" if filled >= total else "live"
+            order["updated_at"] = max(order["updated_at"] + 1, int(time.time()))
+
+    def _list_orders(self, query):
+        status = query.get("status", [None])[0]
+        product_id = query.get("product_id", [None])[0]
+        limit = int(query.get("limit", [20])[0])
+        page = int(query.get("page", [1])[0])
+
+        with self._lock:
+            # 新しい注文から返す
+            orders = [
+                dict(order) for order in reversed(list(self._orders.values()))
+                if (status is None or order["status"] == status)
+                and (product_id is None or order["product_id"] == product_id)
+            ]
+        return orders[(page - 1) * limit:page * limit]
+
+    def _price_levels(self, product_id):
+        config = self.config
+        change_interval = config.book_change_interval
+        if isinstance(change_interval, dict):
+            change_interval = change_interval.get(product_id)
+        if change_interval is None:
+            return {
+                "buy_price_levels": [["%.1f" % (5000000 - i), "0.1"] for i in range(config.level_num)],
+                "sell_price_levels": [["%.1f" % (5000001 + i), "0.1"] for i in range(config.level_num)],
+                "timestamp": "%.3f" % time.time(),
+            }
+
+        # 変化する間隔ごとに同じ板を返す
+        version = int(time.time() // change_interval)
+        random_state = random.Random(version * 1000 + int(product_id))
+        return {
+            "buy_price_levels": [["%.1f" % (5000000 - i), "%.8f" % random_state.uniform(0.01, 1.0)]
+                                 for i in range(config.level_num)],
+            "sell_price_levels": [["%.1f" % (5000001 + i), "%.8f" % random_state.uniform(0.01, 1.0)]
+                                  for i in range(config.level_num)],
+            "timestamp": "%.3f" % (version * change_interval),
+        }
+
+    def _response(self, method, path, query, body=None):
+        config = self.config
+        if method == "GET" and path.endswith("/ohlc"):
+            resolution = int(query.get("resolution", ["60"])[0])
+            data = []
+            for i in range(config.candle_num):
+                timestamp = int(BASE_TIMESTAMP) + i * resolution
+                data.append([timestamp, "5000000.0", "5001000.0", "4999000.0", "5000500.0", "1.2345"])
+            return 200, {"data": data}
+
+        if method == "GET" and path.endswith("/price_levels"):
+            return 200, self._price_levels(path.split("/")[2])
+
+        if method == "GET" and path == "/executions":
+            timestamp = float(query.get("timestamp", [0])[0])
+            limit = int(query.get("limit", [1000])[0])
+            return 200, self._executions_after(timestamp, limit)
+
+        if method == "GET" and path.strip("/") == "products":
+            return 200, _make_products(config)
+
+        if method == "GET" and path == "/fiat_accounts":
+            return 200, [{"currency": "JPY", "balance": "1000000.0", "reserved_balance": "0.0"}]
+
+        if method == "GET" and path == "/crypto_accounts":
+            return 200, [
+                {"currency": currency, "balance": "1.0", "reserved_balance": "0.0"}
+                for currency in ["BTC", "ETH", "XRP", "BCH", "QASH", "LTC", "BAT"]
+            ]
+
+        if method == "GET" and path.strip("/") == "orders":
+            return 200, {"models": self._list_orders(query)}
+
+        if method == "GET" and path.startswith("/orders/"):
+            with self._lock:
+                order = self._orders.get(int(path.split("/")[2]))
+                if order is None:
+                    return 404, {"message": "not found"}
+                return 200, dict(order)
+
+        if method == "POST" and path.startswith("/orders"):
+            params = json.loads(body)["order"] if body else {}
+            order_id = self._next_order_id()
+            order = _make_order(order_id, order_type=params.get("order_type", "limit"),
+                                quantity=params.get("quantity", 0.01), price=params.get("price", 5000000.0),
+                                side=params.get("side", "buy"), product_id=params.get("product_id", "5"))
+            with self._lock:
+                self._orders[order_id] = order
+                return 200, dict(order)
+
+        if method == "PUT" and path.endswith("/cancel"):
+            with self._lock:
+                order = self._orders.get(int(path.split("/")[2]))
+                if order is None:
+                    return 404, {"message": "not found"}
+                if order["status"] == "live":
+                    order["status"] = "cancelled"
+                    order["updated_at"] = max(order["updated_at"] + 1, int(time.time()))
+                return 200, dict(order)
+
+        return 404, {"message": "not found"}
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # ヘッダと本文を別々に送信するため、Nagleアルゴリズムによる遅延を避ける
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def _handle(self, method):
+                with server._lock:
+                    server.request_count += 1
+
+                length = int(self.headers.get("Content-Length", 0))
+                request_body = self.rfile.read(length) if length > 0 else None
+
+                if server.config.latency > 0:
+                    time.sleep(server.config.latency)
+
+                url = urlparse(self.path)
+                body = server._recorded(url.path) if method == "GET" else None
+                status = 200
+                if body is None:
+                    status, data = server._response(method, url.path, parse_qs(url.query), request_body)
+                    body = json.dumps(data).encode()
+
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                self._handle("GET")
+
+            def do_POST(self):
+                self._handle("POST")
+
+            def do_PUT(self):
+                self._handle("PUT")
+
+        return Handler
+
+
+def _serve(config, queue):
+    server = MockLiquidServer(config)
+    queue.put(server.endpoint)
+    server._server.serve_forever()
+
+
+class MockLiquidServerProcess:
+    def __init__(self, config=None):
+        """
+        スタブサーバを別プロセスで起動する。
+        計測対象のクライアントとCPU・メモリを共有しないため、ベンチマークではこちらを使用する
+        :param config: MockConfig
+        """
+        self.config = config or MockConfig()
+        self.endpoint = None
+        self._process = None
+
+    def start(self):
+        queue = multiprocessing.Queue()
+        self._process = multiprocessing.Process(target=_serve, args=(self.config, queue), daemon=True)
+        self._process.start()
+        self.endpoint = queue.get(timeout=30)
+        return self
+
+    def stop(self):
+        self._process.terminate()
+        self._process.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Liquid APIのスタブサーバを起動します。")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--candles", type=int, default=1000, help="ローソク足の本数")
+    parser.add_argument("--levels", type=int, default=40, help="片側の価格帯数")
+    parser.add_argument("--executions", type=int, default=10000, help="約定の総数")
+    parser.add_argument("--latency", type=float, default=0.0, help="レスポンスの遅延(秒)")
+    parser.add_argument("--record-dir", default=None, help="記録したレスポンスのディレクトリ")
+    args = parser.parse_args()
+
+    config = MockConfig(candle_num=args.candles, level_num=args.levels, execution_num=args.executions,
+                        latency=args.latency, record_dir=args.record_dir)
+    server = MockLiquidServer(config, host=args.host, port=args.port)
+    print("起動しました:", server.endpoint)
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
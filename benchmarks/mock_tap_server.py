@@ -0,0 +1,278 @@
+"""
+Liquid Tap(Pusherプロトコル)のスタブサーバ
+
+標準ライブラリのみでWebSocketを実装し、購読されたチャンネルにpublishで任意のイベントを送信する。
+LiquidStreamの動作確認・再接続の確認(disconnect_all)に使用する。
+
+単体で起動する場合(約定と板情報を一定間隔で送信する):
+    python benchmarks/mock_tap_server.py --port 8081 --interval 0.1
+"""
+import argparse
+import base64
+import hashlib
+import json
+import random
+import socket
+import socketserver
+import struct
+import threading
+import time
+
+# 定数
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+OPCODE_TEXT = 0x1
+OPCODE_CLOSE = 0x8
+OPCODE_PING = 0x9
+OPCODE_PONG = 0xA
+
+
+def _encode_frame(opcode, payload):
+    header = bytes([0x80 | opcode])
+    length = len(payload)
+    if length < 126:
+        header += bytes([length])
+    elif length < 65536:
+        header += bytes([126]) + struct.pack("!H", length)
+    else:
+        header += bytes([127]) + struct.pack("!Q", length)
+    return header + payload
+
+
+def _read_exact(rfile, size):
+    data = rfile.read(size)
+    if len(data) < size:
+        raise ConnectionError("切断されました。")
+    return data
+
+
+def _read_frame(rfile):
+    first, second = _read_exact(rfile, 2)
+    opcode = first & 0x0F
+    length = second & 0x7F
+    if length == 126:
+        length = struct.unpack("!H", _read_exact(rfile, 2))[0]
+    elif length == 127:
+        length = struct.unpack("!Q", _read_exact(rfile, 8))[0]
+
+    mask = _read_exact(rfile, 4) if second & 0x80 else None
+    payload = _read_exact(rfile, length)
+    if mask is not None:
+        # クライアントからのフレームはマスクされている
+        key = int.from_bytes((mask * (length // 4 + 1))[:length], "big")
+        payload = (int.from_bytes(payload, "big") ^ key).to_bytes(length, "big")
+    return opcode, payload
+
+
+class MockTapServer:
+    def __init__(self, host="127.0.0.1", port=0):
+        """
+        Liquid Tapのスタブサーバ(別スレッドで起動する)
+        :param host: 待ち受けるホスト
+        :param port: 待ち受けるポート(0の場合は空いているポート)
+        """
+        self.connection_count = 0
+        self.subscriptions = {}  # {接続: 購読中のチャンネルの集合}
+        self._lock = threading.Lock()
+        self._server = socketserver.ThreadingTCPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return "ws://" + host + ":" + str(port) + "/app/LiquidTapClient"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.disconnect_all()
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def subscribers(self, channel):
+        with self._lock:
+            return [handler for handler, channels in self.subscriptions.items() if channel in channels]
+
+    def wait_for_subscription(self, channel, timeout=5.0):
+        """
+        チャンネルが購読されるまで待機する
+        """
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if len(self.subscribers(channel)) > 0:
+                return True
+            time.sleep(0.01)
+        return False
+
+    def publish(self, channel, event, data):
+        """
+        購読中の接続にイベントを送信する
+        :param channel: チャンネル名
+        :param event: イベント名(created, updated)
+        :param data: 送信するデータ(Pusherと同じくJSON文字列に変換して送る)
+        :return: 送信した接続数
+        """
+        message = json.dumps({"channel": channel, "event": event, "data": json.dumps(data)})
+        handlers = self.subscribers(channel)
+        for handler in handlers:
+            handler.send_text(message)
+        return len(handlers)
+
+    def disconnect_all(self):
+        """
+        すべての接続を切断する(再接続の確認用)
+        """
+        with self._lock:
+            handlers = list(self.subscriptions)
+        for handler in handlers:
+            handler.disconnect()
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def setup(self):
+                super().setup()
+                self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                self._send_lock = threading.Lock()
+
+            def send_text(self, text):
+                self._send(OPCODE_TEXT, text.encode())
+
+            def _send(self, opcode, payload):
+                try:
+                    with self._send_lock:
+                        self.wfile.write(_encode_frame(opcode, payload))
+                except OSError:
+                    pass
+
+            def disconnect(self):
+                try:
+                    self.request.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+
+            def _handshake(self):
+                headers = {}
+                self.rfile.readline()  # リクエスト行
+                while True:
+                    line = self.rfile.readline().decode().strip()
+                    if line == "":
+                        break
+                    name, value = line.split(":", 1)
+                    headers[name.strip().lower()] = value.strip()
+
+                accept = base64.b64encode(
+                    hashlib.sha1((headers["sec-websocket-key"] + WEBSOCKET_GUID).encode()).digest()
+                ).decode()
+                self.wfile.write((
+                    "HTTP/1.1 101 Switching Protocols\r\n"
+                    "Upgrade: websocket\r\n"
+                    "Connection: Upgrade\r\n"
+                    "Sec-WebSocket-Accept: " + accept + "\r\n\r\n"
+                ).encode())
+
+            def handle(self):
+                self._handshake()
+                with server._lock:
+                    server.connection_count += 1
+                    server.subscriptions[self] = set()
+
+                socket_id = str(server.connection_count) + ".0"
+                self.send_text(json.dumps({
+                    "event": "pusher:connection_established",
+                    "data": json.dumps({"socket_id": socket_id, "activity_timeout": 120}),
+                }))
+
+                try:
+                    while True:
+                        opcode, payload = _read_frame(self.rfile)
+                        if opcode == OPCODE_CLOSE:
+                            self._send(OPCODE_CLOSE, payload[:2])
+                            return
+                        if opcode == OPCODE_PING:
+                            self._send(OPCODE_PONG, payload)
+                            continue
+                        if opcode == OPCODE_TEXT:
+                            self._on_message(json.loads(payload.decode()))
+                except (ConnectionError, OSError, ValueError):
+                    pass
+                finally:
+                    with server._lock:
+                        server.subscriptions.pop(self, None)
+
+            def _on_message(self, message):
+                event = message.get("event")
+                if event == "pusher:ping":
+                    self.send_text(json.dumps({"event": "pusher:pong", "data": "{}"}))
+                elif event == "pusher:subscribe":
+                    channel = message["data"]["channel"]
+                    with server._lock:
+                        server.subscriptions[self].add(channel)
+                    self.send_text(json.dumps({
+                        "event": "pusher_internal:subscription_succeeded", "channel": channel, "data": "{}",
+                    }))
+                elif event == "pusher:unsubscribe":
+                    with server._lock:
+                        server.subscriptions[self].discard(message["data"]["channel"])
+
+        return Handler
+
+
+def make_execution(execution_id, timestamp=None):
+    """
+    Liquid Tapのexecutions_cashと同じ形式の約定データ
+    """
+    timestamp = time.time() if timestamp is None else timestamp
+    return {
+        "id": execution_id,
+        "quantity": "%.8f" % random.uniform(0.001, 1.0),
+        "price": "%.1f" % (5000000 + random.uniform(-10000, 10000)),
+        "taker_side": random.choice(["buy", "sell"]),
+        "created_at": int(timestamp),
+        "timestamp": "%.5f" % timestamp,
+    }
+
+
+def make_price_ladder(side, level_num=40):
+    """
+    Liquid Tapのprice_ladders_cashと同じ形式の価格帯([価格, 数量]のリスト)
+    """
+    sign = -1 if side == "buy" else 1
+    base_price = 5000000 if side == "buy" else 5000001
+    return [["%.1f" % (base_price + sign * i), "%.8f" % random.uniform(0.01, 1.0)] for i in range(level_num)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Liquid Tapのスタブサーバを起動します。")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--pair", default="btcjpy", help="送信する通貨ペア")
+    parser.add_argument("--interval", type=float, default=0.1, help="送信間隔(秒)")
+    args = parser.parse_args()
+
+    server = MockTapServer(host=args.host, port=args.port).start()
+    print("起動しました:", server.url)
+    execution_id = 0
+    try:
+        while True:
+            execution_id += 1
+            server.publish("executions_cash_" + args.pair, "created", make_execution(execution_id))
+            for side in ["buy", "sell"]:
+                server.publish("price_ladders_cash_" + args.pair + "_" + side, "updated", make_price_ladder(side))
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
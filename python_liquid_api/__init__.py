@@ -1,5 +1,65 @@
-from .public_api import *
-from .private_api import *
-from .parameter_dict import *
+import importlib
 
-__version__ = "0.4.0"
+__version__ = "0.5.0"
+
+# 公開する名前と定義しているモジュール。
+# 使用されたときに初めてモジュールを読み込むため、pandas・numpy・requestsは必要になるまで読み込まない
+_LAZY_ATTRIBUTES = {
+    "LiquidPublic": ".public_api",
+    "LiquidPrivate": ".private_api",
+    "ParameterDict": ".parameter_dict",
+    "LiquidSession": ".session",
+    "AsyncLiquidPublic": ".async_api",
+    "AsyncLiquidPrivate": ".async_api",
+    "OrderBook": ".order_book",
+    "aggregate_candlestick": ".candles",
+    "aggregate_tick_bars": ".candles",
+    "aggregate_volume_bars": ".candles",
+    "CandleAggregator": ".candles",
+    "OrderTracker": ".order_tracker",
+    "OrderBookPoller": ".poller",
+    "LiquidStream": ".stream",
+    "TickStore": ".tick_store",
+    "MarketDataPublisher": ".fanout",
+    "MarketDataReader": ".fanout",
+    "configure_rate_limit": ".rate_limit",
+    "get_rate_limit_metrics": ".rate_limit",
+    "get_json_backend": ".decoder",
+    "set_json_backend": ".decoder",
+    "Instrumentation": ".instrumentation",
+    "enable_instrumentation": ".instrumentation",
+    "disable_instrumentation": ".instrumentation",
+    "get_instrumentation": ".instrumentation",
+    "RequestCoalescer": ".coalesce",
+    "enable_coalescing": ".coalesce",
+    "disable_coalescing": ".coalesce",
+    "get_coalescer": ".coalesce",
+    "ProductCatalog": ".products",
+    "load_product_catalog": ".products",
+    "get_product_catalog": ".products",
+    "set_product_catalog": ".products",
+    "ExecutionAnalytics": ".analytics",
+    "execution_features": ".analytics",
+    "book_features": ".analytics",
+    "LiquidAPIError": ".utils",
+    "json_parse": ".utils",
+    "set_url": ".utils",
+    "url_add_currency": ".utils",
+}
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError("module " + repr(__name__) + " has no attribute " + repr(name))
+
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    # 2回目以降は通常の属性として参照できるようにする
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,282 @@
+import numpy as np
+import pandas as pd
+
+from .candles import NANOSECONDS, _execution_arrays, parse_resolution
+from .parser import timestamps_to_datetime
+
+# 定数
+EXECUTION_FEATURE_COLUMNS = [
+    "timestamp", "vwap", "volume", "signed_volume", "order_flow_imbalance", "trade_intensity",
+    "realized_volatility",
+]
+BOOK_FEATURE_COLUMNS = [
+    "timestamp", "best_bid", "best_ask", "mid_price", "spread", "imbalance", "depth_imbalance", "microprice",
+]
+DEFAULT_DEPTH = 5
+
+
+def _squared_returns(prices, previous_price=None):
+    """
+    直前の約定からの対数収益率の2乗(最初の約定はprevious_priceからの収益率、previous_priceがなければ0)
+    """
+    log_prices = np.log(prices)
+    returns = np.empty(len(prices), dtype=np.float64)
+    returns[1:] = np.diff(log_prices)
+    if len(prices) > 0:
+        returns[0] = log_prices[0] - np.log(previous_price) if previous_price is not None else 0.0
+    return returns * returns
+
+
+def _window_sums(times, window_ns, columns):
+    """
+    各約定について、時刻が(t - window, t]の約定の合計を累積和の差で求める
+    :param columns: 合計する配列のリスト
+    :return: (合計の配列のリスト, 約定回数)
+    """
+    starts = np.searchsorted(times, times - window_ns, side="right")
+    ends = np.arange(1, len(times) + 1)
+    sums = []
+    for values in columns:
+        cumulative = np.concatenate(([0.0], np.cumsum(values)))
+        sums.append(cumulative[ends] - cumulative[starts])
+    return sums, ends - starts
+
+
+def _execution_features(times, prices, quantities, signs, squared_returns, window_ns, first=0):
+    """
+    first番目以降の約定の指標を求める(first番目より前の約定は時間窓の計算のみに使用する)
+    """
+    (notional, volume, signed_volume, variance), counts = _window_sums(
+        times, window_ns, [prices * quantities, quantities, signs * quantities, squared_returns]
+    )
+    with np.errstate(invalid="ignore", divide="ignore"):
+        vwap = notional / volume
+        imbalance = signed_volume / volume
+
+    return {
+        "timestamp": times[first:],
+        "vwap": vwap[first:],
+        "volume": volume[first:],
+        "signed_volume": signed_volume[first:],
+        "order_flow_imbalance": imbalance[first:],
+        "trade_intensity": counts[first:] / (window_ns / NANOSECONDS),
+        # 浮動小数点の誤差で負にならないようにする
+        "realized_volatility": np.sqrt(np.maximum(variance[first:], 0.0)),
+    }
+
+
+def _features_to_dataframe(features, columns):
+    feature_df = pd.DataFrame(features, columns=columns)
+    feature_df["timestamp"] = np.asarray(features["timestamp"], dtype=np.int64).view("datetime64[ns]")
+    return feature_df
+
+
+def execution_features(executions_df, window):
+    """
+    約定ごとに、直近window(その約定の時刻を含む)の約定から指標を求める
+    :param executions_df: get_executionsと同じ列(quantity, price, taker_side, timestamp)のDataFrame
+    :param window: 時間窓(秒数、もしくは1min・10s・1hourなどの文字列)
+    :return: 時刻順のDataFrame
+    - timestamp: 約定の時刻
+    - vwap: 出来高加重平均価格
+    - volume: 出来高
+    - signed_volume: 買いの出来高 - 売りの出来高(taker_sideで判定)
+    - order_flow_imbalance: signed_volume / volume(-1〜1)
+    - trade_intensity: 1秒あたりの約定回数
+    - realized_volatility: 直前の約定からの対数収益率の2乗和の平方根
+    """
+    window_ns = parse_resolution(window) * NANOSECONDS
+    times, prices, quantities, signs = _execution_arrays(executions_df, with_signs=True)
+    features = _execution_features(times, prices, quantities, signs, _squared_returns(prices), window_ns)
+    return _features_to_dataframe(features, EXECUTION_FEATURE_COLUMNS)
+
+
+def rolling_vwap(executions_df, window):
+    """
+    約定ごとの直近windowの出来高加重平均価格
+    :return: timestampをindexとするSeries
+    """
+    feature_df = execution_features(executions_df, window)
+    return pd.Series(feature_df["vwap"].to_numpy(), index=feature_df["timestamp"], name="vwap")
+
+
+def order_flow_imbalance(executions_df, window):
+    """
+    約定ごとの直近windowの(買いの出来高 - 売りの出来高) / 出来高
+    :return: timestampをindexとするSeries
+    """
+    feature_df = execution_features(executions_df, window)
+    return pd.Series(feature_df["order_flow_imbalance"].to_numpy(), index=feature_df["timestamp"],
+                     name="order_flow_imbalance")
+
+
+def trade_intensity(executions_df, window):
+    """
+    約定ごとの直近windowの1秒あたりの約定回数
+    :return: timestampをindexとするSeries
+    """
+    feature_df = execution_features(executions_df, window)
+    return pd.Series(feature_df["trade_intensity"].to_numpy(), index=feature_df["timestamp"],
+                     name="trade_intensity")
+
+
+def realized_volatility(executions_df, window):
+    """
+    約定ごとの直近windowの実現ボラティリティ(対数収益率の2乗和の平方根、年率換算はしない)
+    :return: timestampをindexとするSeries
+    """
+    feature_df = execution_features(executions_df, window)
+    return pd.Series(feature_df["realized_volatility"].to_numpy(), index=feature_df["timestamp"],
+                     name="realized_volatility")
+
+
+class ExecutionAnalytics:
+    def __init__(self, window):
+        """
+        新しい約定を受け取るたびにexecution_featuresと同じ指標を求める。
+        直近windowの約定のみを保持するため、処理は受け取った約定数と時間窓内の約定数に比例する
+        :param window: 時間窓(execution_featuresと同じ指定)
+        """
+        self.window_ns = parse_resolution(window) * NANOSECONDS
+        self.late_count = 0  # 最新の約定より前の時刻で届いたため捨てた約定の数
+        self._last_price = None
+        # 時間窓内の約定(時刻, 価格, 数量, 符号, 収益率の2乗)
+        self._window = tuple(np.empty(0, dtype=dtype) for dtype in
+                             (np.int64, np.float64, np.float64, np.float64, np.float64))
+
+    def update(self, executions_df):
+        """
+        約定を追加する
+        :param executions_df: get_executionsと同じ列のDataFrame(LiquidStreamで受信したものなど)
+        :return: 追加した約定の指標のDataFrame(execution_featuresと同じ列)
+        """
+        times, prices, quantities, signs = _execution_arrays(executions_df, with_signs=True)
+
+        window_times = self._window[0]
+        if len(window_times) > 0 and len(times) > 0:
+            late = times < window_times[-1]
+            if np.any(late):
+                self.late_count += int(np.count_nonzero(late))
+                keep = ~late
+                times, prices, quantities, signs = times[keep], prices[keep], quantities[keep], signs[keep]
+
+        if len(times) == 0:
+            return _features_to_dataframe({column: np.empty(0) for column in EXECUTION_FEATURE_COLUMNS},
+                                          EXECUTION_FEATURE_COLUMNS)
+
+        squared_returns = _squared_returns(prices, self._last_price)
+        self._last_price = prices[-1]
+
+        arrays = tuple(np.concatenate(pair) for pair in
+                       zip(self._window, (times, prices, quantities, signs, squared_returns)))
+        first = len(window_times)
+        features = _execution_features(*arrays, window_ns=self.window_ns, first=first)
+
+        # 次回の時間窓に含まれる約定のみ残す
+        start = int(np.searchsorted(arrays[0], arrays[0][-1] - self.window_ns, side="right"))
+        self._window = tuple(values[start:] for values in arrays)
+
+        return _features_to_dataframe(features, EXECUTION_FEATURE_COLUMNS)
+
+    @property
+    def window_count(self):
+        """
+        保持している時間窓内の約定数
+        """
+        return len(self._window[0])
+
+
+def _book_levels(book):
+    """
+    板を(買い板の価格, 数量, 売り板の価格, 数量, UNIX時間)に変換する(買い板は価格の降順、売り板は昇順)
+    :param book: OrderBook、get_order_book_rawの返り値、もしくはget_order_bookの返り値(売値DataFrame, 買値DataFrame, datetime)
+    """
+    if isinstance(book, tuple):
+        # get_order_bookは売り板をbid_price列、買い板をask_price列で返す
+        sell_df, buy_df, datetime_data = book
+        return (buy_df["ask_price"].to_numpy(dtype=np.float64), buy_df["ask_volume"].to_numpy(dtype=np.float64),
+                sell_df["bid_price"].to_numpy(dtype=np.float64), sell_df["bid_volume"].to_numpy(dtype=np.float64),
+                datetime_data.timestamp())
+    if isinstance(book, dict):
+        buy_levels = np.asarray(book["buy_price_levels"], dtype=np.float64).reshape(-1, 2)
+        sell_levels = np.asarray(book["sell_price_levels"], dtype=np.float64).reshape(-1, 2)
+        return buy_levels[:, 0], buy_levels[:, 1], sell_levels[:, 0], sell_levels[:, 1], float(book["timestamp"])
+
+    timestamp = book.timestamp if book.timestamp is not None else np.nan
+    return book.bid_prices, book.bid_volumes, book.ask_prices, book.ask_volumes, timestamp
+
+
+def _padded(values_list, depth, fill_value):
+    out = np.full((len(values_list), depth), fill_value, dtype=np.float64)
+    for i, values in enumerate(values_list):
+        length = min(len(values), depth)
+        out[i, :length] = values[:length]
+    return out
+
+
+def book_features(books, depth=DEFAULT_DEPTH):
+    """
+    板のスナップショットごとに最良気配・板の偏り・マイクロプライスを求める
+    :param books: 板(OrderBook、get_order_book_rawの返り値、get_order_bookの返り値)のリスト
+    :param depth: depth_imbalanceで合計する価格帯数
+    :return: DataFrame
+    - timestamp: 板の時刻
+    - best_bid, best_ask, mid_price, spread
+    - imbalance: 最良気配の(買い数量 - 売り数量) / (買い数量 + 売り数量)
+    - depth_imbalance: 上位depth件の価格帯の(買い数量 - 売り数量) / (買い数量 + 売り数量)
+    - microprice: 最良気配の数量で重み付けした価格(best_bid * 売り数量 + best_ask * 買い数量) / (買い数量 + 売り数量)
+    """
+    if depth < 1:
+        raise ValueError("depthには1以上を指定してください。")
+
+    levels = [_book_levels(book) for book in books]
+    bid_prices = _padded([level[0] for level in levels], 1, np.nan)[:, 0]
+    bid_volumes = _padded([level[1] for level in levels], depth, 0.0)
+    ask_prices = _padded([level[2] for level in levels], 1, np.nan)[:, 0]
+    ask_volumes = _padded([level[3] for level in levels], depth, 0.0)
+    timestamps = np.array([level[4] for level in levels], dtype=np.float64)
+
+    best_bid_volume = bid_volumes[:, 0]
+    best_ask_volume = ask_volumes[:, 0]
+    total_bid_volume = bid_volumes.sum(axis=1)
+    total_ask_volume = ask_volumes.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        top_volume = best_bid_volume + best_ask_volume
+        features = {
+            "timestamp": timestamps_to_datetime(timestamps),
+            "best_bid": bid_prices,
+            "best_ask": ask_prices,
+            "mid_price": (bid_prices + ask_prices) / 2,
+            "spread": ask_prices - bid_prices,
+            "imbalance": (best_bid_volume - best_ask_volume) / top_volume,
+            "depth_imbalance": (total_bid_volume - total_ask_volume) / (total_bid_volume + total_ask_volume),
+            "microprice": (bid_prices * best_ask_volume + ask_prices * best_bid_volume) / top_volume,
+        }
+    return pd.DataFrame(features, columns=BOOK_FEATURE_COLUMNS)
+
+
+def book_imbalance(book, depth=1):
+    """
+    上位depth件の価格帯の(買い数量 - 売り数量) / (買い数量 + 売り数量)
+    :param book: OrderBook、get_order_book_rawの返り値、もしくはget_order_bookの返り値
+    """
+    bid_prices, bid_volumes, ask_prices, ask_volumes, _ = _book_levels(book)
+    bid_volume = float(np.sum(bid_volumes[:depth]))
+    ask_volume = float(np.sum(ask_volumes[:depth]))
+    if bid_volume + ask_volume == 0:
+        return float("nan")
+    return (bid_volume - ask_volume) / (bid_volume + ask_volume)
+
+
+def microprice(book):
+    """
+    最良気配の数量で重み付けした価格
+    :param book: OrderBook、get_order_book_rawの返り値、もしくはget_order_bookの返り値
+    """
+    bid_prices, bid_volumes, ask_prices, ask_volumes, _ = _book_levels(book)
+    if len(bid_prices) == 0 or len(ask_prices) == 0:
+        return float("nan")
+    bid_volume, ask_volume = float(bid_volumes[0]), float(ask_volumes[0])
+    if bid_volume + ask_volume == 0:
+        return float("nan")
+    return (float(bid_prices[0]) * ask_volume + float(ask_prices[0]) * bid_volume) / (bid_volume + ask_volume)
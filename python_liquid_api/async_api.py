@@ -0,0 +1,186 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from .public_api import LiquidPublic
+from .private_api import LiquidPrivate
+from .products import DEFAULT_QUOTE_CURRENCY, get_product_catalog
+from .session import DEFAULT_ENDPOINT
+from .pagination import DEFAULT_WINDOW_SECONDS, DEFAULT_MAX_WORKERS
+
+# 定数
+DEFAULT_MAX_CONCURRENCY = 8
+
+
+class _AsyncClient(object):
+    def __init__(self, client, max_concurrency):
+        """
+        同期クライアントをasyncioから呼び出すための共通処理
+        :param client: LiquidPublicもしくはLiquidPrivate
+        :param max_concurrency: 同時に実行するリクエストの最大数
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrencyには1以上を指定してください。")
+
+        self._client = client
+        self.max_concurrency = max_concurrency
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency)
+
+    @property
+    def session(self):
+        return self._client.session
+
+    async def _run(self, func, *args, **kwargs):
+        # ブロッキングするHTTP通信はスレッドプールで実行する
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    async def close(self):
+        """
+        スレッドプールとコネクションプールを解放する
+        """
+        # 実行中のリクエストの終了を待つ間イベントループを止めないよう別スレッドで待つ
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, functools.partial(self._executor.shutdown, wait=True))
+        self._client.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+
+class AsyncLiquidPublic(_AsyncClient):
+    def __init__(self, max_concurrency=DEFAULT_MAX_CONCURRENCY, endpoint=DEFAULT_ENDPOINT, session=None, cache=None,
+                 parse_numeric=False, tick_store=None, **session_kwargs):
+        """
+        LiquidPublicのasyncio版
+        :param max_concurrency: 同時に実行するリクエストの最大数
+        :param endpoint: APIのベースURL
+        :param session: requests.SessionもしくはLiquidSession(他のクライアントと共有可能)
+        :param cache: 確定済のローソク足・約定履歴を保存するHistoricalCache
+        :param parse_numeric: Trueの場合は生データの数値の文字列をfloatに変換する
+        :param tick_store: 取得した約定・確定済のローソク足を追記するTickStore
+        :param session_kwargs: LiquidSessionの設定
+        """
+        # 同時実行数分のコネクションをプールできるようにする
+        session_kwargs.setdefault("pool_maxsize", max_concurrency)
+        client = LiquidPublic(endpoint=endpoint, session=session, cache=cache, parse_numeric=parse_numeric,
+                              tick_store=tick_store, **session_kwargs)
+        super().__init__(client, max_concurrency)
+
+    async def get_products_raw(self):
+        return await self._run(self._client.get_products_raw)
+
+    async def get_candlestick_raw(self, currency_name, candle_type):
+        return await self._run(self._client.get_candlestick_raw, currency_name, candle_type)
+
+    async def get_candlestick(self, currency_name, date, candle_type, is_index_datetime=True):
+        return await self._run(self._client.get_candlestick, currency_name, date, candle_type,
+                               is_index_datetime=is_index_datetime)
+
+    async def get_order_book_raw(self, currency_name):
+        return await self._run(self._client.get_order_book_raw, currency_name)
+
+    async def get_order_book(self, currency_name):
+        return await self._run(self._client.get_order_book, currency_name)
+
+    async def get_executions_raw(self, currency_name, timestamp, max_data_num=1000, base_url=None):
+        return await self._run(self._client.get_executions_raw, currency_name, timestamp,
+                               max_data_num=max_data_num, base_url=base_url)
+
+    async def get_executions(self, currency_name, date, hour, window_seconds=DEFAULT_WINDOW_SECONDS,
+                             max_workers=DEFAULT_MAX_WORKERS):
+        return await self._run(self._client.get_executions, currency_name, date, hour,
+                               window_seconds=window_seconds, max_workers=max_workers)
+
+    async def get_executions_range(self, currency_name, start, end, window_seconds=DEFAULT_WINDOW_SECONDS,
+                                   max_workers=DEFAULT_MAX_WORKERS):
+        return await self._run(self._client.get_executions_range, currency_name, start, end,
+                               window_seconds=window_seconds, max_workers=max_workers)
+
+    async def get_candlestick_from_executions(self, currency_name, start, end, resolution, fill_empty=False,
+                                              window_seconds=DEFAULT_WINDOW_SECONDS,
+                                              max_workers=DEFAULT_MAX_WORKERS):
+        return await self._run(self._client.get_candlestick_from_executions, currency_name, start, end, resolution,
+                               fill_empty=fill_empty, window_seconds=window_seconds, max_workers=max_workers)
+
+    async def save_executions(self, currency_name, start, end, path):
+        return await self._run(self._client.save_executions, currency_name, start, end, path)
+
+    async def get_order_books(self, currency_names=None):
+        """
+        複数通貨の板情報を並行して取得
+        :param currency_names: 通貨名のリスト(省略時はJPY建ての全通貨)
+        :return: {通貨名: (売値DataFrame, 買値DataFrame, datetime)}
+        """
+        if currency_names is None:
+            currency_names = get_product_catalog().names(DEFAULT_QUOTE_CURRENCY)
+
+        results = await asyncio.gather(*[self.get_order_book(name) for name in currency_names])
+        return dict(zip(currency_names, results))
+
+
+class AsyncLiquidPrivate(_AsyncClient):
+    def __init__(self, token_id, secret_key, max_concurrency=DEFAULT_MAX_CONCURRENCY, endpoint=DEFAULT_ENDPOINT,
+                 session=None, signing_backend="hmac", balance_ttl=0.0, parse_numeric=False, **session_kwargs):
+        """
+        LiquidPrivateのasyncio版
+        :param token_id:
+        :param secret_key:
+        :param max_concurrency: 同時に実行するリクエストの最大数
+        :param endpoint: APIのベースURL
+        :param session: requests.SessionもしくはLiquidSession(他のクライアントと共有可能)
+        :param signing_backend: 署名の実装(hmac/pyjwt)
+        :param balance_ttl: 口座スナップショットを再利用する秒数
+        :param parse_numeric: Trueの場合はget_orders_raw・get_order_rawの数値の文字列をfloatに変換する
+        :param session_kwargs: LiquidSessionの設定
+        """
+        session_kwargs.setdefault("pool_maxsize", max_concurrency)
+        client = LiquidPrivate(token_id, secret_key, endpoint=endpoint, session=session,
+                               signing_backend=signing_backend, balance_ttl=balance_ttl,
+                               parse_numeric=parse_numeric, **session_kwargs)
+        super().__init__(client, max_concurrency)
+
+    async def create_order(self, currency_name, side, amount, price=0.0, order_type="limit"):
+        return await self._run(self._client.create_order, currency_name, side, amount,
+                               price=price, order_type=order_type)
+
+    async def create_orders(self, orders, max_workers=None):
+        if max_workers is None:
+            max_workers = self.max_concurrency
+        return await self._run(self._client.create_orders, orders, max_workers=max_workers)
+
+    async def cancel_orders(self, order_ids, max_workers=None):
+        if max_workers is None:
+            max_workers = self.max_concurrency
+        return await self._run(self._client.cancel_orders, order_ids, max_workers=max_workers)
+
+    async def get_order_info(self, limit_num=None):
+        return await self._run(self._client.get_order_info, limit_num=limit_num)
+
+    async def get_orders_raw(self, status=None, currency_name=None, limit_num=None, page=None):
+        return await self._run(self._client.get_orders_raw, status=status, currency_name=currency_name,
+                               limit_num=limit_num, page=page)
+
+    async def get_order_raw(self, order_id):
+        return await self._run(self._client.get_order_raw, order_id)
+
+    async def cancel_order(self, order_id):
+        return await self._run(self._client.cancel_order, order_id)
+
+    async def get_fiat_info(self):
+        return await self._run(self._client.get_fiat_info)
+
+    async def get_crypto_info(self, currency="btc"):
+        return await self._run(self._client.get_crypto_info, currency=currency)
+
+    async def get_asset_info(self, asset):
+        return await self._run(self._client.get_asset_info, asset)
+
+    async def get_account_snapshot(self, max_age=None):
+        return await self._run(self._client.get_account_snapshot, max_age=max_age)
+
+    async def get_balances(self, max_age=None):
+        return await self._run(self._client.get_balances, max_age=max_age)
@@ -0,0 +1,268 @@
+import argparse
+import datetime
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .public_api import LiquidPublic, _covers_date
+from .products import DEFAULT_QUOTE_CURRENCY, get_product_catalog
+from .rate_limit import configure_rate_limit
+from .cache import FILE_EXTENSIONS, default_file_format, write_dataframe
+
+# 定数
+DEFAULT_MAX_WORKERS = 4
+CHECKPOINT_FILE_NAME = "_checkpoint.json"
+
+
+def date_range(start_date, end_date):
+    """
+    開始日から終了日までの日付リストを作成
+    :param start_date: 開始日(yyyymmdd)
+    :param end_date: 終了日(yyyymmdd、この日を含む)
+    :return: yyyymmddの文字列のリスト
+    """
+    start = datetime.datetime.strptime(start_date, "%Y%m%d")
+    end = datetime.datetime.strptime(end_date, "%Y%m%d")
+    if start > end:
+        raise ValueError("終了日には開始日以降の日付を指定してください。")
+
+    dates = []
+    while start <= end:
+        dates.append(start.strftime("%Y%m%d"))
+        start += datetime.timedelta(days=1)
+    return dates
+
+
+class BulkDownloader:
+    def __init__(self, output_dir, client=None, max_workers=DEFAULT_MAX_WORKERS,
+                 requests_per_second=None, file_format=None, progress=None):
+        """
+        複数日・複数通貨の過去データを一括でダウンロードする
+        :param output_dir: 出力先ディレクトリ
+        :param client: LiquidPublic(省略時は作成する)
+        :param max_workers: 同時に取得するチャンク数
+        :param requests_per_second: 1秒あたりの最大リクエスト数。指定した場合は共有レートリミッタ(public)の設定を変更する
+            (省略時は現在の共有レートリミッタの制限を受ける)
+        :param file_format: parquet/feather/pickle/csv(省略時はpyarrowがあればparquet、なければcsv)
+        :param progress: チャンク完了ごとに(完了数, 総数, チャンクキー)で呼び出される関数
+        """
+        if file_format is None:
+            file_format = default_file_format(fallback="csv")
+        if file_format not in FILE_EXTENSIONS:
+            raise ValueError("file_formatにはparquet, feather, pickle, csvのいずれかを指定してください。")
+
+        self.output_dir = output_dir
+        self.max_workers = max_workers
+        self.file_format = file_format
+        self.progress = progress
+
+        self._owns_client = client is None
+        if client is None:
+            client = LiquidPublic(pool_maxsize=max_workers)
+        self.client = client
+        # 全ワーカー・プロセス内の他のクライアントと共通のレート制限
+        if requests_per_second is not None:
+            configure_rate_limit("public", requests_per_second)
+
+        self._checkpoint_path = os.path.join(output_dir, CHECKPOINT_FILE_NAME)
+        self._lock = threading.Lock()
+        os.makedirs(output_dir, exist_ok=True)
+        self._done = self._load_checkpoint()
+
+    def _load_checkpoint(self):
+        try:
+            with open(self._checkpoint_path, "r") as f:
+                return set(json.load(f))
+        except FileNotFoundError:
+            return set()
+
+    def _save_checkpoint(self):
+        # 中断されても壊れないよう一時ファイルに書いてから置き換える
+        tmp_path = self._checkpoint_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(sorted(self._done), f)
+        os.replace(tmp_path, self._checkpoint_path)
+
+    def _write_chunk(self, df, *partitions):
+        # 例: output_dir/executions/currency=btc/date=20220101/hour=09.parquet
+        directory = os.path.join(self.output_dir, *partitions[:-1])
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, partitions[-1] + FILE_EXTENSIONS[self.file_format])
+
+        tmp_path = path + ".tmp"
+        write_dataframe(df, tmp_path, self.file_format)
+        os.replace(tmp_path, path)
+
+    def _run(self, groups, fetch_group):
+        """
+        チャンクをワーカープールで取得する
+        :param groups: {タスクキー: チャンクキーのリスト}。1回のリクエストでまとめて取得できるチャンクを1つのタスクにする
+        :param fetch_group: タスクキーと未完了のチャンクキーのリストを受け取り、取得・保存する関数。
+            {チャンクキー: 確定済の期間をすべて取得した場合はTrue}を返す
+        :return: 完了・スキップ・失敗したチャンクの辞書
+        """
+        chunks = [chunk for group_chunks in groups.values() for chunk in group_chunks]
+        pending = {}
+        for key, group_chunks in groups.items():
+            pending_chunks = [chunk for chunk in group_chunks if chunk not in self._done]
+            if pending_chunks:
+                pending[key] = pending_chunks
+        pending_num = sum(len(pending_chunks) for pending_chunks in pending.values())
+        result = {
+            "completed": [],
+            "skipped": [chunk for chunk in chunks if chunk in self._done],
+            "failed": {},
+        }
+
+        num = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(fetch_group, key, pending_chunks): key
+                       for key, pending_chunks in pending.items()}
+            for future in as_completed(futures):
+                pending_chunks = pending[futures[future]]
+                try:
+                    is_closed = future.result()
+                except Exception as e:
+                    # 失敗したチャンクはチェックポイントに記録せず、再実行時に取得する
+                    for chunk in pending_chunks:
+                        result["failed"][chunk] = e
+                else:
+                    result["completed"].extend(pending_chunks)
+                    # 未確定・一部のみ取得した期間は記録せず、再実行時に取り直す
+                    closed_chunks = [chunk for chunk in pending_chunks if is_closed.get(chunk)]
+                    if closed_chunks:
+                        with self._lock:
+                            self._done.update(closed_chunks)
+                            self._save_checkpoint()
+
+                if self.progress is not None:
+                    for chunk in pending_chunks:
+                        num += 1
+                        self.progress(num, pending_num, chunk)
+
+        return result
+
+    def download_candlesticks(self, currency_names, start_date, end_date, candle_type):
+        """
+        ローソク足を一括ダウンロード
+        :param currency_names: 通貨名のリスト
+        :param start_date: 開始日(yyyymmdd)
+        :param end_date: 終了日(yyyymmdd、この日を含む)
+        :param candle_type: ローソク足範囲(1min/5min/15min/30min/1hour)
+        ohlcは直近の一定本数のみを返すため、通貨ごとに1回取得して日付ごとに分割する。
+        取得範囲が1日全体を含まない日付は、取得できた分のみ保存してチェックポイントには記録しない
+        """
+        groups = {
+            currency_name: [
+                "candlestick/" + candle_type + "/" + currency_name + "/" + date
+                for date in date_range(start_date, end_date)
+            ]
+            for currency_name in currency_names
+        }
+
+        def fetch_group(currency_name, chunks):
+            from .parser import parse_candlestick
+
+            all_df = parse_candlestick(self.client.get_candlestick_raw(currency_name, candle_type))
+            now = datetime.datetime.now()
+
+            is_closed = {}
+            for chunk in chunks:
+                date = chunk.split("/")[-1]
+                target_date = datetime.datetime.strptime(date, "%Y%m%d")
+                target_date_next = target_date + datetime.timedelta(days=1)
+                df = all_df.loc[(all_df["datetime"] >= target_date) & (all_df["datetime"] < target_date_next)]
+                if len(df) > 0:
+                    self._write_chunk(
+                        df.reset_index(drop=True),
+                        "candlestick", "candle_type=" + candle_type, "currency=" + currency_name, "date=" + date
+                    )
+                is_closed[chunk] = target_date_next <= now and \
+                    _covers_date(all_df["datetime"], target_date, target_date_next, candle_type)
+            return is_closed
+
+        return self._run(groups, fetch_group)
+
+    def download_executions(self, currency_names, start_date, end_date, hours=None):
+        """
+        約定履歴を一括ダウンロード
+        :param currency_names: 通貨名のリスト
+        :param start_date: 開始日(yyyymmdd)
+        :param end_date: 終了日(yyyymmdd、この日を含む)
+        :param hours: 取得対象の時間(hh)のリスト(省略時は00-23)
+        """
+        if hours is None:
+            hours = ["%02d" % hour for hour in range(24)]
+
+        chunks = [
+            "executions/" + currency_name + "/" + date + "/" + hour
+            for currency_name in currency_names
+            for date in date_range(start_date, end_date)
+            for hour in hours
+        ]
+
+        def fetch_group(chunk, _):
+            _, currency_name, date, hour = chunk.split("/")
+            # チャンク単位で並行取得するため、チャンク内は逐次取得する
+            df = self.client.get_executions(currency_name, date, hour, max_workers=1)
+            if len(df) > 0:
+                self._write_chunk(
+                    df, "executions", "currency=" + currency_name, "date=" + date, "hour=" + hour
+                )
+
+            hour_next = datetime.datetime.strptime(date + hour, "%Y%m%d%H") + datetime.timedelta(hours=1)
+            return {chunk: hour_next <= datetime.datetime.now()}
+
+        return self._run({chunk: [chunk] for chunk in chunks}, fetch_group)
+
+    def close(self):
+        if self._owns_client:
+            self.client.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def main(argv=None):
+    """
+    コマンドラインから一括ダウンロードを実行する
+    例: python -m python_liquid_api.bulk executions --currencies btc,eth --start 20220101 --end 20220107 -o ./data
+    """
+    parser = argparse.ArgumentParser(description="Liquidの過去データを一括ダウンロードします。")
+    parser.add_argument("kind", choices=["candlestick", "executions"], help="取得するデータの種類")
+    parser.add_argument("--currencies", default=",".join(get_product_catalog().names(DEFAULT_QUOTE_CURRENCY)),
+                        help="カンマ区切りの通貨名")
+    parser.add_argument("--start", required=True, help="開始日(yyyymmdd)")
+    parser.add_argument("--end", required=True, help="終了日(yyyymmdd)")
+    parser.add_argument("--candle-type", default="1min", help="ローソク足範囲(candlestickのみ)")
+    parser.add_argument("-o", "--output", required=True, help="出力先ディレクトリ")
+    parser.add_argument("--workers", type=int, default=DEFAULT_MAX_WORKERS, help="同時に取得するチャンク数")
+    parser.add_argument("--rps", type=float, default=None,
+                        help="1秒あたりの最大リクエスト数(省略時は共有レートリミッタの既定値)")
+    parser.add_argument("--format", default=None, choices=sorted(FILE_EXTENSIONS), help="出力形式")
+    args = parser.parse_args(argv)
+
+    def progress(num, total, chunk):
+        print("[" + str(num) + "/" + str(total) + "]", chunk)
+
+    currency_names = args.currencies.split(",")
+    with BulkDownloader(args.output, max_workers=args.workers, requests_per_second=args.rps,
+                        file_format=args.format, progress=progress) as downloader:
+        if args.kind == "candlestick":
+            result = downloader.download_candlesticks(currency_names, args.start, args.end, args.candle_type)
+        else:
+            result = downloader.download_executions(currency_names, args.start, args.end)
+
+    print("完了:", len(result["completed"]), "スキップ:", len(result["skipped"]), "失敗:", len(result["failed"]))
+    for chunk, error in result["failed"].items():
+        print("取得に失敗しました。", chunk, error)
+
+    return 1 if result["failed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,182 @@
+import os
+import threading
+import time
+
+import pandas as pd
+
+# 定数
+DEFAULT_MAX_BYTES = 1024 ** 3  # 1GB
+FILE_EXTENSIONS = {
+    "parquet": ".parquet",
+    "feather": ".feather",
+    "pickle": ".pkl",
+    "csv": ".csv",
+}
+
+
+def default_file_format(fallback="pickle"):
+    """
+    pyarrowがインストールされていればparquet、なければfallbackを返す
+    """
+    # Parquet/Featherにはpyarrowが必要
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return fallback
+    return "parquet"
+
+
+def read_dataframe(path, file_format):
+    if file_format == "parquet":
+        return pd.read_parquet(path)
+    elif file_format == "feather":
+        return pd.read_feather(path)
+    elif file_format == "csv":
+        return pd.read_csv(path)
+    return pd.read_pickle(path)
+
+
+def write_dataframe(df, path, file_format):
+    if file_format == "parquet":
+        df.to_parquet(path)
+    elif file_format == "feather":
+        df.reset_index(drop=True).to_feather(path)
+    elif file_format == "csv":
+        df.to_csv(path, index=False)
+    else:
+        df.to_pickle(path)
+
+
+class HistoricalCache:
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES, file_format=None):
+        """
+        確定済の過去データを保存するディスクキャッシュ
+        :param directory: 保存先ディレクトリ
+        :param max_bytes: キャッシュの最大サイズ。超えた場合は最も古く参照されたファイルから削除する
+        :param file_format: parquet/feather/pickle(省略時はpyarrowがあればparquet)
+        """
+        if file_format is None:
+            file_format = default_file_format()
+        # csvは型情報が失われるためキャッシュには使用しない
+        if file_format not in FILE_EXTENSIONS or file_format == "csv":
+            raise ValueError("file_formatにはparquet, feather, pickleのいずれかを指定してください。")
+
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.file_format = file_format
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._total_bytes = sum(size for _, size, _ in self._scan())
+
+    def _path(self, kind, currency_name, key):
+        return os.path.join(self.directory, kind, currency_name, str(key) + FILE_EXTENSIONS[self.file_format])
+
+    def _scan(self):
+        """
+        キャッシュファイルの一覧を取得
+        :return: [(パス, サイズ, 最終参照時刻), ...]
+        """
+        extension = FILE_EXTENSIONS[self.file_format]
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith(extension):
+                    path = os.path.join(root, name)
+                    stat = os.stat(path)
+                    files.append((path, stat.st_size, stat.st_mtime))
+        return files
+
+    def get(self, kind, currency_name, key):
+        """
+        キャッシュを取得
+        :param kind: データの種類(candlestick/executionsなど)
+        :param currency_name: 通貨名
+        :param key: 解像度・日付・時間などを含むキー
+        :return: DataFrame(キャッシュがない場合はNone)
+        """
+        path = self._path(kind, currency_name, key)
+        try:
+            df = read_dataframe(path, self.file_format)
+        except (FileNotFoundError, OSError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        # 最終参照時刻を更新(削除順の判定に使用)
+        now = time.time()
+        try:
+            os.utime(path, (now, now))
+        except OSError:
+            pass
+
+        with self._lock:
+            self.hits += 1
+        return df
+
+    def put(self, kind, currency_name, key, df):
+        """
+        キャッシュを保存
+        :param kind: データの種類
+        :param currency_name: 通貨名
+        :param key: 解像度・日付・時間などを含むキー
+        :param df: 保存するDataFrame
+        """
+        path = self._path(kind, currency_name, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # 書き込み途中のファイルを読まないよう一時ファイルに書いてから置き換える
+        tmp_path = path + ".tmp" + str(threading.get_ident())
+        write_dataframe(df, tmp_path, self.file_format)
+        size = os.path.getsize(tmp_path)
+
+        with self._lock:
+            if os.path.exists(path):
+                self._total_bytes -= os.path.getsize(path)
+            os.replace(tmp_path, path)
+            self._total_bytes += size
+            self._evict()
+
+    def _evict(self):
+        if self._total_bytes <= self.max_bytes:
+            return
+
+        # 最終参照時刻が古い順に削除
+        for path, size, _ in sorted(self._scan(), key=lambda f: f[2]):
+            if self._total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self._total_bytes -= size
+            self.evictions += 1
+
+    def clear(self):
+        """
+        キャッシュをすべて削除
+        """
+        with self._lock:
+            for path, _, _ in self._scan():
+                os.remove(path)
+            self._total_bytes = 0
+
+    @property
+    def total_bytes(self):
+        return self._total_bytes
+
+    def stats(self):
+        """
+        キャッシュの統計情報
+        :return: hits, misses, evictions, total_bytesの辞書
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "total_bytes": self._total_bytes,
+            }
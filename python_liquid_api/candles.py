@@ -0,0 +1,280 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from .parameter_dict import ParameterDict
+
+# 定数
+CANDLE_COLUMNS = ["datetime", "open", "high", "low", "close", "volume", "vwap", "count"]
+RESOLUTION_UNITS = {
+    "s": 1,
+    "sec": 1,
+    "min": 60,
+    "hour": 60 * 60,
+    "day": 60 * 60 * 24,
+}
+NANOSECONDS = 10 ** 9
+
+
+def parse_resolution(resolution):
+    """
+    足の長さを秒数に変換
+    :param resolution: 秒数(数値)もしくは文字列(1min, 5min, 1hourなどget_candlestickと同じ指定と、10s, 2hour, 1dayなど)
+    :return: 秒数(int)
+    """
+    if isinstance(resolution, (int, float, np.integer, np.floating)):
+        seconds = int(resolution)
+    else:
+        resolution2id = ParameterDict.resolution2id
+        if resolution in resolution2id:
+            seconds = int(resolution2id[resolution])
+        else:
+            matched = re.fullmatch(r"(\d+)\s*([a-z]+)", str(resolution).strip().lower())
+            if matched is None or matched.group(2) not in RESOLUTION_UNITS:
+                raise ValueError("足の長さが不正です。")
+            seconds = int(matched.group(1)) * RESOLUTION_UNITS[matched.group(2)]
+
+    if seconds <= 0:
+        raise ValueError("足の長さには正の値を指定してください。")
+    return seconds
+
+
+def _execution_arrays(executions_df, with_signs=False):
+    """
+    get_executionsのDataFrameから時刻(ナノ秒)・価格・数量の配列を取り出す(時刻順)
+    :param with_signs: Trueの場合はtaker_sideの符号(買い: 1, 売り: -1)の配列も返す
+    """
+    arrays = [
+        executions_df["timestamp"].to_numpy().astype("datetime64[ns]").view(np.int64),
+        executions_df["price"].to_numpy(dtype=np.float64),
+        executions_df["quantity"].to_numpy(dtype=np.float64),
+    ]
+    if with_signs:
+        taker_side = executions_df["taker_side"]
+        if isinstance(taker_side.dtype, pd.CategoricalDtype) and "sell" in taker_side.cat.categories:
+            # カテゴリ型は文字列を比較せずにコードで判定する
+            is_sell = taker_side.cat.codes.to_numpy() == taker_side.cat.categories.get_loc("sell")
+        else:
+            is_sell = taker_side.to_numpy() == "sell"
+        arrays.append(np.where(is_sell, -1.0, 1.0))
+
+    # 時刻順に並んでいない場合のみ並べ替える
+    times = arrays[0]
+    if len(times) > 1 and np.any(np.diff(times) < 0):
+        order = np.argsort(times, kind="stable")
+        arrays = [values[order] for values in arrays]
+    return tuple(arrays)
+
+
+def _reduce_bars(bar_times, prices, quantities, starts):
+    """
+    各足の先頭の位置(starts)で区切って足を作成する
+    :return: CANDLE_COLUMNSの列を持つ辞書(datetime以外はNumPy配列)
+    """
+    ends = np.append(starts[1:], len(prices))
+    volume = np.add.reduceat(quantities, starts)
+    notional = np.add.reduceat(prices * quantities, starts)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        vwap = notional / volume
+
+    return {
+        "datetime": bar_times,
+        "open": prices[starts],
+        "high": np.maximum.reduceat(prices, starts),
+        "low": np.minimum.reduceat(prices, starts),
+        "close": prices[ends - 1],
+        "volume": volume,
+        "vwap": vwap,
+        "count": (ends - starts).astype(np.int64),
+    }
+
+
+def _to_dataframe(bars):
+    bar_df = pd.DataFrame(bars, columns=CANDLE_COLUMNS)
+    bar_df["datetime"] = np.asarray(bars["datetime"], dtype=np.int64).view("datetime64[ns]")
+    return bar_df
+
+
+def _empty_bars():
+    bars = {column: np.empty(0, dtype=np.float64) for column in CANDLE_COLUMNS}
+    bars["datetime"] = np.empty(0, dtype=np.int64)
+    bars["count"] = np.empty(0, dtype=np.int64)
+    return bars
+
+
+def _time_bars(times, prices, quantities, seconds):
+    if len(times) == 0:
+        return _empty_bars()
+
+    width = seconds * NANOSECONDS
+    bins = times // width
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(bins)) + 1))
+    return _reduce_bars(bins[starts] * width, prices, quantities, starts)
+
+
+def _fill_empty_bars(bars, seconds):
+    """
+    約定がなかった時間の足を前の終値で埋める(出来高・約定回数は0、VWAPはnan)
+    """
+    if len(bars["datetime"]) == 0:
+        return bars
+
+    width = seconds * NANOSECONDS
+    first = bars["datetime"][0]
+    positions = (bars["datetime"] - first) // width
+    has_trade = np.zeros(positions[-1] + 1, dtype=bool)
+    has_trade[positions] = True
+    # 各時間に対応する足(約定がない場合は直前の足)の位置
+    index = np.cumsum(has_trade) - 1
+
+    close = bars["close"][index]
+    filled = {"datetime": first + np.arange(len(has_trade), dtype=np.int64) * width}
+    for column in ["open", "high", "low", "close"]:
+        filled[column] = np.where(has_trade, bars[column][index], close)
+    filled["volume"] = np.where(has_trade, bars["volume"][index], 0.0)
+    filled["vwap"] = np.where(has_trade, bars["vwap"][index], np.nan)
+    filled["count"] = np.where(has_trade, bars["count"][index], 0)
+    return filled
+
+
+def aggregate_candlestick(executions_df, resolution, fill_empty=False):
+    """
+    約定データから任意の長さの足(OHLCV・VWAP・約定回数)を作成する
+    :param executions_df: get_executions・get_executions_rangeの返り値
+    :param resolution: 足の長さ(秒数、もしくは1min・10s・2hour・1dayなどの文字列)
+    :param fill_empty: Trueの場合は約定がなかった時間の足を前の終値で埋める
+    :return: datetime(足の開始時刻), open/high/low/close/volume/vwap(float64), count(int64)のDataFrame
+    """
+    seconds = parse_resolution(resolution)
+    times, prices, quantities = _execution_arrays(executions_df)
+
+    bars = _time_bars(times, prices, quantities, seconds)
+    if fill_empty:
+        bars = _fill_empty_bars(bars, seconds)
+    return _to_dataframe(bars)
+
+
+def aggregate_tick_bars(executions_df, ticks):
+    """
+    約定回数ごとの足(ティックバー)を作成する
+    :param executions_df: get_executionsの返り値
+    :param ticks: 1本の足に含める約定回数
+    :return: aggregate_candlestickと同じ列のDataFrame(datetimeは足の最初の約定時刻)
+    """
+    if ticks <= 0:
+        raise ValueError("ticksには正の値を指定してください。")
+
+    times, prices, quantities = _execution_arrays(executions_df)
+    if len(times) == 0:
+        return _to_dataframe(_empty_bars())
+
+    starts = np.arange(0, len(times), int(ticks))
+    return _to_dataframe(_reduce_bars(times[starts], prices, quantities, starts))
+
+
+def aggregate_volume_bars(executions_df, volume):
+    """
+    出来高ごとの足(ボリュームバー)を作成する。
+    約定は分割せず、累積出来高がvolumeの倍数に達した約定までを1本の足とする
+    :param executions_df: get_executionsの返り値
+    :param volume: 1本の足の出来高
+    :return: aggregate_candlestickと同じ列のDataFrame(datetimeは足の最初の約定時刻)
+    """
+    if volume <= 0:
+        raise ValueError("volumeには正の値を指定してください。")
+
+    times, prices, quantities = _execution_arrays(executions_df)
+    if len(times) == 0:
+        return _to_dataframe(_empty_bars())
+
+    # 約定前の累積出来高で足を割り当てる(閾値を超えた約定はその足に含める)
+    cum_volumes = np.cumsum(quantities)
+    bar_ids = np.floor((cum_volumes - quantities) / volume)
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(bar_ids)) + 1))
+    return _to_dataframe(_reduce_bars(times[starts], prices, quantities, starts))
+
+
+class CandleAggregator:
+    def __init__(self, resolution):
+        """
+        新しい約定を受け取るたびに足を更新する。
+        確定した足は保持し、最新の足のみを更新するため、約定の件数に比例した処理で済む
+        :param resolution: 足の長さ(aggregate_candlestickと同じ指定)
+        """
+        self.seconds = parse_resolution(resolution)
+        self.late_count = 0  # 最新の足より前の時刻で届いたため捨てた約定の数
+        self._closed = []  # 確定した足(辞書)のリスト
+        self._current = None  # 最新の足(値はスカラー)
+
+    def update(self, executions_df):
+        """
+        約定を追加する
+        :param executions_df: get_executionsと同じ列のDataFrame(LiquidStreamで受信したものなど)
+        :return: 今回確定した足と更新中の最新の足のDataFrame
+        """
+        times, prices, quantities = _execution_arrays(executions_df)
+
+        if self._current is not None and len(times) > 0:
+            late = times < self._current["datetime"]
+            if np.any(late):
+                self.late_count += int(np.count_nonzero(late))
+                keep = ~late
+                times, prices, quantities = times[keep], prices[keep], quantities[keep]
+
+        bars = _time_bars(times, prices, quantities, self.seconds)
+        if len(bars["datetime"]) == 0:
+            return _to_dataframe(self._current_bars())
+
+        # 最新の足と同じ時間の足は統合する
+        current = self._current
+        if current is not None and bars["datetime"][0] == current["datetime"]:
+            first_notional = bars["vwap"][0] * bars["volume"][0]
+            current_notional = current["vwap"] * current["volume"]
+            bars["open"][0] = current["open"]
+            bars["high"][0] = max(bars["high"][0], current["high"])
+            bars["low"][0] = min(bars["low"][0], current["low"])
+            bars["volume"][0] += current["volume"]
+            bars["count"][0] += current["count"]
+            bars["vwap"][0] = (first_notional + current_notional) / bars["volume"][0]
+        elif current is not None:
+            bars = {column: np.append(current[column], bars[column]) for column in CANDLE_COLUMNS}
+
+        # 最後の足以外は確定
+        if len(bars["datetime"]) > 1:
+            self._closed.append({column: values[:-1] for column, values in bars.items()})
+        self._current = {column: values[-1] for column, values in bars.items()}
+
+        return _to_dataframe(bars)
+
+    def _current_bars(self):
+        if self._current is None:
+            return _empty_bars()
+        return {column: np.asarray([value]) for column, value in self._current.items()}
+
+    @property
+    def closed_count(self):
+        """
+        確定した足の本数
+        """
+        return sum(len(bars["datetime"]) for bars in self._closed)
+
+    def to_dataframe(self, include_current=True):
+        """
+        作成した足をDataFrameに変換
+        :param include_current: Trueの場合は更新中の最新の足を含める
+        """
+        # 確定した足は1つの配列にまとめておき、次回以降の連結を減らす
+        if len(self._closed) > 1:
+            self._closed = [{column: np.concatenate([bars[column] for bars in self._closed])
+                             for column in CANDLE_COLUMNS}]
+
+        parts = list(self._closed)
+        if include_current and self._current is not None:
+            parts.append(self._current_bars())
+        if len(parts) == 0:
+            return _to_dataframe(_empty_bars())
+
+        bars = {column: np.concatenate([part[column] for part in parts]) for column in CANDLE_COLUMNS}
+        return _to_dataframe(bars)
@@ -0,0 +1,177 @@
+import collections
+import threading
+import time
+
+from .instrumentation import endpoint_name, get_instrumentation
+
+# 定数
+DEFAULT_TTL = 0.0  # 0の場合は実行中のリクエストの共有のみ行う
+DEFAULT_MAX_ENTRIES = 1024
+
+# 有効なRequestCoalescer(無効の場合はNone)
+_active = None
+
+
+class _InFlight:
+    __slots__ = ("event", "response", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.response = None
+        self.error = None
+
+
+class RequestCoalescer:
+    def __init__(self, default_ttl=DEFAULT_TTL, ttls=None, max_entries=DEFAULT_MAX_ENTRIES):
+        """
+        同じURLへのGETリクエストをまとめる。
+        実行中のリクエストと同じURLへのリクエストは新たに送信せずにそのレスポンスを共有し、
+        ステータス200のレスポンスはエンドポイントごとのTTLの間保持して再利用する(最大max_entries件、古い順に削除)
+        :param default_ttl: レスポンスを保持する秒数(ttlsにないエンドポイント)
+        :param ttls: {エンドポイント名: 秒数}。エンドポイント名は/products/{id}/price_levelsの形式
+        :param max_entries: 保持するレスポンスの最大数
+        """
+        if default_ttl < 0:
+            raise ValueError("default_ttlには0以上を指定してください。")
+        if max_entries < 0:
+            raise ValueError("max_entriesには0以上を指定してください。")
+
+        self.default_ttl = default_ttl
+        self.ttls = dict(ttls or {})
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._responses = collections.OrderedDict()  # {URL: (有効期限, レスポンス)}
+        self._in_flight = {}
+
+        # 計測値
+        self.hits = 0
+        self.shared = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def ttl(self, url):
+        """
+        URLのレスポンスを保持する秒数
+        """
+        return self.ttls.get(endpoint_name(url), self.default_ttl)
+
+    def fetch(self, url, send):
+        """
+        URLのレスポンスを取得する(保持しているレスポンスか実行中のリクエストがあればそれを使う)
+        :param url: リクエストするURL
+        :param send: リクエストを送信してrequests.Responseを返す関数
+        :return: requests.Response(複数の呼び出し元で共有するため変更しないこと)
+        """
+        with self._lock:
+            entry = self._responses.get(url)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._responses.move_to_end(url)
+                    self.hits += 1
+                    self._count(url, "hit")
+                    return entry[1]
+                del self._responses[url]
+
+            in_flight = self._in_flight.get(url)
+            is_leader = in_flight is None
+            if is_leader:
+                in_flight = self._in_flight[url] = _InFlight()
+                self.misses += 1
+            else:
+                self.shared += 1
+                self._count(url, "shared")
+
+        if not is_leader:
+            in_flight.event.wait()
+            if in_flight.error is not None:
+                raise in_flight.error
+            return in_flight.response
+
+        try:
+            response = send()
+            # 本文を読み込んでおき、複数のスレッドから同時に参照できるようにする
+            response.content
+            in_flight.response = response
+        except BaseException as e:
+            in_flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[url]
+                if in_flight.error is None:
+                    self._store(url, in_flight.response)
+            in_flight.event.set()
+
+        return response
+
+    def _store(self, url, response):
+        ttl = self.ttl(url)
+        if ttl <= 0 or self.max_entries == 0 or response.status_code != 200:
+            return
+        self._responses[url] = (time.monotonic() + ttl, response)
+        self._responses.move_to_end(url)
+        while len(self._responses) > self.max_entries:
+            self._responses.popitem(last=False)
+            self.evictions += 1
+
+    def _count(self, url, result):
+        instrumentation = get_instrumentation()
+        if instrumentation is not None:
+            instrumentation.increment("coalesced_requests_total", (endpoint_name(url), result))
+
+    def clear(self):
+        """
+        保持しているレスポンスをすべて削除する
+        """
+        with self._lock:
+            self._responses.clear()
+
+    def metrics(self):
+        """
+        計測値
+        - hits: 保持しているレスポンスを返した回数
+        - shared: 実行中のリクエストのレスポンスを共有した回数
+        - misses: リクエストを送信した回数
+        - evictions: 上限を超えたため削除したレスポンス数
+        - entries: 保持しているレスポンス数
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "shared": self.shared,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._responses),
+            }
+
+
+def enable_coalescing(default_ttl=DEFAULT_TTL, ttls=None, max_entries=DEFAULT_MAX_ENTRIES, coalescer=None):
+    """
+    Public APIのGETリクエストをまとめる(全セッションで共有)
+    :param default_ttl: レスポンスを保持する秒数(0の場合は実行中のリクエストの共有のみ)
+    :param ttls: {エンドポイント名: 秒数}
+    :param max_entries: 保持するレスポンスの最大数
+    :param coalescer: 使用するRequestCoalescer(指定した場合は他の引数を無視する)
+    :return: 有効になったRequestCoalescer
+    """
+    global _active
+    if coalescer is None:
+        coalescer = RequestCoalescer(default_ttl=default_ttl, ttls=ttls, max_entries=max_entries)
+    _active = coalescer
+    return coalescer
+
+
+def disable_coalescing():
+    """
+    リクエストをまとめないようにする
+    """
+    global _active
+    _active = None
+
+
+def get_coalescer():
+    """
+    有効なRequestCoalescer(無効の場合はNone)
+    """
+    return _active
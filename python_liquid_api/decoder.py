@@ -0,0 +1,114 @@
+import json
+
+# 定数
+JSON_BACKENDS = ["orjson", "ujson", "json"]  # 速い順
+# Liquid APIが文字列で返す数値の項目
+NUMERIC_FIELDS = (
+    "price", "quantity", "filled_quantity", "timestamp", "balance", "reserved_balance",
+    "last_traded_price", "market_bid", "market_ask", "volume_24h",
+    # [[価格, 数量], ...]・[[UNIX時間, 始値, 高値, 低値, 終値, 出来高], ...]の形式の項目(行の要素を変換する)
+    "buy_price_levels", "sell_price_levels", "data",
+)
+
+
+def _load_backend(name):
+    """
+    JSONのデコード関数を取得する(インストールされていない場合はNone)
+    """
+    if name == "json":
+        return json.loads
+    try:
+        module = __import__(name)
+    except ImportError:
+        return None
+    return module.loads
+
+
+def _select_backend():
+    for name in JSON_BACKENDS:
+        loads = _load_backend(name)
+        if loads is not None:
+            return name, loads
+
+
+_backend_name, _loads = _select_backend()
+
+
+def get_json_backend():
+    """
+    使用中のJSONデコーダの名前(orjson/ujson/json)
+    """
+    return _backend_name
+
+
+def set_json_backend(name):
+    """
+    JSONデコーダを変更する
+    :param name: orjson/ujson/json
+    """
+    global _backend_name, _loads
+    if name not in JSON_BACKENDS:
+        raise ValueError("JSONデコーダにはorjson・ujson・jsonのいずれかを指定してください。")
+    loads = _load_backend(name)
+    if loads is None:
+        raise ValueError(name + "がインストールされていません。")
+    _backend_name, _loads = name, loads
+
+
+def decode_json(content):
+    """
+    JSONをデコードする
+    :param content: JSONのバイト列もしくは文字列
+    """
+    return _loads(content)
+
+
+def _parse_rows(rows):
+    for row in rows:
+        for i, value in enumerate(row):
+            if type(value) is str:
+                row[i] = float(value)
+
+
+def parse_numeric(data, fields=NUMERIC_FIELDS):
+    """
+    数値の文字列の項目をfloatに変換する(辞書、辞書のリスト、{"models": [辞書, ...]}を直接書き換える)。
+    板の価格帯(buy_price_levels・sell_price_levels)やローソク足(data)のようにリストのリストの項目は各行の要素を変換する
+    :param data: デコードしたJSON
+    :param fields: 変換する項目名
+    :return: 変換したデータ
+    """
+    if isinstance(data, list):
+        if len(data) == 0 or not isinstance(data[0], dict):
+            return data
+        # 同じ形式の辞書が並ぶため、先頭の辞書にある項目のみを変換する
+        present_fields = [field for field in fields if field in data[0]]
+        for record in data:
+            for field in present_fields:
+                value = record.get(field)
+                if type(value) is str:
+                    record[field] = float(value)
+    elif isinstance(data, dict):
+        for field in fields:
+            value = data.get(field)
+            if isinstance(value, str):
+                data[field] = float(value)
+            elif isinstance(value, list) and len(value) > 0 and isinstance(value[0], list):
+                _parse_rows(value)
+        # ページングされた一覧(models)の中の辞書も変換する
+        for value in data.values():
+            if isinstance(value, list) and len(value) > 0 and isinstance(value[0], dict):
+                parse_numeric(value, fields)
+    return data
+
+
+def decode_response(response, numeric_fields=None):
+    """
+    レスポンスの本文(バイト列)を文字列に変換せずにデコードする
+    :param response: requests.Response
+    :param numeric_fields: floatに変換する項目名(Noneの場合は変換しない)
+    """
+    data = _loads(response.content)
+    if numeric_fields is not None:
+        parse_numeric(data, numeric_fields)
+    return data
@@ -0,0 +1,466 @@
+import threading
+import time
+
+import numpy as np
+
+from .parameter_dict import ParameterDict
+from .products import DEFAULT_QUOTE_CURRENCY, get_product_catalog
+from .tick_store import CANDLE_DTYPE, candlestick_to_records
+
+# 定数
+DEFAULT_NAME = "liquid"
+DEFAULT_SLOT_NUM = 4
+DEFAULT_MAX_LEVELS = 1000  # 片側の価格帯数の上限(超えた分は約定しにくい側から切り捨てる)
+DEFAULT_MAX_CANDLES = 1000
+DEFAULT_CANDLE_INTERVAL = 10.0
+MAX_READ_RETRIES = 100
+MAGIC = 0x4C51444D  # "LQDM"
+# 共有メモリの先頭: [MAGIC, 最新のシーケンス番号, スロット数, スロットあたりの要素数]
+HEADER_DTYPE = np.dtype([("magic", "<i8"), ("sequence", "<i8"), ("slot_num", "<i8"), ("capacity", "<i8")])
+# スロットの先頭。sequenceは書き込み中は2*シーケンス番号-1、書き込み後は2*シーケンス番号
+SLOT_HEADER_DTYPE = np.dtype([("sequence", "<i8"), ("count_a", "<i8"), ("count_b", "<i8"), ("timestamp", "<f8")])
+PRICE_LEVEL_DTYPE = np.dtype(("<f8", (2,)))  # [価格, 数量]
+
+_attach_lock = threading.Lock()
+
+
+def _import_shared_memory():
+    try:
+        from multiprocessing import shared_memory
+    except ImportError:
+        raise ImportError("共有メモリにはPython 3.8以上が必要です。")
+    return shared_memory
+
+
+def segment_name(name, currency_name, kind):
+    """
+    共有メモリの名前(例: liquid_btc_book, liquid_btc_ohlc_1min)
+    """
+    return name + "_" + currency_name + "_" + kind
+
+
+class _SharedRing:
+    def __init__(self, segment, item_dtype, slot_num=None, capacity=None):
+        """
+        共有メモリ上のリングバッファ。書き込むたびに次のスロットへ書き、シーケンス番号で世代を管理する(seqlock)。
+        読み込み側はロックを取らず、スロットのシーケンス番号が読み込みの前後で変わっていないことを確認する
+        :param segment: 名前を指定して作成もしくは接続した共有メモリ
+        :param item_dtype: 要素の型
+        :param slot_num: スロット数(作成する場合のみ)
+        :param capacity: スロットあたりの要素数(作成する場合のみ)
+        """
+        self.segment = segment
+        self.item_dtype = item_dtype
+        self.header = np.ndarray((), dtype=HEADER_DTYPE, buffer=segment.buf)
+
+        if slot_num is not None:
+            self.header["magic"] = MAGIC
+            self.header["sequence"] = 0
+            self.header["slot_num"] = slot_num
+            self.header["capacity"] = capacity
+        elif self.header["magic"] != MAGIC:
+            raise ValueError(segment.name + "はMarketDataPublisherが作成した共有メモリではありません。")
+
+        self.slot_num = int(self.header["slot_num"])
+        self.capacity = int(self.header["capacity"])
+        slot_size = self.slot_size(item_dtype, self.capacity)
+
+        self.slot_headers = []
+        self.slot_items = []
+        for i in range(self.slot_num):
+            offset = HEADER_DTYPE.itemsize + i * slot_size
+            self.slot_headers.append(np.ndarray((), dtype=SLOT_HEADER_DTYPE, buffer=segment.buf, offset=offset))
+            self.slot_items.append(np.ndarray((self.capacity,), dtype=item_dtype, buffer=segment.buf,
+                                              offset=offset + SLOT_HEADER_DTYPE.itemsize))
+
+    @staticmethod
+    def slot_size(item_dtype, capacity):
+        size = SLOT_HEADER_DTYPE.itemsize + item_dtype.itemsize * capacity
+        return -(-size // 8) * 8
+
+    @classmethod
+    def segment_size(cls, item_dtype, slot_num, capacity):
+        return HEADER_DTYPE.itemsize + cls.slot_size(item_dtype, capacity) * slot_num
+
+    @property
+    def sequence(self):
+        return int(self.header["sequence"])
+
+    def write(self, write_items, timestamp):
+        """
+        次のスロットに書き込んで公開する(書き込みは1スレッドのみ)
+        :param write_items: スロットの要素の配列を受け取って書き込み、(count_a, count_b)を返す関数
+        :param timestamp: データの時刻
+        :return: シーケンス番号
+        """
+        sequence = self.sequence + 1
+        index = sequence % self.slot_num
+        slot_header = self.slot_headers[index]
+
+        slot_header["sequence"] = 2 * sequence - 1
+        count_a, count_b = write_items(self.slot_items[index])
+        slot_header["count_a"] = count_a
+        slot_header["count_b"] = count_b
+        slot_header["timestamp"] = timestamp
+        slot_header["sequence"] = 2 * sequence
+        self.header["sequence"] = sequence
+        return sequence
+
+    def read(self, extract):
+        """
+        最新のスロットを読み込む
+        :param extract: スロットの要素の配列・count_a・count_bを受け取って必要な部分を取り出す関数。
+        ビューを返した場合はis_currentで上書きされていないことを確認すること
+        :return: (シーケンス番号, timestamp, extractの返り値)。データがない場合はNone
+        """
+        for _ in range(MAX_READ_RETRIES):
+            sequence = self.sequence
+            if sequence == 0:
+                return None
+
+            index = sequence % self.slot_num
+            slot_header = self.slot_headers[index]
+            if int(slot_header["sequence"]) != 2 * sequence:
+                # 最新のシーケンス番号を読んだ後に書き込みが追い越した場合
+                continue
+            timestamp = float(slot_header["timestamp"])
+            value = extract(self.slot_items[index], int(slot_header["count_a"]), int(slot_header["count_b"]))
+            # 読み込み中に書き込まれていなければ有効
+            if int(slot_header["sequence"]) == 2 * sequence:
+                return sequence, timestamp, value
+
+        raise RuntimeError(self.segment.name + "の読み込み中に書き込みが続いたため読み込めませんでした。")
+
+    def is_current(self, sequence):
+        """
+        シーケンス番号のスロットがまだ上書きされていないかどうか
+        """
+        return int(self.slot_headers[sequence % self.slot_num]["sequence"]) == 2 * sequence
+
+    def close(self):
+        # ビューを解放してから共有メモリを閉じる
+        self.header = None
+        self.slot_headers = []
+        self.slot_items = []
+        try:
+            self.segment.close()
+        except BufferError:
+            # 呼び出し元がビューを保持している場合は、プロセスの終了時に解放される
+            pass
+
+
+def _write_order_book(order_book, max_levels):
+    """
+    OrderBookの買い板・売り板をスロットに書き込む関数(買い板は先頭から、売り板はmax_levels番目から)
+    """
+    def write_items(items):
+        bid_num = min(len(order_book.bid_prices), max_levels)
+        ask_num = min(len(order_book.ask_prices), max_levels)
+        items[:bid_num, 0] = order_book.bid_prices[:bid_num]
+        items[:bid_num, 1] = order_book.bid_volumes[:bid_num]
+        items[max_levels:max_levels + ask_num, 0] = order_book.ask_prices[:ask_num]
+        items[max_levels:max_levels + ask_num, 1] = order_book.ask_volumes[:ask_num]
+        return bid_num, ask_num
+    return write_items
+
+
+class MarketDataPublisher:
+    def __init__(self, client=None, currency_names=None, candle_types=None, name=DEFAULT_NAME,
+                 slot_num=DEFAULT_SLOT_NUM, max_levels=DEFAULT_MAX_LEVELS, max_candles=DEFAULT_MAX_CANDLES,
+                 order_book_interval=1.0, candle_interval=DEFAULT_CANDLE_INTERVAL, **poller_kwargs):
+        """
+        1つのプロセスで板情報とローソク足を取得し、共有メモリのリングバッファに書き込む。
+        他のプロセスはMarketDataReaderで読み込むため、プロセス数によらずAPIへのリクエストは1組で済む。
+        板情報はOrderBookPollerでポーリングし、変化した場合のみ書き込む
+        :param client: LiquidPublic(省略時は新規に作成)
+        :param currency_names: 通貨名のリスト(省略時はJPY建ての全通貨)
+        :param candle_types: 書き込むローソク足範囲のリスト(1min, 5minなど。省略時はローソク足を書き込まない)
+        :param name: 共有メモリの名前の接頭辞(MarketDataReaderと同じ値を指定する)
+        :param slot_num: リングバッファのスロット数。読み込み中のスロットはslot_num-1回の書き込みまで上書きされない
+        :param max_levels: 片側の価格帯数の上限
+        :param max_candles: ローソク足の本数の上限(新しい順に残す)
+        :param order_book_interval: 板情報のポーリング間隔(秒)
+        :param candle_interval: ローソク足を取得する間隔(秒)
+        :param poller_kwargs: OrderBookPollerのその他の設定(min_interval, max_interval, adaptiveなど)
+        """
+        from .poller import OrderBookPoller
+
+        shared_memory = _import_shared_memory()
+        if slot_num < 2:
+            raise ValueError("slot_numには2以上を指定してください。")
+
+        if client is None:
+            from .public_api import LiquidPublic
+            client = LiquidPublic()
+        if currency_names is None:
+            currency_names = get_product_catalog().names(DEFAULT_QUOTE_CURRENCY)
+        candle_types = list(candle_types or [])
+        for candle_type in candle_types:
+            if candle_type not in ParameterDict.resolution2id:
+                raise ValueError("ローソク足範囲が不正です。")
+
+        self.client = client
+        self.name = name
+        self.max_levels = max_levels
+        self.candle_types = candle_types
+        self.candle_interval = candle_interval
+
+        self._rings = {}
+        try:
+            for currency_name in currency_names:
+                self._create_ring(shared_memory, currency_name, "book", PRICE_LEVEL_DTYPE, slot_num, 2 * max_levels)
+                for candle_type in candle_types:
+                    self._create_ring(shared_memory, currency_name, "ohlc_" + candle_type, CANDLE_DTYPE, slot_num,
+                                      max_candles)
+        except BaseException:
+            self.close()
+            raise
+
+        self.poller = OrderBookPoller(client, currency_names, interval=order_book_interval,
+                                      on_change=self._on_order_book_change, **poller_kwargs)
+        self._stop_event = threading.Event()
+        self._candle_thread = None
+
+    def _create_ring(self, shared_memory, currency_name, kind, item_dtype, slot_num, capacity):
+        segment = shared_memory.SharedMemory(
+            name=segment_name(self.name, currency_name, kind), create=True,
+            size=_SharedRing.segment_size(item_dtype, slot_num, capacity),
+        )
+        self._rings[(currency_name, kind)] = _SharedRing(segment, item_dtype, slot_num, capacity)
+
+    def _on_order_book_change(self, event):
+        self.publish_order_book(event["currency_name"], event["order_book"])
+
+    def publish_order_book(self, currency_name, order_book):
+        """
+        板を書き込む(OrderBookPollerを使わずに書き込む場合にも使用できる)
+        :param currency_name: 通貨名
+        :param order_book: OrderBook
+        :return: シーケンス番号
+        """
+        ring = self._rings[(currency_name, "book")]
+        timestamp = order_book.timestamp if order_book.timestamp is not None else time.time()
+        return ring.write(_write_order_book(order_book, self.max_levels), timestamp)
+
+    def publish_candlestick(self, currency_name, candle_type, raw_data):
+        """
+        ローソク足を書き込む
+        :param currency_name: 通貨名
+        :param candle_type: ローソク足範囲
+        :param raw_data: get_candlestick_rawの返り値
+        :return: シーケンス番号
+        """
+        ring = self._rings[(currency_name, "ohlc_" + candle_type)]
+        records = candlestick_to_records(raw_data)[-ring.capacity:]
+
+        def write_items(items):
+            items[:len(records)] = records
+            return len(records), 0
+
+        timestamp = float(records["timestamp"][-1]) if len(records) > 0 else time.time()
+        return ring.write(write_items, timestamp)
+
+    def poll_candlesticks(self):
+        """
+        全通貨・全ローソク足範囲のローソク足を1回ずつ取得して書き込む
+        """
+        for currency_name, kind in list(self._rings):
+            if kind == "book":
+                continue
+            candle_type = kind[len("ohlc_"):]
+            self.publish_candlestick(currency_name, candle_type,
+                                     self.client.get_candlestick_raw(currency_name, candle_type))
+
+    def _run_candles(self):
+        while not self._stop_event.is_set():
+            try:
+                self.poll_candlesticks()
+            except Exception:
+                # 取得に失敗した場合は次の周期で再取得する
+                pass
+            self._stop_event.wait(self.candle_interval)
+
+    def start(self):
+        """
+        別スレッドで板情報とローソク足の取得・書き込みを開始する
+        """
+        self._stop_event.clear()
+        self.poller.start()
+        if len(self.candle_types) > 0:
+            self._candle_thread = threading.Thread(target=self._run_candles, daemon=True)
+            self._candle_thread.start()
+        return self
+
+    def stop(self):
+        """
+        取得・書き込みを停止する(共有メモリは残る)
+        """
+        self._stop_event.set()
+        self.poller.stop()
+        if self._candle_thread is not None:
+            self._candle_thread.join()
+            self._candle_thread = None
+
+    def close(self):
+        """
+        停止して共有メモリを削除する
+        """
+        if getattr(self, "poller", None) is not None:
+            self.stop()
+        for ring in self._rings.values():
+            segment = ring.segment
+            ring.close()
+            segment.unlink()
+        self._rings = {}
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def sequences(self):
+        """
+        書き込んだ回数 {(通貨名, 種類): シーケンス番号}。種類はbookもしくはohlc_1minなど
+        """
+        return {key: ring.sequence for key, ring in self._rings.items()}
+
+
+class MarketDataReader:
+    def __init__(self, name=DEFAULT_NAME):
+        """
+        MarketDataPublisherが共有メモリに書き込んだ板情報・ローソク足を読み込む(ロックを取らない)
+        :param name: 共有メモリの名前の接頭辞(MarketDataPublisherと同じ値を指定する)
+        """
+        self.name = name
+        self._shared_memory = _import_shared_memory()
+        self._rings = {}
+        self._lock = threading.Lock()
+
+    def _ring(self, currency_name, kind, item_dtype):
+        key = (currency_name, kind)
+        ring = self._rings.get(key)
+        if ring is not None:
+            return ring
+
+        with self._lock:
+            ring = self._rings.get(key)
+            if ring is None:
+                segment = _attach(self._shared_memory, segment_name(self.name, currency_name, kind))
+                ring = self._rings[key] = _SharedRing(segment, item_dtype)
+        return ring
+
+    def sequence(self, currency_name, kind="book"):
+        """
+        最新のシーケンス番号(書き込まれていない場合は0)。前回と比較して更新を確認できる
+        :param currency_name: 通貨名
+        :param kind: bookもしくはohlc_1minなど
+        """
+        if kind == "book":
+            return self._ring(currency_name, kind, PRICE_LEVEL_DTYPE).sequence
+        return self._ring(currency_name, kind, CANDLE_DTYPE).sequence
+
+    def order_book(self, currency_name, copy=True):
+        """
+        最新の板を読み込む
+        :param currency_name: 通貨名
+        :param copy: Falseの場合は共有メモリのビューを返す(コピーしない)。
+        使用後にis_current(通貨名, sequence)で上書きされていないことを確認する
+        :return: sequence, timestamp, buy_price_levels, sell_price_levelsの辞書(書き込まれていない場合はNone)
+        """
+        ring = self._ring(currency_name, "book", PRICE_LEVEL_DTYPE)
+        max_levels = ring.capacity // 2
+
+        def extract(items, bid_num, ask_num):
+            buy_price_levels = items[:bid_num]
+            sell_price_levels = items[max_levels:max_levels + ask_num]
+            if copy:
+                return buy_price_levels.copy(), sell_price_levels.copy()
+            return buy_price_levels, sell_price_levels
+
+        result = ring.read(extract)
+        if result is None:
+            return None
+
+        sequence, timestamp, (buy_price_levels, sell_price_levels) = result
+        return {
+            "sequence": sequence,
+            "timestamp": timestamp,
+            "buy_price_levels": buy_price_levels,
+            "sell_price_levels": sell_price_levels,
+        }
+
+    def update_order_book(self, currency_name, order_book=None):
+        """
+        最新の板でローカルの板(OrderBook)を更新する(LiquidPublic.update_order_bookの共有メモリ版)
+        :param currency_name: 通貨名
+        :param order_book: 更新対象のOrderBook(省略時は新規作成)
+        :return: OrderBook, 前回との差分(書き込まれていない場合はNone)
+        """
+        from .order_book import OrderBook
+
+        if order_book is None:
+            order_book = OrderBook(currency_name)
+        snapshot = self.order_book(currency_name)
+        if snapshot is None:
+            return order_book, None
+        return order_book, order_book.update(snapshot)
+
+    def candlestick(self, currency_name, candle_type, copy=True):
+        """
+        最新のローソク足を読み込む
+        :param currency_name: 通貨名
+        :param candle_type: ローソク足範囲
+        :param copy: Falseの場合は共有メモリのビューを返す(コピーしない)
+        :return: (シーケンス番号, timestamp, open, high, low, close, volumeの構造化配列)。書き込まれていない場合はNone
+        """
+        def extract(items, candle_num, _):
+            return items[:candle_num].copy() if copy else items[:candle_num]
+
+        result = self._ring(currency_name, "ohlc_" + candle_type, CANDLE_DTYPE).read(extract)
+        if result is None:
+            return None
+        sequence, _, candles = result
+        return sequence, candles
+
+    def is_current(self, currency_name, sequence, kind="book"):
+        """
+        copy=Falseで読み込んだデータがまだ上書きされていないかどうか
+        """
+        return self._rings[(currency_name, kind)].is_current(sequence)
+
+    def close(self):
+        """
+        共有メモリとの接続を閉じる(共有メモリは削除しない)
+        """
+        with self._lock:
+            for ring in self._rings.values():
+                ring.close()
+            self._rings = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def _attach(shared_memory, name):
+    """
+    既存の共有メモリに接続する。
+    接続しただけの共有メモリがプロセスの終了時に削除されないよう、resource_trackerには登録しない
+    (Python 3.12以前は接続した側でも登録されるため、登録処理を一時的に無効にする)
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        pass
+
+    from multiprocessing import resource_tracker
+    with _attach_lock:
+        register = resource_tracker.register
+        resource_tracker.register = lambda *args, **kwargs: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
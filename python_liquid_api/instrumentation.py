@@ -0,0 +1,430 @@
+import bisect
+import collections
+import functools
+import os
+import re
+import threading
+import time
+from urllib.parse import urlsplit
+
+# 定数
+DEFAULT_LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DEFAULT_SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+DEFAULT_MAX_SPANS = 10000
+METRIC_PREFIX = "liquid_"
+# 計測項目: (説明, バケット)
+HISTOGRAMS = {
+    "request_duration_seconds": ("リクエストの所要時間(再送を含む)", DEFAULT_LATENCY_BUCKETS),
+    "request_ttfb_seconds": ("レスポンスヘッダを受信するまでの時間", DEFAULT_LATENCY_BUCKETS),
+    "response_bytes": ("レスポンス本文のサイズ", DEFAULT_SIZE_BUCKETS),
+    "rate_limit_wait_seconds": ("レートリミッタの待機時間", DEFAULT_LATENCY_BUCKETS),
+    "json_decode_seconds": ("JSONのデコード時間", DEFAULT_LATENCY_BUCKETS),
+    "dataframe_build_seconds": ("DataFrameの作成時間", DEFAULT_LATENCY_BUCKETS),
+}
+# 計測項目: (説明, ラベル名)
+COUNTERS = {
+    "requests_total": ("リクエスト数", ("endpoint", "method", "status")),
+    "request_retries_total": ("再送回数", ("endpoint", "method")),
+    "request_errors_total": ("通信エラー(タイムアウト・切断など)で失敗したリクエスト数", ("endpoint", "method", "error")),
+    "coalesced_requests_total": ("送信せずに共有・再利用したリクエスト数", ("endpoint", "result")),
+}
+ID_SEGMENT = re.compile(r"^\d+$")
+
+# 有効なInstrumentation(無効の場合はNone)
+_active = None
+
+
+def endpoint_name(url):
+    """
+    URLを計測用のエンドポイント名に変換する(ホスト・クエリを除き、数値のパスは{id}にまとめる)
+    例: https://api.liquid.com/products/5/ohlc?resolution=60 -> /products/{id}/ohlc
+    """
+    path = urlsplit(url).path
+    segments = ["{id}" if ID_SEGMENT.match(segment) else segment for segment in path.strip("/").split("/")]
+    return "/" + "/".join(segments)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        """
+        累積バケットのヒストグラム(Prometheusのhistogramと同じ形式)
+        :param buckets: バケットの上限値(昇順)
+        """
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # 最後は+Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative_counts(self):
+        counts = []
+        total = 0
+        for count in self.counts:
+            total += count
+            counts.append(total)
+        return counts
+
+    def quantile(self, q):
+        """
+        バケットから分位点を推定する(バケット内は線形補間)
+        """
+        if self.count == 0:
+            return float("nan")
+        rank = q * self.count
+        lower = 0.0
+        total = 0
+        for upper, count in zip(self.buckets, self.counts):
+            if total + count >= rank and count > 0:
+                return lower + (upper - lower) * (rank - total) / count
+            total += count
+            lower = upper
+        return self.buckets[-1]
+
+
+class Instrumentation:
+    def __init__(self, max_spans=DEFAULT_MAX_SPANS, span_exporter=None, record_spans=True):
+        """
+        リクエスト・JSONのデコード・DataFrameの作成の計測値を集計する
+        :param max_spans: 保持するスパンの最大数(古いものから破棄する)
+        :param span_exporter: スパンが終了するたびに呼び出される関数(OpenTelemetryのエクスポータへの受け渡しなど)
+        :param record_spans: Falseの場合はスパンを保持せず、ヒストグラムのみを集計する
+        """
+        self.span_exporter = span_exporter
+        self.record_spans = record_spans
+        self._pre_request_hooks = []
+        self._post_request_hooks = []
+        self._histograms = {}  # {(項目, エンドポイント): Histogram}
+        self._counters = collections.defaultdict(int)  # {(項目, ラベルのタプル): 値}
+        self._spans = collections.deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def add_pre_request_hook(self, hook):
+        """
+        リクエストの送信前に呼び出される関数を登録する
+        :param hook: hook(info)。infoはmethod, url, endpoint, attemptを持つ辞書
+        """
+        self._pre_request_hooks.append(hook)
+
+    def add_post_request_hook(self, hook):
+        """
+        レスポンスの受信後(再送を含めて完了した後)に呼び出される関数を登録する
+        :param hook: hook(record)。recordはmethod, url, endpoint, status_code, duration, ttfb, response_bytes,
+        retries, rate_limit_wait, errorを持つ辞書(通信エラーの場合はstatus_code・ttfb・response_bytesがNone、errorが例外)
+        """
+        self._post_request_hooks.append(hook)
+
+    def observe(self, name, endpoint, value):
+        """
+        ヒストグラムに値を追加する
+        :param name: 計測項目(HISTOGRAMSのキー)
+        :param endpoint: エンドポイント名
+        :param value: 値
+        """
+        key = (name, endpoint)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(HISTOGRAMS[name][1])
+            histogram.observe(value)
+
+    def increment(self, name, labels, value=1):
+        with self._lock:
+            self._counters[(name, labels)] += value
+
+    def histogram(self, name, endpoint):
+        """
+        ヒストグラムを取得する(計測値がない場合はNone)
+        """
+        with self._lock:
+            return self._histograms.get((name, endpoint))
+
+    # リクエスト
+    def before_request(self, method, url, attempt):
+        info = {"method": method, "url": url, "endpoint": endpoint_name(url), "attempt": attempt}
+        for hook in self._pre_request_hooks:
+            hook(info)
+
+    def after_request(self, method, url, response, start_time, end_time, retries, rate_limit_wait):
+        endpoint = endpoint_name(url)
+        duration = end_time - start_time
+        # requestsのelapsedはリクエストの送信からレスポンスヘッダの解析までの時間
+        ttfb = response.elapsed.total_seconds() if response.elapsed is not None else duration
+        response_bytes = len(response.content)
+
+        self.observe("request_duration_seconds", endpoint, duration)
+        self.observe("request_ttfb_seconds", endpoint, ttfb)
+        self.observe("response_bytes", endpoint, response_bytes)
+        self.observe("rate_limit_wait_seconds", endpoint, rate_limit_wait)
+        self.increment("requests_total", (endpoint, method, str(response.status_code)))
+        if retries > 0:
+            self.increment("request_retries_total", (endpoint, method), retries)
+
+        record = {
+            "method": method,
+            "url": url,
+            "endpoint": endpoint,
+            "status_code": response.status_code,
+            "duration": duration,
+            "ttfb": ttfb,
+            "response_bytes": response_bytes,
+            "retries": retries,
+            "rate_limit_wait": rate_limit_wait,
+            "error": None,
+        }
+        self._finish_span("HTTP " + method + " " + endpoint, start_time, end_time, {
+            "http.method": method,
+            "http.url": url,
+            "http.status_code": response.status_code,
+            "http.response_content_length": response_bytes,
+            "liquid.endpoint": endpoint,
+            "liquid.retries": retries,
+        })
+
+        for hook in self._post_request_hooks:
+            hook(record)
+
+    def request_failed(self, method, url, error, start_time, end_time, retries, rate_limit_wait):
+        """
+        レスポンスを受信できなかったリクエスト(タイムアウト・切断など)を記録する
+        """
+        endpoint = endpoint_name(url)
+        duration = end_time - start_time
+        error_name = type(error).__name__
+
+        self.observe("request_duration_seconds", endpoint, duration)
+        self.observe("rate_limit_wait_seconds", endpoint, rate_limit_wait)
+        self.increment("requests_total", (endpoint, method, "error"))
+        self.increment("request_errors_total", (endpoint, method, error_name))
+        if retries > 0:
+            self.increment("request_retries_total", (endpoint, method), retries)
+
+        record = {
+            "method": method,
+            "url": url,
+            "endpoint": endpoint,
+            "status_code": None,
+            "duration": duration,
+            "ttfb": None,
+            "response_bytes": None,
+            "retries": retries,
+            "rate_limit_wait": rate_limit_wait,
+            "error": error,
+        }
+        self._finish_span("HTTP " + method + " " + endpoint, start_time, end_time, {
+            "http.method": method,
+            "http.url": url,
+            "liquid.endpoint": endpoint,
+            "liquid.retries": retries,
+            "error": repr(error),
+        })
+
+        for hook in self._post_request_hooks:
+            hook(record)
+
+    # スパン
+    def _span_stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _new_context(self):
+        """
+        新しいスパンのID(同じスレッドで実行中のspanがあればその子にする)
+        """
+        stack = self._span_stack()
+        parent = stack[-1] if len(stack) > 0 else None
+        return {
+            "trace_id": parent["trace_id"] if parent is not None else os.urandom(16).hex(),
+            "span_id": os.urandom(8).hex(),
+            "parent_span_id": parent["span_id"] if parent is not None else None,
+        }
+
+    def _finish_span(self, name, start_time, end_time, attributes, context=None):
+        if not self.record_spans and self.span_exporter is None:
+            return
+
+        if context is None:
+            context = self._new_context()
+        span = {
+            "name": name,
+            "trace_id": context["trace_id"],
+            "span_id": context["span_id"],
+            "parent_span_id": context["parent_span_id"],
+            # perf_counterの時刻をUNIX時間(ナノ秒)に換算する
+            "start_time_unix_nano": int((start_time - _PERF_COUNTER_ORIGIN + _TIME_ORIGIN) * 1e9),
+            "end_time_unix_nano": int((end_time - _PERF_COUNTER_ORIGIN + _TIME_ORIGIN) * 1e9),
+            "attributes": attributes,
+        }
+        if self.record_spans:
+            with self._lock:
+                self._spans.append(span)
+        if self.span_exporter is not None:
+            self.span_exporter(span)
+
+    def span(self, name, **attributes):
+        """
+        任意の処理をスパンとして計測するコンテキストマネージャ。
+        この中で送信したリクエストなどは子のスパンになる
+        """
+        return _SpanContext(self, name, attributes)
+
+    def spans(self, clear=False):
+        """
+        保持しているスパン(OpenTelemetryのSpanと同じ項目を持つ辞書)のリスト
+        :param clear: Trueの場合は取得したスパンを破棄する
+        """
+        with self._lock:
+            spans = list(self._spans)
+            if clear:
+                self._spans.clear()
+        return spans
+
+    # 出力
+    def summary(self):
+        """
+        エンドポイントごとの計測値の要約 {(項目, エンドポイント): {count, sum, mean, p50, p95, p99}}
+        """
+        with self._lock:
+            items = list(self._histograms.items())
+        return {
+            key: {
+                "count": histogram.count,
+                "sum": histogram.sum,
+                "mean": histogram.sum / histogram.count if histogram.count > 0 else float("nan"),
+                "p50": histogram.quantile(0.5),
+                "p95": histogram.quantile(0.95),
+                "p99": histogram.quantile(0.99),
+            }
+            for key, histogram in items
+        }
+
+    def to_prometheus(self):
+        """
+        Prometheusのテキスト形式に変換する
+        """
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+
+        lines = []
+        for name, (description, _) in HISTOGRAMS.items():
+            entries = [(key[1], histogram) for key, histogram in histograms if key[0] == name]
+            if len(entries) == 0:
+                continue
+            metric = METRIC_PREFIX + name
+            lines.append("# HELP " + metric + " " + description)
+            lines.append("# TYPE " + metric + " histogram")
+            for endpoint, histogram in entries:
+                label = 'endpoint="' + endpoint + '"'
+                for upper, count in zip(histogram.buckets + ("+Inf",), histogram.cumulative_counts()):
+                    lines.append("%s_bucket{%s,le=\"%s\"} %d" % (metric, label, upper, count))
+                lines.append("%s_sum{%s} %r" % (metric, label, histogram.sum))
+                lines.append("%s_count{%s} %d" % (metric, label, histogram.count))
+
+        for name, (description, label_names) in COUNTERS.items():
+            entries = [(key[1], value) for key, value in counters if key[0] == name]
+            if len(entries) == 0:
+                continue
+            metric = METRIC_PREFIX + name
+            lines.append("# HELP " + metric + " " + description)
+            lines.append("# TYPE " + metric + " counter")
+            for labels, value in entries:
+                label = ",".join('%s="%s"' % pair for pair in zip(label_names, labels))
+                lines.append("%s{%s} %d" % (metric, label, value))
+
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        """
+        計測値とスパンを破棄する
+        """
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self._spans.clear()
+
+
+class _SpanContext:
+    def __init__(self, instrumentation, name, attributes):
+        self.instrumentation = instrumentation
+        self.name = name
+        self.attributes = attributes
+        self.context = None
+        self.start_time = None
+
+    def __enter__(self):
+        self.context = self.instrumentation._new_context()
+        self.instrumentation._span_stack().append(self.context)
+        self.start_time = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        end_time = time.perf_counter()
+        self.instrumentation._span_stack().pop()
+        if exc_type is not None:
+            self.attributes["error"] = repr(exc_value)
+        self.instrumentation._finish_span(self.name, self.start_time, end_time, self.attributes, self.context)
+
+
+# perf_counterとUNIX時間の対応
+_TIME_ORIGIN = time.time()
+_PERF_COUNTER_ORIGIN = time.perf_counter()
+
+
+def enable_instrumentation(instrumentation=None):
+    """
+    計測を有効にする
+    :param instrumentation: 使用するInstrumentation(省略時は新規に作成)
+    :return: 有効になったInstrumentation
+    """
+    global _active
+    if instrumentation is None:
+        instrumentation = Instrumentation()
+    _active = instrumentation
+    return instrumentation
+
+
+def disable_instrumentation():
+    """
+    計測を無効にする(無効の場合、計測箇所はNoneの判定のみで何もしない)
+    """
+    global _active
+    _active = None
+
+
+def get_instrumentation():
+    """
+    有効なInstrumentation(無効の場合はNone)
+    """
+    return _active
+
+
+def timed(name, endpoint=None):
+    """
+    関数の実行時間をヒストグラムに記録するデコレータ(計測が無効の場合はそのまま呼び出す)
+    :param name: 計測項目(HISTOGRAMSのキー)
+    :param endpoint: エンドポイント名(省略時は関数名)
+    """
+    def decorator(func):
+        label = endpoint or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            instrumentation = _active
+            if instrumentation is None:
+                return func(*args, **kwargs)
+
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            end = time.perf_counter()
+            instrumentation.observe(name, label, end - start)
+            instrumentation._finish_span(label, start, end, {"liquid.operation": name})
+            return result
+        return wrapper
+    return decorator
@@ -0,0 +1,215 @@
+import datetime
+
+import numpy as np
+
+# 定数
+SIDES = ("buy", "sell")
+
+
+def _empty():
+    return np.empty(0, dtype=np.float64)
+
+
+def _level_diff(old_prices, old_volumes, new_prices, new_volumes):
+    """
+    2つの価格帯の差分を求める
+    :return: (変化した価格, 数量の変化量)。消えた価格帯は負の変化量になる
+    """
+    prices = np.union1d(old_prices, new_prices)
+    changes = np.zeros(len(prices), dtype=np.float64)
+    # 価格帯は重複しないため、union1dの結果に対するsearchsortedで位置を特定できる
+    changes[np.searchsorted(prices, new_prices)] += new_volumes
+    changes[np.searchsorted(prices, old_prices)] -= old_volumes
+
+    changed = changes != 0
+    return prices[changed], changes[changed]
+
+
+class _BookSide:
+    def __init__(self, descending):
+        """
+        板の片側(価格は約定しやすい順)
+        :param descending: Trueの場合は価格の降順(買い板)
+        """
+        self.descending = descending
+        self.prices = _empty()
+        self.volumes = _empty()
+        self.cum_volumes = _empty()
+        self.cum_notionals = _empty()
+        # 二分探索用のキー(常に昇順。買い板は価格の符号を反転して保持する)
+        self.keys = _empty()
+
+    def update(self, price_levels):
+        levels = np.asarray(price_levels, dtype=np.float64).reshape(-1, 2)
+        prices = levels[:, 0]
+        volumes = levels[:, 1]
+
+        # APIは約定しやすい順に返すが、念のため整列されていない場合のみ並べ替える
+        steps = np.diff(prices)
+        if (self.descending and np.any(steps > 0)) or (not self.descending and np.any(steps < 0)):
+            order = np.argsort(-prices if self.descending else prices, kind="stable")
+            prices = prices[order]
+            volumes = volumes[order]
+
+        # 差分を求めてから配列を更新する
+        diff = _level_diff(self.prices, self.volumes, prices, volumes)
+
+        # 同じサイズの場合は既存の配列を再利用する
+        if len(prices) == len(self.prices):
+            np.copyto(self.prices, prices)
+            np.copyto(self.volumes, volumes)
+            np.cumsum(volumes, out=self.cum_volumes)
+            np.multiply(prices, volumes, out=self.cum_notionals)
+            np.cumsum(self.cum_notionals, out=self.cum_notionals)
+            if self.descending:
+                np.negative(prices, out=self.keys)
+            else:
+                np.copyto(self.keys, prices)
+        else:
+            self.prices = prices
+            self.volumes = volumes
+            self.cum_volumes = np.cumsum(volumes)
+            self.cum_notionals = np.cumsum(prices * volumes)
+            self.keys = -prices if self.descending else prices.copy()
+
+        return diff
+
+    def depth(self, price):
+        """
+        指定価格までの累積数量
+        """
+        key = -price if self.descending else price
+        index = np.searchsorted(self.keys, key, side="right")
+        return float(self.cum_volumes[index - 1]) if index > 0 else 0.0
+
+    def impact(self, size):
+        """
+        指定数量を成行で約定させた場合の平均価格と最終価格
+        """
+        if size <= 0:
+            raise ValueError("sizeには正の値を指定してください。")
+        if len(self.cum_volumes) == 0 or size > self.cum_volumes[-1]:
+            # 板の厚みが足りない場合
+            return float("nan"), float("nan")
+
+        index = int(np.searchsorted(self.cum_volumes, size, side="left"))
+        filled_volume = self.cum_volumes[index - 1] if index > 0 else 0.0
+        filled_notional = self.cum_notionals[index - 1] if index > 0 else 0.0
+        notional = filled_notional + (size - filled_volume) * self.prices[index]
+
+        return float(notional / size), float(self.prices[index])
+
+
+class OrderBook:
+    def __init__(self, currency_name=None):
+        """
+        ポーリングした板情報を保持するローカルの板。
+        新しいスナップショットで配列を更新し、最良気配・累積数量・約定価格をDataFrameを作らずに計算する。
+        :param currency_name: 通貨名
+        """
+        self.currency_name = currency_name
+        self.timestamp = None
+        self._bids = _BookSide(descending=True)  # 買い板(buy_price_levels)
+        self._asks = _BookSide(descending=False)  # 売り板(sell_price_levels)
+
+    def update(self, order_book_raw):
+        """
+        板情報の生データで更新する
+        :param order_book_raw: get_order_book_rawの返り値
+        :return: 前回との差分 {"bids": (価格, 数量の変化量), "asks": (価格, 数量の変化量)}
+        """
+        return self.update_levels(order_book_raw["buy_price_levels"], order_book_raw["sell_price_levels"],
+                                  order_book_raw["timestamp"])
+
+    def update_levels(self, buy_price_levels=None, sell_price_levels=None, timestamp=None):
+        """
+        片側ずつ板を更新する(ストリーミングで買い板・売り板が別々に届く場合に使用する)
+        :param buy_price_levels: 買い板の価格帯(Noneの場合は更新しない)
+        :param sell_price_levels: 売り板の価格帯(Noneの場合は更新しない)
+        :param timestamp: 板の時刻(UNIX時間)
+        :return: 前回との差分 {"bids": (価格, 数量の変化量), "asks": (価格, 数量の変化量)}
+        """
+        no_diff = (_empty(), _empty())
+        bid_diff = self._bids.update(buy_price_levels) if buy_price_levels is not None else no_diff
+        ask_diff = self._asks.update(sell_price_levels) if sell_price_levels is not None else no_diff
+        if timestamp is not None:
+            self.timestamp = float(timestamp)
+
+        return {"bids": bid_diff, "asks": ask_diff}
+
+    @property
+    def datetime(self):
+        if self.timestamp is None:
+            return None
+        return datetime.datetime.fromtimestamp(self.timestamp)
+
+    @property
+    def bid_prices(self):
+        return self._bids.prices
+
+    @property
+    def bid_volumes(self):
+        return self._bids.volumes
+
+    @property
+    def ask_prices(self):
+        return self._asks.prices
+
+    @property
+    def ask_volumes(self):
+        return self._asks.volumes
+
+    @property
+    def best_bid(self):
+        return float(self._bids.prices[0]) if len(self._bids.prices) > 0 else float("nan")
+
+    @property
+    def best_ask(self):
+        return float(self._asks.prices[0]) if len(self._asks.prices) > 0 else float("nan")
+
+    @property
+    def spread(self):
+        return self.best_ask - self.best_bid
+
+    @property
+    def mid_price(self):
+        return (self.best_ask + self.best_bid) / 2
+
+    def _side(self, side):
+        if side not in SIDES:
+            raise ValueError("sideにはbuyもしくはsellを指定してください。")
+        # 買い注文は売り板、売り注文は買い板で約定する
+        return self._asks if side == "buy" else self._bids
+
+    def depth(self, side, price):
+        """
+        指定価格までに約定できる累積数量
+        :param side: 注文の売買(buy: 売り板を参照, sell: 買い板を参照)
+        :param price: 価格
+        """
+        return self._side(side).depth(price)
+
+    def impact_price(self, side, size):
+        """
+        指定数量を成行で注文した場合の平均約定価格(VWAP)
+        :param side: 注文の売買(buy/sell)
+        :param size: 注文量
+        :return: 平均約定価格(板の厚みが足りない場合はnan)
+        """
+        return self._side(side).impact(size)[0]
+
+    def worst_price(self, side, size):
+        """
+        指定数量を成行で注文した場合に約定する最も不利な価格
+        """
+        return self._side(side).impact(size)[1]
+
+    def to_dataframe(self):
+        """
+        DataFrameに変換(bid_df, ask_df)
+        """
+        import pandas as pd
+
+        bid_df = pd.DataFrame({"price": self._bids.prices, "volume": self._bids.volumes})
+        ask_df = pd.DataFrame({"price": self._asks.prices, "volume": self._asks.volumes})
+        return bid_df, ask_df
@@ -0,0 +1,213 @@
+import threading
+
+from .products import get_product_catalog
+
+# 定数
+ORDER_PAGE_SIZE = 100
+CLOSED_STATUSES = {"filled": "filled", "cancelled": "cancelled"}
+ORDER_COLUMNS = ["order_id", "currency", "side", "order_type", "price", "quantity", "filled_quantity", "status",
+                 "created_at", "updated_at"]
+
+
+def parse_order(data):
+    """
+    注文の生データを数値型の辞書に変換
+    """
+    return {
+        "order_id": str(data["id"]),
+        # JPY建ての場合はbtcなどの取引通貨名、それ以外はethbtcなどの通貨ペア名
+        "currency": get_product_catalog().currency_name(data.get("product_id"), data["currency_pair_code"]),
+        "side": data["side"],
+        "order_type": data["order_type"],
+        "price": float(data["price"]),
+        "quantity": float(data["quantity"]),
+        "filled_quantity": float(data["filled_quantity"]),
+        "status": data.get("status"),
+        "created_at": int(data["created_at"]),
+        "updated_at": int(data["updated_at"]),
+    }
+
+
+class OrderTracker:
+    def __init__(self, client, currency_name=None, on_event=None):
+        """
+        未約定の注文を手元に保持し、変化した注文のみを処理する。
+        ポーリングでは未約定の注文一覧(status=live)と、前回までに見た最新の更新日時以降に約定・キャンセルされた注文を取得する。
+        ポーリングの間に注文・約定した注文も検知し、一覧から消えたがどちらにも含まれない注文だけを個別に取得する
+        :param client: LiquidPrivate
+        :param currency_name: 対象の通貨名(省略時は全通貨)
+        :param on_event: イベントごとに呼び出される関数
+        """
+        self.client = client
+        self.currency_name = currency_name
+        self.last_updated_at = 0
+        self._open_orders = {}
+        self._closed_seen = {}  # 処理済の約定・キャンセル済の注文 {取引ID: 更新日時}(last_updated_at以降のもののみ)
+        self._started = False
+        self._subscribers = []
+        self._lock = threading.Lock()
+
+        if on_event is not None:
+            self.subscribe(on_event)
+
+    def subscribe(self, callback):
+        """
+        イベントを受け取る関数を登録する
+        :param callback: イベント(辞書)を引数に取る関数
+        """
+        self._subscribers.append(callback)
+
+    def _fetch_live_orders(self):
+        orders = []
+        page = 1
+        while True:
+            models = self.client.get_orders_raw(status="live", currency_name=self.currency_name,
+                                                limit_num=ORDER_PAGE_SIZE, page=page)
+            orders.extend(models)
+            if len(models) < ORDER_PAGE_SIZE:
+                return orders
+            page += 1
+
+    def _fetch_closed_orders(self, since, max_pages=None):
+        """
+        約定・キャンセル済の注文のうち更新日時がsince以降のもの。
+        新しい順に取得し、sinceより前の注文を含むページで止める
+        """
+        orders = []
+        for status in CLOSED_STATUSES:
+            page = 1
+            while True:
+                models = self.client.get_orders_raw(status=status, currency_name=self.currency_name,
+                                                    limit_num=ORDER_PAGE_SIZE, page=page)
+                recent = [data for data in models if int(data["updated_at"]) >= since]
+                orders.extend(recent)
+                if len(recent) < len(models) or len(models) < ORDER_PAGE_SIZE \
+                        or (max_pages is not None and page >= max_pages):
+                    break
+                page += 1
+        return orders
+
+    def poll(self):
+        """
+        注文の変化を取得してイベントを発行する
+        :return: イベントのリスト
+        - type: new(新規注文) / fill(一部約定) / filled(全量約定) / cancelled(キャンセル)
+        - order_id: 取引ID
+        - order: 注文情報
+        - filled_delta: 前回から約定した数量
+        """
+        live_orders = self._fetch_live_orders()
+        started = self._started
+        if started:
+            closed_orders = self._fetch_closed_orders(self.last_updated_at)
+        else:
+            # 初回は既存の注文履歴をイベントにせず、最新の更新日時のみ記録する
+            closed_orders = self._fetch_closed_orders(0, max_pages=1)
+        closed_orders.sort(key=lambda data: int(data["updated_at"]))
+
+        events = []
+        with self._lock:
+            live_ids = set()
+            for data in live_orders:
+                order_id = str(data["id"])
+                live_ids.add(order_id)
+                known = self._open_orders.get(order_id)
+
+                # 更新日時が変わっていない注文は処理しない
+                if known is not None and int(data["updated_at"]) <= known["updated_at"]:
+                    continue
+
+                order = parse_order(data)
+                self._open_orders[order_id] = order
+                self.last_updated_at = max(self.last_updated_at, order["updated_at"])
+
+                if known is None:
+                    events.append(self._event("new", order, order["filled_quantity"]))
+                    continue
+                filled_delta = order["filled_quantity"] - known["filled_quantity"]
+                if filled_delta > 0:
+                    events.append(self._event("fill", order, filled_delta))
+
+            # 約定・キャンセル済の一覧に含まれる注文(ポーリングの間に注文・約定した注文を含む)
+            closed_listed = set()
+            for data in closed_orders:
+                order_id = str(data["id"])
+                closed_listed.add(order_id)
+                if order_id in self._closed_seen:
+                    continue
+
+                order = parse_order(data)
+                self._closed_seen[order_id] = order["updated_at"]
+                self.last_updated_at = max(self.last_updated_at, order["updated_at"])
+                known = self._open_orders.pop(order_id, None)
+                if not started:
+                    continue
+
+                filled_quantity = known["filled_quantity"] if known is not None else 0.0
+                events.append(self._event(CLOSED_STATUSES[order["status"]], order,
+                                          order["filled_quantity"] - filled_quantity))
+
+            # 次回の取得範囲より前の注文は重複を確認する必要がない
+            self._closed_seen = {order_id: updated_at for order_id, updated_at in self._closed_seen.items()
+                                 if updated_at >= self.last_updated_at}
+            self._started = True
+
+            closed_ids = [order_id for order_id in self._open_orders
+                          if order_id not in live_ids and order_id not in closed_listed]
+
+        # どちらの一覧にも含まれない注文のみ個別に取得して、約定かキャンセルかを判定する
+        for order_id in closed_ids:
+            order = parse_order(self.client.get_order_raw(order_id))
+            with self._lock:
+                known = self._open_orders.pop(order_id, None)
+                if order["status"] in CLOSED_STATUSES:
+                    self._closed_seen[order_id] = order["updated_at"]
+            if known is None:
+                continue
+
+            filled_delta = order["filled_quantity"] - known["filled_quantity"]
+            event_type = CLOSED_STATUSES.get(order["status"])
+            if event_type is None:
+                # 状態が確定していない場合は次回のポーリングで再確認する
+                with self._lock:
+                    self._open_orders[order_id] = known
+                continue
+            events.append(self._event(event_type, order, filled_delta))
+
+        for event in events:
+            for callback in self._subscribers:
+                callback(event)
+
+        return events
+
+    @staticmethod
+    def _event(event_type, order, filled_delta):
+        return {
+            "type": event_type,
+            "order_id": order["order_id"],
+            "order": order,
+            "filled_delta": filled_delta,
+        }
+
+    @property
+    def open_orders(self):
+        """
+        未約定の注文 {取引ID: 注文情報}
+        """
+        with self._lock:
+            return dict(self._open_orders)
+
+    def to_dataframe(self):
+        """
+        未約定の注文をDataFrameに変換
+        """
+        import pandas as pd
+        from .parser import timestamps_to_datetime
+
+        with self._lock:
+            orders = list(self._open_orders.values())
+
+        df = pd.DataFrame(orders, columns=ORDER_COLUMNS)
+        df["created_at"] = timestamps_to_datetime(df["created_at"].to_numpy())
+        df["updated_at"] = timestamps_to_datetime(df["updated_at"].to_numpy())
+        return df.set_index("order_id")
@@ -0,0 +1,106 @@
+from concurrent.futures import ThreadPoolExecutor
+
+# 定数
+DEFAULT_WINDOW_SECONDS = 900  # 1ウィンドウあたりの秒数(15分)
+DEFAULT_MAX_WORKERS = 4
+# APIは指定timestampより後の約定を返すため、境界上の約定を落とさないよう少し前から取得する
+LOOKBACK_SECONDS = 1.0
+
+
+def split_time_range(start_timestamp, end_timestamp, window_seconds=DEFAULT_WINDOW_SECONDS):
+    """
+    取得対象期間をウィンドウに分割する
+    :param start_timestamp: 開始UNIX時間
+    :param end_timestamp: 終了UNIX時間(この時刻は含まない)
+    :param window_seconds: 1ウィンドウあたりの秒数
+    :return: [(開始, 終了), ...]
+    """
+    if window_seconds <= 0:
+        raise ValueError("window_secondsには正の値を指定してください。")
+
+    windows = []
+    window_start = float(start_timestamp)
+    end_timestamp = float(end_timestamp)
+    while window_start < end_timestamp:
+        window_end = min(window_start + window_seconds, end_timestamp)
+        windows.append((window_start, window_end))
+        window_start = window_end
+
+    return windows
+
+
+def iter_execution_pages(fetch_page, start_timestamp, end_timestamp):
+    """
+    1ウィンドウ分の約定データをページ単位で取得する。
+    各ページからは取得済のidと期間外のレコードを除いて返す。
+    :param fetch_page: timestampを受け取って約定生データのリストを返す関数
+    :param start_timestamp: 開始UNIX時間
+    :param end_timestamp: 終了UNIX時間(この時刻は含まない)
+    """
+    cursor = float(start_timestamp) - LOOKBACK_SECONDS
+    # 直前のページの最終timestampと同じtimestampを持つidのみ保持する
+    boundary_ids = set()
+
+    while cursor < end_timestamp:
+        raw_data = fetch_page(cursor)
+
+        # 約定データが取得できなかった場合は終了
+        if len(raw_data) == 0:
+            break
+
+        page = []
+        for record in raw_data:
+            if record["id"] in boundary_ids:
+                continue
+            timestamp = float(record["timestamp"])
+            if start_timestamp <= timestamp < end_timestamp:
+                page.append(record)
+
+        last_timestamp = float(raw_data[-1]["timestamp"])
+        # 新しいレコードが含まれない場合(約定データがすべて取得済の場合)は終了
+        if last_timestamp <= cursor and len(page) == 0:
+            break
+
+        if len(page) > 0:
+            yield page
+
+        # 最後のレコードのtimestampを次の取得地点とする
+        if last_timestamp > cursor:
+            boundary_ids = set()
+        cursor = last_timestamp
+        boundary_ids.update(record["id"] for record in raw_data if float(record["timestamp"]) == last_timestamp)
+
+
+def fetch_executions(fetch_page, start_timestamp, end_timestamp, window_seconds=DEFAULT_WINDOW_SECONDS,
+                     max_workers=DEFAULT_MAX_WORKERS):
+    """
+    期間をウィンドウに分割し、約定データを並行して取得する
+    :param fetch_page: timestampを受け取って約定生データのリストを返す関数
+    :param start_timestamp: 開始UNIX時間
+    :param end_timestamp: 終了UNIX時間(この時刻は含まない)
+    :param window_seconds: 1ウィンドウあたりの秒数
+    :param max_workers: 同時に取得するウィンドウ数
+    :return: 約定生データのリスト(時刻順・id重複なし)
+    """
+    def fetch_window(window):
+        records = []
+        for page in iter_execution_pages(fetch_page, window[0], window[1]):
+            records.extend(page)
+        return records
+
+    windows = split_time_range(start_timestamp, end_timestamp, window_seconds)
+    if len(windows) == 0:
+        return []
+
+    if max_workers <= 1 or len(windows) == 1:
+        results = [fetch_window(window) for window in windows]
+    else:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(windows))) as executor:
+            results = list(executor.map(fetch_window, windows))
+
+    # ウィンドウは重複しないため、結合するだけで時刻順になる
+    records = []
+    for window_records in results:
+        records.extend(window_records)
+
+    return records
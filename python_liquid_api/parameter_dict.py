@@ -1,24 +1,14 @@
+from .utils import CANDLE_TYPES, CURRENCY_ID
+
+
 class ParameterDict:
     def __init__(self):
         pass
 
-    name2id = {
-        "btc": "5",
-        "eth": "29",
-        "xrp": "83",
-        "bch": "41",
-        "qash": "50",
-        "ltc": "847",
-        "bat": "846",
-    }
+    # 既定の通貨ペア(APIから取得した通貨ペアはproducts.get_product_catalogを使用する)
+    name2id = CURRENCY_ID
 
-    resolution2id = {
-        "1min": "60",
-        "5min": "300",
-        "15min": "900",
-        "30min": "1800",
-        "1hour": "3600",
-    }
+    resolution2id = CANDLE_TYPES
 
     side_list = [
         "buy",
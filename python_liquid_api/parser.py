@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+from dateutil import tz
+
+from .instrumentation import timed
+
+# 定数
+CANDLESTICK_COLUMNS = ["datetime", "open", "high", "low", "close", "volume"]
+EXECUTION_COLUMNS = ["id", "quantity", "price", "taker_side", "created_at", "timestamp"]
+SIDE_CATEGORIES = ["buy", "sell"]
+
+
+def timestamps_to_datetime(timestamps):
+    """
+    UNIX時間の配列をまとめてローカル時刻のdatetime64に変換する。
+    datetime.fromtimestampと同じくタイムゾーン情報は持たない。
+    """
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    utc_datetime = pd.to_datetime(timestamps, unit="s", utc=True)
+    return utc_datetime.tz_convert(tz.tzlocal()).tz_localize(None)
+
+
+@timed("dataframe_build_seconds")
+def parse_candlestick(raw_data):
+    """
+    ローソク足の生データをDataFrameに変換
+    :param raw_data: [[UNIX時間, 始値, 高値, 低値, 終値, 出来高], ...]
+    :return: datetime(datetime64), open/high/low/close/volume(float64)のDataFrame
+    """
+    values = np.asarray(raw_data, dtype=np.float64).reshape(-1, len(CANDLESTICK_COLUMNS))
+
+    output_df = pd.DataFrame(values[:, 1:], columns=CANDLESTICK_COLUMNS[1:])
+    output_df.insert(0, "datetime", timestamps_to_datetime(values[:, 0]))
+
+    return output_df
+
+
+@timed("dataframe_build_seconds")
+def parse_price_levels(price_levels, price_column, volume_column):
+    """
+    板情報の価格帯をDataFrameに変換
+    :param price_levels: [[価格, 数量], ...]
+    :param price_column: 価格の列名
+    :param volume_column: 数量の列名
+    :return: float64のDataFrame
+    """
+    values = np.asarray(price_levels, dtype=np.float64).reshape(-1, 2)
+    return pd.DataFrame(values, columns=[price_column, volume_column])
+
+
+@timed("dataframe_build_seconds")
+def parse_executions(records):
+    """
+    約定生データのリストを列ごとにまとめてDataFrameに変換
+    :param records: 約定生データ(辞書)のリスト
+    :return: id(int64), quantity/price(float64), taker_side(category), created_at(int64), timestamp(datetime64)
+    """
+    columns = {
+        "id": np.fromiter((record["id"] for record in records), dtype=np.int64, count=len(records)),
+        "quantity": np.array([record["quantity"] for record in records], dtype=np.float64),
+        "price": np.array([record["price"] for record in records], dtype=np.float64),
+        "taker_side": pd.Categorical([record["taker_side"] for record in records], categories=SIDE_CATEGORIES),
+        "created_at": np.fromiter((record["created_at"] for record in records), dtype=np.int64, count=len(records)),
+        "timestamp": timestamps_to_datetime([record["timestamp"] for record in records]),
+    }
+
+    return pd.DataFrame(columns, columns=EXECUTION_COLUMNS)
@@ -0,0 +1,266 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .order_book import OrderBook
+from .products import DEFAULT_QUOTE_CURRENCY, get_product_catalog
+
+# 定数
+DEFAULT_POLL_INTERVAL = 1.0
+MAX_INTERVAL_RATIO = 10.0  # max_intervalを省略した場合はintervalのこの倍数
+ADAPT_DOWN = 0.5  # 板が変化した場合にポーリング間隔に掛ける値
+ADAPT_UP = 1.25  # 板が変化しなかった場合にポーリング間隔に掛ける値
+MAX_SCHEDULER_WAIT = 0.5
+
+
+def _snapshot_hash(order_book_raw):
+    """
+    板の内容(価格帯)のハッシュ値
+    """
+    return hash((
+        tuple(map(tuple, order_book_raw["buy_price_levels"])),
+        tuple(map(tuple, order_book_raw["sell_price_levels"])),
+    ))
+
+
+class _ProductState:
+    def __init__(self, currency_name, interval):
+        self.currency_name = currency_name
+        self.order_book = OrderBook(currency_name)
+        self.interval = interval
+        self.next_time = 0.0
+        self.in_flight = False
+        self.last_timestamp = None
+        self.last_hash = None
+        self.last_change_time = None  # 変化を検出した時刻(UNIX時間)
+
+        # 計測値
+        self.polls = 0
+        self.changes = 0
+        self.skipped = 0
+        self.errors = 0
+        self.last_error = None
+
+
+class OrderBookPoller:
+    def __init__(self, client=None, currency_names=None, interval=DEFAULT_POLL_INTERVAL, min_interval=None,
+                 max_interval=None, adaptive=True, max_workers=None, on_change=None):
+        """
+        複数通貨の板情報を並行してポーリングし、変化した板のみを通知する。
+        板のtimestampもしくは内容のハッシュ値が前回と同じ場合は板を更新しない。
+        adaptiveがTrueの場合は、板が変化しない通貨ほどポーリングの間隔を長くする。
+        リクエストは共有のレートリミッタ(public)の制限を受ける
+        :param client: LiquidPublic(省略時は新規に作成)
+        :param currency_names: 通貨名のリスト(省略時はJPY建ての全通貨)
+        :param interval: 目標とするポーリングの間隔(秒)
+        :param min_interval: ポーリング間隔の下限(省略時はinterval)
+        :param max_interval: ポーリング間隔の上限(省略時はintervalの10倍)
+        :param adaptive: Falseの場合は常にintervalの間隔でポーリングする
+        :param max_workers: 同時にリクエストする最大数(省略時は通貨数)
+        :param on_change: 板が変化するたびに呼び出される関数
+        """
+        if interval <= 0:
+            raise ValueError("intervalには正の値を指定してください。")
+
+        if client is None:
+            from .public_api import LiquidPublic
+            client = LiquidPublic()
+        catalog = get_product_catalog()
+        if currency_names is None:
+            currency_names = catalog.names(DEFAULT_QUOTE_CURRENCY)
+        for currency_name in currency_names:
+            catalog.get(currency_name)
+
+        self.client = client
+        self.interval = interval
+        self.min_interval = interval if min_interval is None else min_interval
+        self.max_interval = interval * MAX_INTERVAL_RATIO if max_interval is None else max_interval
+        self.adaptive = adaptive
+        self.max_workers = max_workers or len(currency_names)
+
+        self._states = {name: _ProductState(name, interval) for name in currency_names}
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+        if on_change is not None:
+            self.subscribe(on_change)
+
+    def subscribe(self, callback):
+        """
+        板の変化を受け取る関数を登録する
+        :param callback: callback(event)。eventはcurrency_name, order_book, diff, timestampを持つ辞書
+        """
+        self._subscribers.append(callback)
+
+    @property
+    def order_books(self):
+        """
+        {通貨名: OrderBook}
+        """
+        return {name: state.order_book for name, state in self._states.items()}
+
+    def _adapt(self, state, changed):
+        if not self.adaptive:
+            return
+        factor = ADAPT_DOWN if changed else ADAPT_UP
+        state.interval = min(self.max_interval, max(self.min_interval, state.interval * factor))
+
+    def _poll_product(self, state):
+        """
+        1通貨の板を取得し、変化していれば板を更新して通知する
+        :return: 変化した場合はイベント、変化しなかった場合はNone
+        """
+        try:
+            order_book_raw = self.client.get_order_book_raw(state.currency_name)
+        except Exception as e:
+            with self._lock:
+                state.errors += 1
+                state.last_error = e
+                # エラーが続く場合は間隔を広げる
+                self._adapt(state, changed=False)
+            return None
+
+        event = None
+        with self._lock:
+            state.polls += 1
+            timestamp = order_book_raw["timestamp"]
+            if timestamp == state.last_timestamp:
+                state.skipped += 1
+                changed = False
+            else:
+                state.last_timestamp = timestamp
+                snapshot_hash = _snapshot_hash(order_book_raw)
+                changed = snapshot_hash != state.last_hash
+                if changed:
+                    state.last_hash = snapshot_hash
+                else:
+                    # timestampのみ変わり、内容は同じ場合は板の時刻のみ更新する
+                    state.skipped += 1
+                    state.order_book.timestamp = float(timestamp)
+
+            if changed:
+                diff = state.order_book.update(order_book_raw)
+                state.changes += 1
+                state.last_change_time = time.time()
+                event = {
+                    "currency_name": state.currency_name,
+                    "order_book": state.order_book,
+                    "diff": diff,
+                    "timestamp": state.order_book.timestamp,
+                }
+            self._adapt(state, changed)
+
+        if event is not None:
+            for callback in self._subscribers:
+                callback(event)
+        return event
+
+    def poll_once(self):
+        """
+        全通貨を1回ずつ並行してポーリングする
+        :return: 変化した通貨のイベントのリスト
+        """
+        states = list(self._states.values())
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(states))) as executor:
+            events = list(executor.map(self._poll_product, states))
+        return [event for event in events if event is not None]
+
+    def _run_scheduled(self, state):
+        try:
+            self._poll_product(state)
+        finally:
+            with self._lock:
+                # 開始予定時刻を基準にして、処理時間で間隔がずれないようにする
+                state.next_time = max(state.next_time + state.interval, time.monotonic())
+                state.in_flight = False
+            self._wakeup.set()
+
+    def run_forever(self):
+        """
+        stopが呼ばれるまでポーリングを続ける(呼び出したスレッドをブロックする)
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            now = time.monotonic()
+            for state in self._states.values():
+                state.next_time = now
+
+            while not self._stop_event.is_set():
+                # 走査より前に消しておき、走査中に完了したポーリングの通知を取りこぼさないようにする
+                self._wakeup.clear()
+                now = time.monotonic()
+                wait_time = MAX_SCHEDULER_WAIT
+                with self._lock:
+                    for state in self._states.values():
+                        if state.in_flight:
+                            continue
+                        if state.next_time <= now:
+                            state.in_flight = True
+                            executor.submit(self._run_scheduled, state)
+                        else:
+                            wait_time = min(wait_time, state.next_time - now)
+
+                self._wakeup.wait(wait_time)
+
+    def start(self):
+        """
+        別スレッドでポーリングを開始する
+        """
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self.run_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        ポーリングを停止する(実行中のリクエストの完了を待つ)
+        """
+        self._stop_event.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def staleness(self):
+        """
+        通貨ごとの板の古さ(秒) {通貨名: 現在時刻 - 内容を確認できた最新の板のtimestamp}
+        板を取得していない通貨はnan
+        """
+        now = time.time()
+        with self._lock:
+            return {
+                name: now - state.order_book.timestamp if state.order_book.timestamp is not None else float("nan")
+                for name, state in self._states.items()
+            }
+
+    def metrics(self):
+        """
+        通貨ごとの計測値
+        - polls: ポーリング回数
+        - changes: 板が変化した回数
+        - skipped: 板が変化しなかったため処理を省略した回数
+        - errors: リクエストが失敗した回数
+        - interval: 現在のポーリング間隔(秒)
+        - staleness: 板の古さ(秒)
+        """
+        staleness = self.staleness()
+        with self._lock:
+            return {
+                name: {
+                    "polls": state.polls,
+                    "changes": state.changes,
+                    "skipped": state.skipped,
+                    "errors": state.errors,
+                    "interval": state.interval,
+                    "staleness": staleness[name],
+                }
+                for name, state in self._states.items()
+            }
@@ -1,50 +1,110 @@
-import jwt
 import json
-import requests
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
 import warnings
 
 from .parameter_dict import ParameterDict
+from .products import get_product_catalog
+from .session import DEFAULT_ENDPOINT, make_session
+from .utils import json_parse, LiquidAPIError, ERROR_CODES, UNKNOWN_ERROR_CONT
+from .decoder import NUMERIC_FIELDS
+from .signing import RequestSigner
+
+# 定数
+DEFAULT_BATCH_WORKERS = 8
+# 署名以外は全リクエストで共通のヘッダ
+STATIC_HEADER = {
+    "X-Quoine-API-Version": "2",
+    "Content-Type": "application/json"
+}
+
+
+def _run_batch(func, params_list, max_workers):
+    """
+    複数のリクエストを並行して送信し、1件の失敗で全体を中断せずに結果をまとめる
+    """
+    def run(index_and_params):
+        index, params = index_and_params
+        try:
+            return {"index": index, "result": func(params), "error": None}
+        except Exception as e:
+            return {"index": index, "result": None, "error": e}
+
+    if len(params_list) == 0:
+        return []
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(params_list))) as executor:
+        return list(executor.map(run, enumerate(params_list)))
 
 
 class LiquidPrivate:
-    def __init__(self, token_id, secret_key):
+    def __init__(self, token_id, secret_key, endpoint=DEFAULT_ENDPOINT, session=None, signing_backend="hmac",
+                 balance_ttl=0.0, parse_numeric=False, **session_kwargs):
         """
         :param token_id:
         :param secret_key:
+        :param endpoint: APIのベースURL
+        :param signing_backend: 署名の実装(hmac/pyjwt)
+        :param session: requests.SessionもしくはLiquidSession(省略時はコネクションプールを新規作成)
+        :param balance_ttl: 口座スナップショットを再利用する秒数
+        :param parse_numeric: Trueの場合はget_orders_raw・get_order_rawの数値の文字列をfloatに変換する
+        :param session_kwargs: LiquidSessionの設定(timeout, pool_maxsize, keep_aliveなど)
         """
         self.token_id = token_id
         self.secret_key = secret_key
 
-        self.endpoint = "https://api.liquid.com/"
+        self.endpoint = endpoint
         self.parameter_dict = ParameterDict()
+        self.signer = RequestSigner(token_id, secret_key, backend=signing_backend)
+
+        self.balance_ttl = balance_ttl
+        self.numeric_fields = NUMERIC_FIELDS if parse_numeric else None
+        self._account_snapshot = None
+        self._account_snapshot_time = 0.0
+        self._account_lock = threading.Lock()
+
+        self._owns_session = session is None
+        self.session = make_session(session, **session_kwargs)
+
+    def close(self):
+        """
+        保持しているコネクションプールを解放する
+        """
+        if self._owns_session:
+            self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
     def __make_header(self, path, query=""):
-        timestamp = datetime.now().timestamp()
         path += query
 
-        payload_data = {
-            "path": path,
-            "nonce": timestamp,
-            "token_id": self.token_id
-        }
-        signature = jwt.encode(payload_data, self.secret_key, algorithm="HS256")
-        header = {
-            "X-Quoine-API-Version": "2",
-            "X-Quoine-Auth": signature,
-            "Content-Type": "application/json"
-        }
+        header = dict(STATIC_HEADER)
+        header["X-Quoine-Auth"] = self.signer.sign(path)
 
         return path, header
 
+    def __send(self, method, url, query="", data=None):
+        """
+        署名付きのリクエストを送信する。再送時は署名を作り直す
+        """
+        def make_header():
+            _, header = self.__make_header(path=url, query=query)
+            return header
+
+        return self.session.request(method, url + query, headers=make_header, data=data,
+                                    rate_limit_group="private")
+
     def __check_and_trans_params(self, currency_name, side, amount, price):
         currency_id = None
 
         if currency_name is not None:
-            try:
-                currency_id = self.parameter_dict.name2id[currency_name]
-            except KeyError:
-                raise ValueError("通貨名が不正です。")
+            currency_id = get_product_catalog().product_id(currency_name)
 
         if side is not None:
             if side not in self.parameter_dict.side_list:
@@ -70,7 +130,6 @@ class LiquidPrivate:
         - stop: 逆指値
         :return:
         """
-        url = self.endpoint + "orders/"
         currency_id, amount, price = self.__check_and_trans_params(
             currency_name=currency_name,
             side=side,
@@ -78,8 +137,10 @@ class LiquidPrivate:
             price=price
         )
 
-        # ヘッダ情報作成
-        url, header = self.__make_header(path=url)
+        return self.__post_order(currency_id, side, amount, price, order_type)
+
+    def __post_order(self, currency_id, side, amount, price, order_type):
+        url = self.endpoint + "orders/"
 
         # 注文データ
         send_data = {
@@ -94,9 +155,11 @@ class LiquidPrivate:
 
         # 送信データ作成
         json_data = json.dumps(send_data)
-        res = requests.post(url=url, headers=header, data=json_data)
+        res = self.__send("POST", url, data=json_data)
+        # 注文により残高が変わるため口座スナップショットを破棄
+        self.invalidate_account_snapshot()
 
-        parsed_data = json.loads(res.text)
+        parsed_data = json_parse(res)
         create_datetime = datetime.fromtimestamp(parsed_data["created_at"])
         create_datetime = datetime.strftime(create_datetime, "%Y/%m/%d %H:%M:%S")
 
@@ -111,29 +174,66 @@ class LiquidPrivate:
             "side": parsed_data["side"],
             "created_at": create_datetime,
             "updated_at": update_datetime,
-            "currency": parsed_data["currency_pair_code"][:-3]  # 取引通貨のみ取得（文字列からJPYを除く）
+            # JPY建ての場合はBTCなどの取引通貨名、それ以外はETHBTCなどの通貨ペア名(大文字)
+            "currency": get_product_catalog().currency_name(parsed_data.get("product_id"),
+                                                            parsed_data["currency_pair_code"]).upper()
         }
 
         return output
 
+    def create_orders(self, orders, max_workers=DEFAULT_BATCH_WORKERS):
+        """
+        複数の注文を並行して送信
+        :param orders: create_orderの引数(currency_name, side, amount, price, order_type)を持つ辞書のリスト
+        :param max_workers: 同時に送信する注文数
+        :return: 注文ごとの結果のリスト(ordersと同じ順序)
+        - index: ordersでの位置
+        - result: create_orderの返り値(失敗した場合はNone)
+        - error: 発生した例外(成功した場合はNone)
+        """
+        # 送信前にすべての注文を検証する
+        params_list = []
+        invalid_list = []
+        for index, order in enumerate(orders):
+            try:
+                currency_id, amount, price = self.__check_and_trans_params(
+                    currency_name=order["currency_name"],
+                    side=order["side"],
+                    amount=order["amount"],
+                    price=order.get("price", 0.0)
+                )
+            except KeyError as e:
+                invalid_list.append(str(index) + ": " + str(e) + "が指定されていません。")
+                continue
+            except (TypeError, ValueError) as e:
+                invalid_list.append(str(index) + ": " + str(e))
+                continue
+            params_list.append((currency_id, order["side"], amount, price, order.get("order_type", "limit")))
+
+        if len(invalid_list) > 0:
+            raise ValueError("不正な注文があるため送信しませんでした。" + ", ".join(invalid_list))
+
+        def post(params):
+            return self.__post_order(*params)
+
+        return _run_batch(post, params_list, max_workers)
+
     def get_order_info(self, limit_num=None):
         url = self.endpoint + "orders"
-        query = None
+        query = ""
 
         # 取得件数を指定した場合はクエリを設定
         if limit_num is not None:
             query = "?limit=" + str(limit_num)
 
-        # ヘッダ情報作成
-        url, header = self.__make_header(path=url, query=query)
         # データ送信
-        res = requests.get(url=url, headers=header)
+        res = self.__send("GET", url, query=query)
 
         if res.status_code != 200:
             print("注文情報の取得に失敗しました。")
             return None
 
-        parsed_data = json.loads(res.text)["models"]
+        parsed_data = json_parse(res)["models"]
         output_list = []
         for data in parsed_data:
             create_datetime = datetime.fromtimestamp(data["created_at"])
@@ -152,25 +252,92 @@ class LiquidPrivate:
                 "side": data["side"],
                 "created_at": create_datetime,
                 "updated_at": update_datetime,
-                "currency": data["currency_pair_code"][:-3]  # 取引通貨のみ取得（文字列からJPYを除く）
+                # JPY建ての場合はBTCなどの取引通貨名、それ以外はETHBTCなどの通貨ペア名(大文字)
+                "currency": get_product_catalog().currency_name(data.get("product_id"),
+                                                                data["currency_pair_code"]).upper()
             }
 
             output_list.append(output_dict)
 
         return output_list
 
+    def get_orders_raw(self, status=None, currency_name=None, limit_num=None, page=None):
+        """
+        注文一覧の生データを取得
+        :param status: 注文状態(live/filled/cancelled)
+        :param currency_name: 通貨名
+        :param limit_num: 取得件数
+        :param page: ページ番号
+        :return: 注文の生データのリスト
+        """
+        params = []
+        if status is not None:
+            params.append("status=" + status)
+        if currency_name is not None:
+            currency_id, _, _ = self.__check_and_trans_params(currency_name, None, 0, 0)
+            params.append("product_id=" + str(currency_id))
+        if limit_num is not None:
+            params.append("limit=" + str(limit_num))
+        if page is not None:
+            params.append("page=" + str(page))
+
+        query = "?" + "&".join(params) if len(params) > 0 else ""
+        res = self.__send("GET", self.endpoint + "orders", query=query)
+
+        return json_parse(res, self.numeric_fields)["models"]
+
+    def get_order_raw(self, order_id):
+        """
+        1件の注文の生データを取得
+        :param order_id: 取引ID
+        """
+        res = self.__send("GET", self.endpoint + "orders/" + str(order_id))
+        return json_parse(res, self.numeric_fields)
+
     def cancel_order(self, order_id):
-        url = self.endpoint + "orders/" + order_id + "/cancel"
-        # ヘッダ情報作成
-        path, header = self.__make_header(path=url)
-        # データ送信
-        res = requests.put(url=url, headers=header)
+        """
+        注文のキャンセル
+        :param order_id: 取引ID
+        :return: キャンセルできた場合はTrue
+        """
+        status_code = self.__put_cancel(order_id)
 
-        if res.status_code == 404:
+        if status_code == 404:
             print("対象の取引IDが存在しません。取引ID:", order_id)
-        elif res.status_code == 200:
+        elif status_code == 200:
             print("注文がキャンセルされました。取引ID:", order_id)
 
+        return status_code == 200
+
+    def __put_cancel(self, order_id):
+        url = self.endpoint + "orders/" + str(order_id) + "/cancel"
+        # データ送信
+        res = self.__send("PUT", url)
+        self.invalidate_account_snapshot()
+        return res.status_code
+
+    def cancel_orders(self, order_ids, max_workers=DEFAULT_BATCH_WORKERS):
+        """
+        複数の注文を並行してキャンセル
+        :param order_ids: 取引IDのリスト
+        :param max_workers: 同時に送信するキャンセル数
+        :return: 注文ごとの結果のリスト(order_idsと同じ順序)
+        - index: order_idsでの位置
+        - result: キャンセルできた場合はTrue
+        - error: 発生した例外(成功した場合はNone)。ステータスが200以外の場合はLiquidAPIError
+        """
+        def cancel(order_id):
+            status_code = self.__put_cancel(order_id)
+            if status_code == 404:
+                raise LiquidAPIError("対象の取引IDが存在しません。取引ID:" + str(order_id), status_code=status_code)
+            if status_code != 200:
+                error_contents = ERROR_CODES.get(str(status_code), UNKNOWN_ERROR_CONT)
+                raise LiquidAPIError("Error Code:" + str(status_code) + " Contents:" + error_contents
+                                     + " 取引ID:" + str(order_id), status_code=status_code)
+            return True
+
+        return _run_batch(cancel, list(order_ids), max_workers)
+
     def get_fiat_info(self):
         """
         日本円残高取得
@@ -180,11 +347,9 @@ class LiquidPrivate:
         """
         warnings.warn("廃止予定のメソッドです。get_asset_info(asset='jpy')を使用してください。", category=FutureWarning)
         url = self.endpoint + "fiat_accounts"
-        # ヘッダ情報作成
-        url, header = self.__make_header(path=url)
         # データ送信
-        res = requests.get(url=url, headers=header)
-        parsed = json.loads(res.text)[0]
+        res = self.__send("GET", url)
+        parsed = json_parse(res)[0]
 
         balance = parsed["balance"]  # 日本円残高
         reserved = parsed["reserved_balance"]  # ロック中
@@ -193,11 +358,9 @@ class LiquidPrivate:
     def get_crypto_info(self, currency="btc"):
         warnings.warn("廃止予定のメソッドです。get_asset_info(asset)を使用してください。", category=FutureWarning)
         url = self.endpoint + "crypto_accounts"
-        # ヘッダ情報作成
-        url, header = self.__make_header(path=url)
         # データ送信
-        res = requests.get(url=url, headers=header)
-        parsed = json.loads(res.text)
+        res = self.__send("GET", url)
+        parsed = json_parse(res)
 
         currency = currency.upper()
         data = None
@@ -213,31 +376,73 @@ class LiquidPrivate:
         return balance, reserved
 
     def get_asset_info(self, asset):
-        url = self.endpoint
-        # 日本円を指定した場合
-        if asset in self.parameter_dict.fiat_list:
-            url += "fiat_accounts"
-        # 暗号資産を指定した場合
-        elif asset in self.parameter_dict.name2id:
-            url += "crypto_accounts"
-        else:
+        """
+        資産残高取得
+        balance_ttlを指定している場合は口座スナップショットから取得する
+        :param asset: 資産名(jpy/btc/ethなど)
+        :return: 利用可能残高, ロック中残高
+        """
+        # 法定通貨(fiat_accounts)か暗号資産(crypto_accounts)かを判定
+        account_type = get_product_catalog().account_type(asset)
+        if account_type is None:
             raise Exception("通貨名が不正です。")
 
-        # ヘッダ情報作成
-        url, header = self.__make_header(path=url)
-        # データ送信
-        res = requests.get(url=url, headers=header)
-        parsed = json.loads(res.text)
-        asset = asset.upper()
-
-        data = None
-        # 引数で与えた通貨の情報を取得
-        for p in parsed:
-            if p["currency"] == asset:
-                data = p
-                break
+        if self.balance_ttl > 0:
+            accounts = self.get_account_snapshot()
+        else:
+            accounts = self.__fetch_accounts(account_type)
 
+        data = accounts[asset]
         balance = data["balance"]  # 利用可能残高
         reserved = data["reserved_balance"]  # ロック中残高
 
         return balance, reserved
+
+    def __fetch_accounts(self, account_type):
+        """
+        口座一覧を取得して通貨名(小文字)で索引を作る
+        """
+        url = self.endpoint + account_type
+        # データ送信
+        res = self.__send("GET", url)
+        parsed = json_parse(res)
+
+        return {p["currency"].lower(): p for p in parsed}
+
+    def get_account_snapshot(self, max_age=None):
+        """
+        日本円・暗号資産の口座をまとめて取得する。
+        取得から max_age 秒以内であれば前回の結果を返す。
+        :param max_age: キャッシュの有効秒数(省略時はbalance_ttl)
+        :return: {通貨名(小文字): 口座情報の辞書}
+        """
+        if max_age is None:
+            max_age = self.balance_ttl
+
+        with self._account_lock:
+            now = time.monotonic()
+            if self._account_snapshot is not None and now - self._account_snapshot_time < max_age:
+                return self._account_snapshot
+
+            accounts = self.__fetch_accounts("fiat_accounts")
+            accounts.update(self.__fetch_accounts("crypto_accounts"))
+
+            self._account_snapshot = accounts
+            self._account_snapshot_time = now
+            return accounts
+
+    def get_balances(self, max_age=None):
+        """
+        全資産の残高を取得
+        :param max_age: キャッシュの有効秒数(省略時はbalance_ttl)
+        :return: {資産名: (利用可能残高, ロック中残高)}
+        """
+        accounts = self.get_account_snapshot(max_age=max_age)
+        return {asset: (data["balance"], data["reserved_balance"]) for asset, data in accounts.items()}
+
+    def invalidate_account_snapshot(self):
+        """
+        口座スナップショットを破棄する(注文・キャンセル時に自動で呼び出される)
+        """
+        with self._account_lock:
+            self._account_snapshot = None
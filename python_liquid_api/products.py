@@ -0,0 +1,240 @@
+import json
+import os
+import threading
+import time
+import warnings
+
+from .utils import CURRENCY_ID
+
+# 定数
+DEFAULT_PRODUCTS_TTL = 24 * 60 * 60  # 1日
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "python_liquid_api", "products.json")
+DEFAULT_QUOTE_CURRENCY = "jpy"  # この通貨建ての通貨ペアは取引通貨名のみ(btcなど)でも指定できる
+# 保存する項目(価格などの変化する項目は保存しない)
+PRODUCT_FIELDS = (
+    "id", "currency_pair_code", "base_currency", "quoted_currency", "product_type", "tick_size", "disabled",
+)
+FIAT_CURRENCIES = frozenset(["jpy", "usd", "eur", "sgd", "aud", "hkd", "idr", "inr", "php", "cny"])
+
+
+def _normalize_product(product):
+    normalized = {field: product.get(field) for field in PRODUCT_FIELDS}
+    normalized["id"] = str(product["id"])
+    normalized["currency_pair_code"] = product["currency_pair_code"].upper()
+    normalized["base_currency"] = product["base_currency"].lower()
+    normalized["quoted_currency"] = product["quoted_currency"].lower()
+    normalized["disabled"] = bool(product.get("disabled", False))
+    return normalized
+
+
+class ProductCatalog:
+    def __init__(self, products, fetched_at=None, endpoint=None):
+        """
+        通貨ペアの一覧と索引。
+        通貨名は通貨ペアのコードの小文字(btcjpy, ethbtcなど)、JPY建ての通貨ペアは取引通貨名(btcなど)でも指定できる
+        :param products: /productsの返り値(辞書のリスト)
+        :param fetched_at: 取得したUNIX時間
+        :param endpoint: 取得したAPIのベースURL
+        """
+        self.products = [_normalize_product(product) for product in products]
+        self.fetched_at = fetched_at
+        self.endpoint = endpoint
+
+        self._by_id = {}
+        self._by_name = {}
+        self._by_quote = {}
+        self._names = {}  # {ID: 通貨名}
+        self._currencies = set()
+        for product in self.products:
+            pair_name = product["currency_pair_code"].lower()
+            name = pair_name
+            if product["quoted_currency"] == DEFAULT_QUOTE_CURRENCY:
+                name = product["base_currency"]
+                self._by_name[name] = product
+            self._by_name[pair_name] = product
+            self._by_id[product["id"]] = product
+            self._by_quote.setdefault(product["quoted_currency"], []).append(product)
+            self._names[product["id"]] = name
+            self._currencies.add(product["base_currency"])
+            self._currencies.add(product["quoted_currency"])
+
+    def __len__(self):
+        return len(self.products)
+
+    def __contains__(self, currency_name):
+        return currency_name in self._by_name
+
+    def get(self, currency_name):
+        """
+        通貨名から通貨ペアを取得する
+        :param currency_name: 通貨名(btc, btcjpy, ethbtcなど)
+        :return: id, currency_pair_code, base_currency, quoted_currency, product_type, tick_size, disabledの辞書
+        """
+        try:
+            return self._by_name[currency_name]
+        except KeyError:
+            raise ValueError("通貨名が不正です。")
+
+    def product_id(self, currency_name):
+        """
+        通貨名から通貨ペアのIDを取得する(文字列)
+        """
+        return self.get(currency_name)["id"]
+
+    def by_id(self, product_id):
+        """
+        IDから通貨ペアを取得する(存在しない場合はNone)
+        """
+        return self._by_id.get(str(product_id))
+
+    def currency_name(self, product_id, currency_pair_code=None):
+        """
+        IDから通貨名を取得する(JPY建ての場合はbtcなどの取得通貨名、それ以外はbtcusdなど)
+        :param product_id: 通貨ペアのID
+        :param currency_pair_code: IDが一覧にない場合に使う通貨ペアのコード(BTCJPYなど)
+        :return: 通貨名(見つからない場合はcurrency_pair_codeの小文字、省略時はNone)
+        """
+        name = self._names.get(str(product_id))
+        if name is None and currency_pair_code is not None:
+            product = self._by_name.get(currency_pair_code.lower())
+            name = self._names[product["id"]] if product is not None else currency_pair_code.lower()
+        return name
+
+    def by_quote(self, quoted_currency):
+        """
+        決済通貨(jpy, usd, btcなど)が同じ通貨ペアのリスト
+        """
+        return list(self._by_quote.get(quoted_currency.lower(), []))
+
+    def names(self, quoted_currency=None, include_disabled=False):
+        """
+        通貨名のリスト
+        :param quoted_currency: 指定した場合はこの決済通貨の通貨ペアのみ
+        :param include_disabled: Trueの場合は取引停止中の通貨ペアも含める
+        """
+        if quoted_currency is None:
+            products = self.products
+        else:
+            products = self._by_quote.get(quoted_currency.lower(), [])
+        return [self._names[product["id"]] for product in products if include_disabled or not product["disabled"]]
+
+    def account_type(self, asset):
+        """
+        資産名(jpy, btcなど)の口座の種類
+        :return: fiat_accountsもしくはcrypto_accounts(存在しない資産の場合はNone)
+        """
+        if asset in FIAT_CURRENCIES:
+            return "fiat_accounts"
+        if asset in self._currencies:
+            return "crypto_accounts"
+        return None
+
+    def to_dict(self):
+        return {"fetched_at": self.fetched_at, "endpoint": self.endpoint, "products": self.products}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["products"], fetched_at=data.get("fetched_at"), endpoint=data.get("endpoint"))
+
+    @classmethod
+    def static(cls):
+        """
+        APIから取得しない場合の通貨ペア(utils.CURRENCY_IDのJPY建ての通貨ペア)
+        """
+        products = [
+            {
+                "id": product_id, "currency_pair_code": name.upper() + "JPY", "base_currency": name,
+                "quoted_currency": "jpy", "product_type": "CurrencyPair",
+            }
+            for name, product_id in CURRENCY_ID.items()
+        ]
+        return cls(products)
+
+
+_catalog = ProductCatalog.static()
+_catalog_lock = threading.Lock()
+
+
+def get_product_catalog():
+    """
+    使用中のProductCatalog(load_product_catalogを呼ぶまではutils.CURRENCY_IDの通貨ペアのみ)
+    """
+    return _catalog
+
+
+def set_product_catalog(catalog):
+    """
+    URLの作成・クライアントの通貨名の確認に使用するProductCatalogを変更する
+    """
+    global _catalog
+    _catalog = catalog
+
+
+def _read_cache(cache_path):
+    try:
+        with open(cache_path, "r") as f:
+            return ProductCatalog.from_dict(json.load(f))
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def _write_cache(catalog, cache_path):
+    os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+    # 書き込み途中のファイルを読まないよう一時ファイルに書いてから置き換える
+    tmp_path = cache_path + ".tmp" + str(os.getpid())
+    with open(tmp_path, "w") as f:
+        json.dump(catalog.to_dict(), f)
+    os.replace(tmp_path, cache_path)
+
+
+def load_product_catalog(client=None, cache_path=DEFAULT_CACHE_PATH, ttl=DEFAULT_PRODUCTS_TTL, refresh=False):
+    """
+    通貨ペアの一覧を読み込み、URLの作成・クライアントで使用するよう設定する。
+    ディスクのキャッシュが同じエンドポイントのものでttl秒以内であればAPIにアクセスしない。
+    取得に失敗した場合は古いキャッシュ、キャッシュがなければutils.CURRENCY_IDの通貨ペアを使用する
+    :param client: LiquidPublic(省略時は新規に作成)
+    :param cache_path: キャッシュファイルのパス(Noneの場合は保存しない)
+    :param ttl: キャッシュの有効秒数
+    :param refresh: Trueの場合はキャッシュを使用せずに取得する
+    :return: ProductCatalog
+    """
+    owns_client = client is None
+    if owns_client:
+        from .public_api import LiquidPublic
+        client = LiquidPublic()
+
+    try:
+        with _catalog_lock:
+            catalog = _load_catalog(client, cache_path, ttl, refresh)
+            set_product_catalog(catalog)
+    finally:
+        if owns_client:
+            client.close()
+    return catalog
+
+
+def _load_catalog(client, cache_path, ttl, refresh):
+    cached = _read_cache(cache_path) if cache_path is not None else None
+    if cached is not None and cached.endpoint != client.endpoint:
+        cached = None
+
+    if not refresh and cached is not None and cached.fetched_at is not None \
+            and time.time() - cached.fetched_at < ttl:
+        return cached
+
+    try:
+        catalog = ProductCatalog(client.get_products_raw(), fetched_at=time.time(), endpoint=client.endpoint)
+    except Exception as e:
+        if cached is not None:
+            warnings.warn("通貨ペアの一覧を取得できなかったため、キャッシュを使用します。:" + str(e))
+            return cached
+        warnings.warn("通貨ペアの一覧を取得できなかったため、既定の通貨ペアのみを使用します。:" + str(e))
+        return ProductCatalog.static()
+
+    if cache_path is not None:
+        try:
+            _write_cache(catalog, cache_path)
+        except OSError as e:
+            # 保存できなくても取得した一覧は使用する
+            warnings.warn("通貨ペアの一覧をキャッシュに保存できませんでした。:" + str(e))
+    return catalog
@@ -1,14 +1,45 @@
-from .utils import json_parse, url_add_currency, set_url
-import requests
+from .utils import json_parse, url_add_currency, set_url, to_timestamp
+from .decoder import NUMERIC_FIELDS
+from .session import DEFAULT_ENDPOINT, make_session
+from .pagination import fetch_executions, iter_execution_pages, DEFAULT_WINDOW_SECONDS, DEFAULT_MAX_WORKERS
 import json
 import datetime
-import pandas as pd
+import time
 import warnings
 
 
 class LiquidPublic(object):
-    @staticmethod
-    def get_candlestick_raw(currency_name, candle_type):
+    def __init__(self, endpoint=DEFAULT_ENDPOINT, session=None, cache=None, parse_numeric=False, tick_store=None,
+                 **session_kwargs):
+        """
+        :param endpoint: APIのベースURL
+        :param session: requests.SessionもしくはLiquidSession(省略時はコネクションプールを新規作成)
+        :param cache: 確定済のローソク足・約定履歴を保存するHistoricalCache
+        :param tick_store: 取得した約定・確定済のローソク足を追記するTickStore
+        :param parse_numeric: Trueの場合は生データの数値の文字列(price, quantityなど)をfloatに変換する
+        :param session_kwargs: LiquidSessionの設定(timeout, pool_maxsize, keep_aliveなど)
+        """
+        self.endpoint = endpoint
+        self.cache = cache
+        self.tick_store = tick_store
+        self.numeric_fields = NUMERIC_FIELDS if parse_numeric else None
+        self._owns_session = session is None
+        self.session = make_session(session, **session_kwargs)
+
+    def close(self):
+        """
+        保持しているコネクションプールを解放する
+        """
+        if self._owns_session:
+            self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def get_candlestick_raw(self, currency_name, candle_type):
         """
         ローソク足を取得して生データを出力
         :param currency_name: 通貨名
@@ -30,13 +61,14 @@ class LiquidPublic(object):
         set_url_params = {
             "access_type": "ohlc",
             "currency_name": currency_name,
-            "resolution": candle_type
+            "resolution": candle_type,
+            "endpoint": self.endpoint,
         }
         url = set_url(**set_url_params)
 
         # APIからローソク足を取得
-        req_result = requests.get(url)
-        raw_data = json_parse(req_result)["data"]
+        req_result = self.session.get(url, rate_limit_group="public")
+        raw_data = json_parse(req_result, self.numeric_fields)["data"]
 
         return raw_data
 
@@ -52,7 +84,7 @@ class LiquidPublic(object):
         - 30min
         - 1hour
         :param is_index_datetime: indexにdatetimeを設定
-        :return: ローソク足DataFrame
+        :return: ローソク足DataFrame(価格・出来高はfloat64)
         - datetime: yyyy-mm-dd hh:mm:ss
         - open
         - high
@@ -60,20 +92,39 @@ class LiquidPublic(object):
         - close
         - volume
         """
-        # ローソク足の生データを取得
-        parsed_data = self.get_candlestick_raw(currency_name, candle_type)
-
-        # DataFrameに変換
-        output_df = pd.DataFrame(data=parsed_data, columns=["datetime", "open", "high", "low", "close", "volume"])
-        output_df["datetime"] = output_df["datetime"].apply(datetime.datetime.fromtimestamp)
-
         # 引数のdateをdatetime型に変換
         target_date = datetime.datetime.strptime(date, "%Y%m%d")
         target_date_next = target_date + datetime.timedelta(days=1)
 
-        # 引数で指定したデータを取得
-        output_df = output_df.loc[(output_df["datetime"] >= target_date) & (output_df["datetime"] < target_date_next)]
-        output_df = output_df.reset_index(drop=True)
+        cache_key = candle_type + "_" + date
+        output_df = None
+        if self.cache is not None:
+            output_df = self.cache.get("candlestick", currency_name, cache_key)
+
+        if output_df is None:
+            from .parser import parse_candlestick
+
+            # ローソク足の生データを取得
+            parsed_data = self.get_candlestick_raw(currency_name, candle_type)
+            if self.tick_store is not None:
+                self.tick_store.append_candlestick(currency_name, candle_type, parsed_data)
+
+            # 型付きのDataFrameに変換
+            all_df = parse_candlestick(parsed_data)
+
+            # 引数で指定したデータを取得
+            output_df = all_df.loc[
+                (all_df["datetime"] >= target_date) & (all_df["datetime"] < target_date_next)
+            ]
+            output_df = output_df.reset_index(drop=True)
+
+            # 確定済かつ取得範囲が1日全体を含む日付のみキャッシュに保存
+            # (ohlcは直近の一定本数のみを返すため、範囲の最初の日は途中からになる)
+            if self.cache is not None and len(output_df) > 0 and target_date_next <= datetime.datetime.now():
+                if _covers_date(all_df["datetime"], target_date, target_date_next, candle_type):
+                    self.cache.put("candlestick", currency_name, cache_key, output_df)
+                else:
+                    warnings.warn("指定日付の一部のローソク足のみ取得できたため、キャッシュに保存しません。")
 
         if is_index_datetime:
             # indexにdatetimeを設定
@@ -86,8 +137,16 @@ class LiquidPublic(object):
 
         return output_df
 
-    @staticmethod
-    def get_order_book_raw(currency_name):
+    def get_products_raw(self):
+        """
+        通貨ペアの一覧を取得して生データを出力
+        :return: 通貨ペア(id, currency_pair_code, base_currency, quoted_currency, disabledなど)の辞書のリスト
+        """
+        url = set_url(access_type="products", currency_name=None, endpoint=self.endpoint)
+        req_result = self.session.get(url, rate_limit_group="public")
+        return json_parse(req_result)
+
+    def get_order_book_raw(self, currency_name):
         """
         板情報の生データを取得
         - buy_price_levels: 買値
@@ -98,12 +157,13 @@ class LiquidPublic(object):
         set_url_params = {
             "access_type": "book",
             "currency_name": currency_name,
+            "endpoint": self.endpoint,
         }
         url = set_url(**set_url_params)
 
         # 板情報の生データを取得
-        req_result = requests.get(url)
-        raw_data = json_parse(req_result)
+        req_result = self.session.get(url, rate_limit_group="public")
+        raw_data = json_parse(req_result, self.numeric_fields)
 
         return raw_data
 
@@ -113,27 +173,36 @@ class LiquidPublic(object):
         :param currency_name: 通貨名
         :return: 売値DataFrame, 買値DataFrame, datetime
         """
+        from .parser import parse_price_levels
+
         # 板情報の生データを取得
         order_book_raw = self.get_order_book_raw(currency_name)
 
         # 売値
-        bid_df = pd.DataFrame(
-            data=order_book_raw["sell_price_levels"],
-            columns=["bid_price", "bid_volume"]
-        )
+        bid_df = parse_price_levels(order_book_raw["sell_price_levels"], "bid_price", "bid_volume")
 
         # 買値
-        ask_df = pd.DataFrame(
-            data=order_book_raw["buy_price_levels"],
-            columns=["ask_price", "ask_volume"]
-        )
+        ask_df = parse_price_levels(order_book_raw["buy_price_levels"], "ask_price", "ask_volume")
 
         # 板情報取得日時
         datetime_data = datetime.datetime.fromtimestamp(float(order_book_raw["timestamp"]))
         return bid_df, ask_df, datetime_data
 
-    @staticmethod
-    def get_executions_raw(currency_name, timestamp, max_data_num=1000, base_url=None):
+    def update_order_book(self, currency_name, order_book=None):
+        """
+        板情報を取得してローカルの板(OrderBook)を更新
+        :param currency_name: 通貨名
+        :param order_book: 更新対象のOrderBook(省略時は新規作成)
+        :return: OrderBook, 前回との差分
+        """
+        if order_book is None:
+            from .order_book import OrderBook
+            order_book = OrderBook(currency_name)
+
+        diff = order_book.update(self.get_order_book_raw(currency_name))
+        return order_book, diff
+
+    def get_executions_raw(self, currency_name, timestamp, max_data_num=1000, base_url=None):
         """
         約定履歴を取得
         :param currency_name: 通貨名
@@ -147,71 +216,167 @@ class LiquidPublic(object):
                 "access_type": "executions",
                 "currency_name": currency_name,
                 "max_data_num": max_data_num,
+                "endpoint": self.endpoint,
             }
             url_tmp = set_url(**set_url_params)
         else:
             url_tmp = base_url
 
         url = url_tmp + "&timestamp=" + str(timestamp)
-        req_result = requests.get(url)
-        raw_data = json_parse(req_result)
+        req_result = self.session.get(url, rate_limit_group="public")
+        raw_data = json_parse(req_result, self.numeric_fields)
         return raw_data, url_tmp
 
-    def get_executions(self, currency_name, date, hour):
+    def get_executions(self, currency_name, date, hour, window_seconds=DEFAULT_WINDOW_SECONDS,
+                       max_workers=DEFAULT_MAX_WORKERS):
         """
         約定履歴を取得
         :param currency_name: 通貨名
         :param date: 日付(yyyymmdd)
         :param hour: 時間(hh)
+        :param window_seconds: 並行取得する1ウィンドウあたりの秒数
+        :param max_workers: 同時に取得するウィンドウ数
         """
-        def timestamp2datetime(timestamp):
-            return datetime.datetime.fromtimestamp(float(timestamp))
-
         # 取得対象のtimestampを取得
         target_timestamp = datetime.datetime.strptime(date+hour, "%Y%m%d%H").timestamp()
         end_timestamp = target_timestamp + 60*60  # 開始時点のtimestampの1時間(3600秒)後
 
-        # 出力用DataFrame
-        out_df = pd.DataFrame(columns=["id", "quantity", "price", "taker_side", "created_at", "timestamp"])
+        cache_key = date + hour
+        if self.cache is not None:
+            out_df = self.cache.get("executions", currency_name, cache_key)
+            if out_df is not None:
+                return out_df
 
-        url = None
-        # 比較対象のtimestampが開始時点のtimestampの1時間(3600秒)後までLOOP
-        while target_timestamp < end_timestamp:
-            # 約定生データと基底URLを取得
-            raw_data, url = self.get_executions_raw(currency_name, target_timestamp, base_url=url)
+        out_df = self.get_executions_range(
+            currency_name, target_timestamp, end_timestamp, window_seconds=window_seconds, max_workers=max_workers
+        )
 
-            # 約定データが取得できなかった場合
-            if len(raw_data) == 0:
-                if len(out_df) == 0:
-                    # 出力用DataFrameがまだ作成されていない場合は処理を終了
-                    return pd.DataFrame()
-                else:
-                    # 出力用DataFrameが作成されている場合は加工処理へ
-                    break
-
-            # DataFrameを作成
-            df = pd.DataFrame(raw_data)
-            merge_df = pd.merge(out_df, df, on="timestamp")
-
-            # 約定データがすべて取得済の場合
-            if len(merge_df) == len(df):
-                if len(out_df) == 0:
-                    # 出力用DataFrameがまだ作成されていない場合は処理を終了
-                    return pd.DataFrame()
-                else:
-                    # 出力用DataFrameが作成されている場合は加工処理へ
-                    break
+        # 確定済の時間のみキャッシュに保存(約定がなかった時間も空のDataFrameとして保存し、再取得しない)
+        if self.cache is not None and end_timestamp <= time.time():
+            self.cache.put("executions", currency_name, cache_key, out_df)
+
+        return out_df
+
+    def get_executions_range(self, currency_name, start, end, window_seconds=DEFAULT_WINDOW_SECONDS,
+                             max_workers=DEFAULT_MAX_WORKERS):
+        """
+        指定期間の約定履歴を取得
+        :param currency_name: 通貨名
+        :param start: 開始日時(datetimeもしくはUNIX時間)
+        :param end: 終了日時(datetimeもしくはUNIX時間、この時刻は含まない)
+        :param window_seconds: 並行取得する1ウィンドウあたりの秒数
+        :param max_workers: 同時に取得するウィンドウ数
+        """
+        import pandas as pd
+        from .parser import parse_executions
+
+        start_timestamp = to_timestamp(start)
+        end_timestamp = to_timestamp(end)
+
+        # URLは全ページで共通のため先に作成する
+        base_url = set_url(access_type="executions", currency_name=currency_name, endpoint=self.endpoint)
+
+        def fetch_page(timestamp):
+            raw_data, _ = self.get_executions_raw(currency_name, timestamp, base_url=base_url)
+            return raw_data
 
-            target_timestamp = df.tail(1)["timestamp"].values[0]  # 最後のレコードのtimestampを次の取得地点とする
-            target_timestamp = float(target_timestamp)  # whileで比較するためにfloatに変換
+        records = fetch_executions(
+            fetch_page, start_timestamp, end_timestamp, window_seconds=window_seconds, max_workers=max_workers
+        )
+
+        # 約定データが取得できなかった場合
+        if len(records) == 0:
+            return pd.DataFrame()
 
-            out_df = pd.concat([out_df, df], axis=0)
+        if self.tick_store is not None:
+            self.tick_store.append_executions(currency_name, records)
 
-        # 出力用に加工
-        out_df = out_df.loc[out_df["timestamp"] < str(end_timestamp)]  # 終了timestampより前のレコードのみ取得
-        out_df["timestamp"] = out_df["timestamp"].apply(timestamp2datetime)  # UNIX時間を変換
-        out_df = out_df.drop_duplicates(subset="id")  # idで重複削除
-        out_df = out_df.reset_index(drop=True)  # indexを削除
+        # 全ページ取得後に1度だけDataFrameを作成
+        out_df = parse_executions(records)
         out_df = out_df.drop(["created_at", "id"], axis=1)  # 不要な列を削除
 
         return out_df
+
+    def iter_executions(self, currency_name, start, end):
+        """
+        指定期間の約定履歴をページごとに取得するジェネレータ。
+        取得したページはすぐに返すため、期間が長くてもメモリ使用量は1ページ分で一定になる。
+        :param currency_name: 通貨名
+        :param start: 開始日時(datetimeもしくはUNIX時間)
+        :param end: 終了日時(datetimeもしくはUNIX時間、この時刻は含まない)
+        :return: get_executionsと同じ列を持つDataFrame(1ページ分)
+        """
+        from .parser import parse_executions
+
+        start_timestamp = to_timestamp(start)
+        end_timestamp = to_timestamp(end)
+        base_url = set_url(access_type="executions", currency_name=currency_name, endpoint=self.endpoint)
+
+        def fetch_page(timestamp):
+            raw_data, _ = self.get_executions_raw(currency_name, timestamp, base_url=base_url)
+            return raw_data
+
+        for page in iter_execution_pages(fetch_page, start_timestamp, end_timestamp):
+            if self.tick_store is not None:
+                self.tick_store.append_executions(currency_name, page)
+            page_df = parse_executions(page)
+            yield page_df.drop(["created_at", "id"], axis=1)
+
+    def get_candlestick_from_executions(self, currency_name, start, end, resolution, fill_empty=False,
+                                        window_seconds=DEFAULT_WINDOW_SECONDS, max_workers=DEFAULT_MAX_WORKERS):
+        """
+        約定履歴から任意の長さのローソク足を作成する。
+        ohlcエンドポイントが対応していない足の長さ(秒足など)や、ohlcで取得できない過去の期間にも使用できる
+        :param currency_name: 通貨名
+        :param start: 開始日時(datetimeもしくはUNIX時間)
+        :param end: 終了日時(datetimeもしくはUNIX時間、この時刻は含まない)
+        :param resolution: 足の長さ(秒数、もしくは1min・10s・2hour・1dayなどの文字列)
+        :param fill_empty: Trueの場合は約定がなかった時間の足を前の終値で埋める
+        :param window_seconds: 並行取得する1ウィンドウあたりの秒数
+        :param max_workers: 同時に取得するウィンドウ数
+        :return: datetime, open, high, low, close, volume, vwap, countのDataFrame
+        """
+        import pandas as pd
+        from .candles import aggregate_candlestick
+
+        execution_df = self.get_executions_range(
+            currency_name, start, end, window_seconds=window_seconds, max_workers=max_workers
+        )
+        if len(execution_df) == 0:
+            return pd.DataFrame()
+
+        return aggregate_candlestick(execution_df, resolution, fill_empty=fill_empty)
+
+    def save_executions(self, currency_name, start, end, path):
+        """
+        指定期間の約定履歴をページごとにCSVファイルへ追記する
+        :param currency_name: 通貨名
+        :param start: 開始日時(datetimeもしくはUNIX時間)
+        :param end: 終了日時(datetimeもしくはUNIX時間、この時刻は含まない)
+        :param path: 出力先のCSVファイル
+        :return: 書き込んだ約定数
+        """
+        row_num = 0
+        with open(path, "w", newline="") as f:
+            for page_df in self.iter_executions(currency_name, start, end):
+                # 最初のページのみヘッダを出力
+                page_df.to_csv(f, header=(row_num == 0), index=False)
+                row_num += len(page_df)
+
+        return row_num
+
+
+def _covers_date(datetimes, target_date, target_date_next, candle_type):
+    """
+    ローソク足の時刻の列が指定日付の最初の足から最後の足までを含むか
+    :param datetimes: 時刻順のdatetime64のSeries
+    :param target_date: 指定日付の0時
+    :param target_date_next: 翌日の0時
+    :param candle_type: ローソク足の種類
+    """
+    from .candles import parse_resolution
+
+    if len(datetimes) == 0:
+        return False
+    last_start = target_date_next - datetime.timedelta(seconds=parse_resolution(candle_type))
+    return datetimes.iloc[0] <= target_date and datetimes.iloc[-1] >= last_start
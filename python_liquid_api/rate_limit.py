@@ -0,0 +1,111 @@
+import threading
+import time
+
+# 定数
+# Liquidの制限は5分あたり300リクエスト(1秒あたり1リクエスト)
+DEFAULT_REQUESTS_PER_SECOND = 1.0
+DEFAULT_BURST = 30
+
+
+class RateLimiter:
+    def __init__(self, requests_per_second, burst=1):
+        """
+        トークンバケット方式のレートリミッタ(スレッドセーフ)
+        :param requests_per_second: 1秒あたりに補充するトークン数(平均リクエスト数)
+        :param burst: バケットの容量(連続して送信できる最大リクエスト数)
+        """
+        if requests_per_second <= 0:
+            raise ValueError("requests_per_secondには正の値を指定してください。")
+        if burst < 1:
+            raise ValueError("burstには1以上を指定してください。")
+
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self._tokens = float(burst)
+        self._last_time = time.monotonic()
+        self._lock = threading.Lock()
+
+        # 計測値
+        self.requests = 0
+        self.throttled_requests = 0
+        self.total_wait_time = 0.0
+        self.max_wait_time = 0.0
+
+    def acquire(self):
+        """
+        トークンを1つ消費する。トークンがない場合は補充されるまで待機する
+        :return: 待機した秒数
+        """
+        with self._lock:
+            now = time.monotonic()
+            # 経過時間分のトークンを補充
+            self._tokens = min(self.burst, self._tokens + (now - self._last_time) * self.requests_per_second)
+            self._last_time = now
+
+            # 先にトークンを予約し、不足分は待機時間に換算する
+            self._tokens -= 1.0
+            wait_time = 0.0
+            if self._tokens < 0:
+                wait_time = -self._tokens / self.requests_per_second
+
+            self.requests += 1
+            if wait_time > 0:
+                self.throttled_requests += 1
+                self.total_wait_time += wait_time
+                self.max_wait_time = max(self.max_wait_time, wait_time)
+
+        if wait_time > 0:
+            time.sleep(wait_time)
+        return wait_time
+
+    def metrics(self):
+        """
+        キュー待ち時間などの計測値
+        """
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "throttled_requests": self.throttled_requests,
+                "total_wait_time": self.total_wait_time,
+                "max_wait_time": self.max_wait_time,
+                "mean_wait_time": self.total_wait_time / self.requests if self.requests > 0 else 0.0,
+            }
+
+
+# プロセス内の全クライアントで共有するレートリミッタ
+_rate_limiters = {
+    "public": RateLimiter(DEFAULT_REQUESTS_PER_SECOND, DEFAULT_BURST),
+    "private": RateLimiter(DEFAULT_REQUESTS_PER_SECOND, DEFAULT_BURST),
+}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(group):
+    """
+    共有レートリミッタを取得
+    :param group: public/private
+    :return: RateLimiter(制限を無効にしている場合はNone)
+    """
+    return _rate_limiters.get(group)
+
+
+def configure_rate_limit(group, requests_per_second, burst=DEFAULT_BURST):
+    """
+    共有レートリミッタの設定を変更
+    :param group: public/private
+    :param requests_per_second: 1秒あたりの平均リクエスト数(Noneを指定すると制限しない)
+    :param burst: 連続して送信できる最大リクエスト数
+    """
+    with _rate_limiters_lock:
+        if requests_per_second is None:
+            _rate_limiters[group] = None
+        else:
+            _rate_limiters[group] = RateLimiter(requests_per_second, burst)
+
+
+def get_rate_limit_metrics():
+    """
+    共有レートリミッタの計測値
+    :return: {グループ名: 計測値の辞書}
+    """
+    return {group: limiter.metrics() for group, limiter in _rate_limiters.items() if limiter is not None}
@@ -0,0 +1,228 @@
+import email.utils
+import random
+import threading
+import time
+
+from .coalesce import get_coalescer
+from .instrumentation import get_instrumentation
+from .rate_limit import get_rate_limiter
+
+# 定数
+DEFAULT_ENDPOINT = "https://api.liquid.com/"
+DEFAULT_TIMEOUT = 10.0
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 10
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF_BASE = 0.5
+DEFAULT_BACKOFF_MAX = 30.0
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+# 5xxの場合に再送してよいメソッド(注文作成のPOSTは二重発注を避けるため429のみ再送する)
+IDEMPOTENT_METHODS = {"GET", "PUT", "DELETE", "HEAD"}
+
+
+class LiquidSession:
+    def __init__(self, session=None, timeout=DEFAULT_TIMEOUT, pool_connections=DEFAULT_POOL_CONNECTIONS,
+                 pool_maxsize=DEFAULT_POOL_MAXSIZE, pool_block=False, keep_alive=True, adapters=None,
+                 rate_limiter=None, max_retries=DEFAULT_MAX_RETRIES, backoff_base=DEFAULT_BACKOFF_BASE,
+                 backoff_max=DEFAULT_BACKOFF_MAX, coalescer=None):
+        """
+        コネクションプールを保持するHTTPセッション
+        :param session: 外部で作成したrequests.Session(テスト用のスタブなどを差し込む場合に指定)
+        :param timeout: タイムアウト秒数。(接続, 読込)のタプルも指定可能
+        :param pool_connections: ホストごとにキャッシュするプール数
+        :param pool_maxsize: 1プールあたりの最大コネクション数
+        :param pool_block: プールが埋まっている場合に空きを待つかどうか
+        :param keep_alive: Falseの場合はリクエストごとにコネクションを切断する
+        :param adapters: {プレフィックス: トランスポートアダプタ}の辞書
+        :param rate_limiter: 送信前にacquire()を呼び出すレートリミッタ(省略時はpublic/privateの共有レートリミッタ)
+        :param max_retries: 429/5xxの場合に再送する最大回数
+        :param backoff_base: 再送までの待機時間の基準秒数
+        :param backoff_max: 再送までの最大待機秒数
+        :param coalescer: Public APIのGETリクエストをまとめるRequestCoalescer(省略時はenable_coalescingで有効にしたもの)
+        """
+        self.timeout = timeout
+        self.keep_alive = keep_alive
+        self.rate_limiter = rate_limiter
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.coalescer = coalescer
+
+        # 計測値
+        self.retries = 0
+        self.throttled_responses = 0
+        self._metrics_lock = threading.Lock()
+        # 外部から渡されたセッションは呼び出し元が管理する
+        self._owns_session = session is None
+
+        if session is None:
+            # requestsはセッションを作成するときに読み込む(パッケージの読み込みを速くするため)
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=pool_connections,
+                pool_maxsize=pool_maxsize,
+                pool_block=pool_block
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+
+        if adapters is not None:
+            for prefix, adapter in adapters.items():
+                session.mount(prefix, adapter)
+
+        if not keep_alive:
+            session.headers["Connection"] = "close"
+
+        self.session = session
+
+    def request(self, method, url, headers=None, data=None, timeout=None, rate_limit_group=None):
+        """
+        HTTPリクエストを送信する。
+        429/5xxの場合はRetry-Afterもしくはジッター付きの指数バックオフで待機して再送する。
+        Public APIのGETリクエストは、RequestCoalescerが有効な場合は同じURLへの実行中のリクエストとレスポンスを共有する。
+        :param method: GET/POST/PUTなどのHTTPメソッド
+        :param url: 送信先URL
+        :param headers: リクエストヘッダ。再送時に作り直す場合はヘッダを返す関数を指定する
+        :param data: 送信データ
+        :param timeout: このリクエストのみに適用するタイムアウト秒数
+        :param rate_limit_group: 共有レートリミッタのグループ(public/private)
+        :return: requests.Response
+        """
+        if timeout is None:
+            timeout = self.timeout
+
+        if method == "GET" and rate_limit_group == "public":
+            coalescer = self.coalescer if self.coalescer is not None else get_coalescer()
+            if coalescer is not None:
+                return coalescer.fetch(
+                    url, lambda: self._send(method, url, headers, data, timeout, rate_limit_group)
+                )
+
+        return self._send(method, url, headers, data, timeout, rate_limit_group)
+
+    def _send(self, method, url, headers, data, timeout, rate_limit_group):
+        rate_limiter = self.rate_limiter
+        if rate_limiter is None and rate_limit_group is not None:
+            rate_limiter = get_rate_limiter(rate_limit_group)
+
+        # 計測が無効の場合はNoneの判定のみ
+        instrumentation = get_instrumentation()
+        if instrumentation is not None:
+            start_time = time.perf_counter()
+        rate_limit_wait = 0.0
+
+        attempt = 0
+        while True:
+            if rate_limiter is not None:
+                rate_limit_wait += rate_limiter.acquire()
+
+            if instrumentation is not None:
+                instrumentation.before_request(method, url, attempt)
+
+            request_headers = headers() if callable(headers) else headers
+            try:
+                response = self.session.request(
+                    method=method, url=url, headers=request_headers, data=data, timeout=timeout
+                )
+            except Exception as e:
+                # タイムアウト・切断などでレスポンスを受信できなかった場合も計測値に含める
+                if instrumentation is not None:
+                    instrumentation.request_failed(method, url, e, start_time, time.perf_counter(),
+                                                   attempt, rate_limit_wait)
+                raise
+
+            if not self._should_retry(method, response.status_code, attempt):
+                if instrumentation is not None:
+                    instrumentation.after_request(method, url, response, start_time, time.perf_counter(),
+                                                  attempt, rate_limit_wait)
+                return response
+
+            with self._metrics_lock:
+                self.retries += 1
+                if response.status_code == 429:
+                    self.throttled_responses += 1
+
+            time.sleep(self._retry_wait_time(response, attempt))
+            attempt += 1
+
+    def _should_retry(self, method, status_code, attempt):
+        if attempt >= self.max_retries or status_code not in RETRY_STATUS_CODES:
+            return False
+        # 429はサーバが処理していないため、どのメソッドでも再送できる
+        return status_code == 429 or method.upper() in IDEMPOTENT_METHODS
+
+    def _retry_wait_time(self, response, attempt):
+        # Retry-Afterが指定されている場合はそれに従う
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+
+        # フルジッター付きの指数バックオフ
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def metrics(self):
+        """
+        再送回数などの計測値
+        """
+        with self._metrics_lock:
+            return {
+                "retries": self.retries,
+                "throttled_responses": self.throttled_responses,
+            }
+
+    def get(self, url, headers=None, timeout=None, rate_limit_group=None):
+        return self.request("GET", url, headers=headers, timeout=timeout, rate_limit_group=rate_limit_group)
+
+    def post(self, url, headers=None, data=None, timeout=None, rate_limit_group=None):
+        return self.request("POST", url, headers=headers, data=data, timeout=timeout,
+                            rate_limit_group=rate_limit_group)
+
+    def put(self, url, headers=None, data=None, timeout=None, rate_limit_group=None):
+        return self.request("PUT", url, headers=headers, data=data, timeout=timeout,
+                            rate_limit_group=rate_limit_group)
+
+    def close(self):
+        """
+        保持しているコネクションを解放する
+        """
+        if self._owns_session:
+            self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def make_session(session=None, **kwargs):
+    """
+    LiquidSessionを作成する。
+    LiquidSessionが渡された場合はそのまま返す。
+    """
+    if isinstance(session, LiquidSession):
+        return session
+    return LiquidSession(session=session, **kwargs)
+
+
+def parse_retry_after(value):
+    """
+    Retry-Afterヘッダ(秒数もしくはHTTP日付)を待機秒数に変換する
+    """
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        retry_datetime = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_datetime is None:
+        return None
+    return max(0.0, retry_datetime.timestamp() - time.time())
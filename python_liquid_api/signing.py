@@ -0,0 +1,102 @@
+import base64
+import hashlib
+import hmac
+import json
+import threading
+import time
+
+# 定数
+SIGNING_BACKENDS = ["hmac", "pyjwt"]
+NONCE_STEP = 1e-6  # 同じ時刻に署名した場合のnonceの増分(秒)
+JWT_HEADER = {"alg": "HS256", "typ": "JWT"}
+
+
+def _base64url(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+class RequestSigner:
+    def __init__(self, token_id, secret_key, backend="hmac"):
+        """
+        Private APIのリクエストに付けるJWT(HS256)を作成する
+        :param token_id: トークンID
+        :param secret_key: APIトークン秘密鍵
+        :param backend: 署名の実装
+        - hmac: ヘッダ部分とHMACの鍵の状態を事前に計算しておく高速な実装(デフォルト)
+        - pyjwt: PyJWTのjwt.encodeを使用する
+        """
+        if backend not in SIGNING_BACKENDS:
+            raise ValueError("backendにはhmacもしくはpyjwtを指定してください。")
+
+        self.token_id = token_id
+        self.backend = backend
+        self._secret_key = secret_key
+
+        # 署名ごとに変わらない部分を事前に計算する
+        header_json = json.dumps(JWT_HEADER, separators=(",", ":")).encode()
+        self._encoded_header = _base64url(header_json) + b"."
+        key = secret_key.encode() if isinstance(secret_key, str) else secret_key
+        self._hmac_template = hmac.new(key, digestmod=hashlib.sha256)
+
+        self._last_nonce = 0.0
+        self._nonce_lock = threading.Lock()
+
+        # 計測値
+        self.sign_count = 0
+        self.total_sign_time = 0.0
+        self.max_sign_time = 0.0
+        self._metrics_lock = threading.Lock()
+
+    def next_nonce(self):
+        """
+        スレッド・asyncioのタスク間で必ず増加するnonce(UNIX時間)を取得する
+        """
+        with self._nonce_lock:
+            nonce = max(time.time(), self._last_nonce + NONCE_STEP)
+            self._last_nonce = nonce
+        return nonce
+
+    def sign(self, path):
+        """
+        パスに対する署名を作成する
+        :param path: リクエストのパス(クエリを含む)
+        :return: JWT文字列
+        """
+        start = time.perf_counter()
+
+        payload_data = {
+            "path": path,
+            "nonce": self.next_nonce(),
+            "token_id": self.token_id
+        }
+        if self.backend == "pyjwt":
+            import jwt
+            signature = jwt.encode(payload_data, self._secret_key, algorithm="HS256")
+        else:
+            payload_json = json.dumps(payload_data, separators=(",", ":")).encode()
+            signing_input = self._encoded_header + _base64url(payload_json)
+
+            # 鍵を処理済のHMACの状態を複製して使う
+            mac = self._hmac_template.copy()
+            mac.update(signing_input)
+            signature = (signing_input + b"." + _base64url(mac.digest())).decode()
+
+        elapsed = time.perf_counter() - start
+        with self._metrics_lock:
+            self.sign_count += 1
+            self.total_sign_time += elapsed
+            self.max_sign_time = max(self.max_sign_time, elapsed)
+
+        return signature
+
+    def metrics(self):
+        """
+        署名にかかった時間の計測値(秒)
+        """
+        with self._metrics_lock:
+            return {
+                "sign_count": self.sign_count,
+                "total_sign_time": self.total_sign_time,
+                "max_sign_time": self.max_sign_time,
+                "mean_sign_time": self.total_sign_time / self.sign_count if self.sign_count > 0 else 0.0,
+            }
@@ -0,0 +1,264 @@
+import json
+import random
+import threading
+import time
+
+from .order_book import OrderBook
+from .parameter_dict import ParameterDict
+from .products import get_product_catalog
+
+# 定数
+DEFAULT_STREAM_URL = "wss://tap.liquid.com/app/LiquidTapClient"
+EXECUTION_CHANNEL = "executions_cash_{pair}"
+PRICE_LADDER_CHANNEL = "price_ladders_cash_{pair}_{side}"
+DEFAULT_STREAM_TIMEOUT = 30.0  # この秒数メッセージが届かない場合はpingを送る
+DEFAULT_RECONNECT_BASE = 0.5
+DEFAULT_RECONNECT_MAX = 30.0
+
+
+def _import_websocket():
+    try:
+        import websocket
+    except ImportError:
+        raise ImportError("ストリーミングにはwebsocket-clientが必要です。"
+                          "pip install python-liquid-api-tths[stream] でインストールしてください。")
+    return websocket
+
+
+def _pusher_message(event, data):
+    return json.dumps({"event": event, "data": data})
+
+
+class LiquidStream:
+    def __init__(self, url=DEFAULT_STREAM_URL, timeout=DEFAULT_STREAM_TIMEOUT,
+                 reconnect_base=DEFAULT_RECONNECT_BASE, reconnect_max=DEFAULT_RECONNECT_MAX):
+        """
+        Liquid Tap(Pusherプロトコル)から約定・板情報を受信するストリーミングクライアント。
+        切断された場合はジッター付きの指数バックオフで再接続し、購読していたチャンネルを再購読する。
+        :param url: 接続先のURL(テスト用のスタブサーバを指定する場合など)
+        :param timeout: 受信のタイムアウト秒数。タイムアウトした場合はpingを送って接続を確認する
+        :param reconnect_base: 再接続の待機秒数の基準値
+        :param reconnect_max: 再接続の待機秒数の上限
+        """
+        self.url = url
+        self.timeout = timeout
+        self.reconnect_base = reconnect_base
+        self.reconnect_max = reconnect_max
+        self.parameter_dict = ParameterDict()
+
+        self.order_books = {}
+        self._handlers = {}  # {チャンネル名: 受信したデータを処理する関数}
+        self._ws = None
+        self._thread = None
+        self._stop_event = threading.Event()
+        self._established = False
+        self._lock = threading.Lock()
+
+        # 計測値
+        self.message_count = 0
+        self.reconnect_count = 0
+        self.handler_error_count = 0  # コールバックで発生した例外の数
+        self.decode_error_count = 0  # 解析できなかったメッセージの数(再接続する)
+        self.last_error = None
+
+    def _channel_pair(self, currency_name):
+        # チャンネル名は通貨ペアのコードの小文字(btcjpy, ethbtcなど)
+        return get_product_catalog().get(currency_name)["currency_pair_code"].lower()
+
+    def _subscribe(self, channel, handler):
+        with self._lock:
+            self._handlers[channel] = handler
+            ws = self._ws
+        # 接続中の場合はすぐに購読する(未接続の場合は接続時にまとめて購読する)
+        if ws is not None:
+            try:
+                ws.send(_pusher_message("pusher:subscribe", {"channel": channel}))
+            except Exception:
+                # 送信に失敗した場合は再接続時に購読される
+                pass
+
+    def subscribe_executions(self, currency_name, callback):
+        """
+        約定を購読する
+        :param currency_name: 通貨名
+        :param callback: callback(currency_name, df)。dfはget_executionsと同じ列を持つDataFrame
+        """
+        from .parser import parse_executions
+
+        channel = EXECUTION_CHANNEL.format(pair=self._channel_pair(currency_name))
+
+        def handle(event, data):
+            if event != "created":
+                return
+            records = data if isinstance(data, list) else [data]
+            execution_df = parse_executions(records).drop(["created_at", "id"], axis=1)
+            callback(currency_name, execution_df)
+
+        self._subscribe(channel, handle)
+
+    def subscribe_order_book(self, currency_name, callback=None, order_book=None):
+        """
+        板情報を購読する。受信した価格帯でOrderBookを更新する
+        :param currency_name: 通貨名
+        :param callback: callback(currency_name, order_book, diff)。diffはOrderBook.updateの返り値
+        :param order_book: 更新するOrderBook(省略時は新規に作成)
+        :return: 更新されるOrderBook
+        """
+        pair = self._channel_pair(currency_name)
+        if order_book is None:
+            order_book = OrderBook(currency_name)
+        self.order_books[currency_name] = order_book
+
+        def make_handler(side):
+            def handle(event, data):
+                if event != "updated":
+                    return
+                if side == "buy":
+                    diff = order_book.update_levels(buy_price_levels=data, timestamp=time.time())
+                else:
+                    diff = order_book.update_levels(sell_price_levels=data, timestamp=time.time())
+                if callback is not None:
+                    callback(currency_name, order_book, diff)
+            return handle
+
+        for side in self.parameter_dict.side_list:
+            self._subscribe(PRICE_LADDER_CHANNEL.format(pair=pair, side=side), make_handler(side))
+
+        return order_book
+
+    def _connect(self, websocket):
+        ws = websocket.create_connection(self.url, timeout=self.timeout)
+        with self._lock:
+            self._ws = ws
+            channels = list(self._handlers)
+        for channel in channels:
+            ws.send(_pusher_message("pusher:subscribe", {"channel": channel}))
+        return ws
+
+    def _decode(self, raw_message):
+        try:
+            return json.loads(raw_message)
+        except ValueError as e:
+            # 不正なフレームを受信した場合は接続をやり直す
+            self.decode_error_count += 1
+            self.last_error = e
+            raise ConnectionError("受信したメッセージを解析できません。") from e
+
+    def _dispatch(self, raw_message):
+        message = self._decode(raw_message)
+        event = message.get("event")
+        if event == "pusher:connection_established":
+            self._established = True
+            return
+        if event == "pusher:ping":
+            self._ws.send(_pusher_message("pusher:pong", {}))
+            return
+        if event == "pusher:error":
+            raise ConnectionError(message.get("data"))
+        if event is None or event.startswith("pusher"):
+            # 購読完了などのプロトコルのイベント
+            return
+
+        handler = self._handlers.get(message.get("channel"))
+        if handler is None:
+            return
+
+        # Pusherのdataは2重にエンコードされたJSON文字列
+        data = message.get("data")
+        if isinstance(data, str):
+            data = self._decode(data)
+        self.message_count += 1
+        try:
+            handler(event, data)
+        except Exception as e:
+            # コールバックの例外で受信を止めないよう記録のみ行う
+            self.handler_error_count += 1
+            self.last_error = e
+
+    def _receive(self, websocket, ws):
+        while not self._stop_event.is_set():
+            try:
+                raw_message = ws.recv()
+            except websocket.WebSocketTimeoutException:
+                # 受信がない場合はpingで接続を確認する(切断されていれば例外で再接続する)
+                ws.send(_pusher_message("pusher:ping", {}))
+                continue
+            if not raw_message:
+                # サーバから切断された場合
+                return
+            self._dispatch(raw_message)
+
+    def run_forever(self):
+        """
+        stopが呼ばれるまで受信を続ける(呼び出したスレッドをブロックする)
+        """
+        websocket = _import_websocket()
+        attempt = 0
+        while not self._stop_event.is_set():
+            self._established = False
+            try:
+                ws = self._connect(websocket)
+                self._receive(websocket, ws)
+            except (websocket.WebSocketException, ConnectionError, OSError):
+                pass
+            finally:
+                with self._lock:
+                    ws, self._ws = self._ws, None
+                if ws is not None:
+                    ws.close()
+
+            if self._stop_event.is_set():
+                break
+            # 接続が確立していた場合は待機時間を初期値に戻す
+            if self._established:
+                attempt = 0
+
+            # フルジッター付きの指数バックオフで再接続
+            self.reconnect_count += 1
+            self._stop_event.wait(random.uniform(0, min(self.reconnect_max, self.reconnect_base * (2 ** attempt))))
+            attempt += 1
+
+    def start(self):
+        """
+        別スレッドで受信を開始する
+        """
+        _import_websocket()
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self.run_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        受信を停止して切断する
+        """
+        self._stop_event.set()
+        with self._lock:
+            ws = self._ws
+        if ws is not None:
+            # 受信中のスレッドを止めるためソケットを直接閉じる
+            ws.abort()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    @property
+    def connected(self):
+        return self._ws is not None
+
+    def metrics(self):
+        """
+        受信したメッセージ数・再接続回数・コールバックの例外の数・解析できなかったメッセージの数
+        """
+        return {
+            "messages": self.message_count,
+            "reconnects": self.reconnect_count,
+            "handler_errors": self.handler_error_count,
+            "decode_errors": self.decode_error_count,
+        }
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
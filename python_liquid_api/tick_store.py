@@ -0,0 +1,353 @@
+import os
+import threading
+import time
+import warnings
+
+import numpy as np
+
+from .utils import to_timestamp
+
+# 定数
+DEFAULT_INDEX_INTERVAL = 1024  # 疎なインデックスに登録するレコードの間隔
+# 約定のレコード(33バイト固定長)。sideは0: buy, 1: sell
+EXECUTION_DTYPE = np.dtype([
+    ("timestamp", "<f8"), ("price", "<f8"), ("quantity", "<f8"), ("id", "<i8"), ("side", "i1"),
+])
+# ローソク足のレコード(48バイト固定長)。timestampは足の開始時刻
+CANDLE_DTYPE = np.dtype([
+    ("timestamp", "<f8"), ("open", "<f8"), ("high", "<f8"), ("low", "<f8"), ("close", "<f8"), ("volume", "<f8"),
+])
+SIDE_CODES = {"buy": 0, "sell": 1}
+DATA_EXTENSION = ".bin"
+INDEX_EXTENSION = ".idx"
+
+
+class TickFile:
+    def __init__(self, path, dtype, index_interval=DEFAULT_INDEX_INTERVAL):
+        """
+        時刻順の固定長レコードを追記していくメモリマップファイル。
+        index_interval件ごとの時刻を疎なインデックス(path.idx)に保存し、時刻の範囲を二分探索で求める
+        :param path: データファイルのパス(拡張子を除く)
+        :param dtype: レコードの型(先頭の項目はtimestamp)
+        :param index_interval: インデックスに登録するレコードの間隔
+        """
+        if index_interval < 1:
+            raise ValueError("index_intervalには1以上を指定してください。")
+
+        self.data_path = path + DATA_EXTENSION
+        self.index_path = path + INDEX_EXTENSION
+        self.dtype = dtype
+        self.index_interval = index_interval
+
+        self._lock = threading.Lock()
+        self._data = None  # 追記するたびに作り直す
+        os.makedirs(os.path.dirname(self.data_path), exist_ok=True)
+
+        size = os.path.getsize(self.data_path) if os.path.exists(self.data_path) else 0
+        # 書き込み途中で終了した場合の半端なレコードは切り捨てる
+        if size % dtype.itemsize != 0:
+            with open(self.data_path, "r+b") as f:
+                f.truncate(size - size % dtype.itemsize)
+        self._count = size // dtype.itemsize
+        self._index = self._load_index()
+
+    def _load_index(self):
+        expected_num = -(-self._count // self.index_interval)
+        if os.path.exists(self.index_path):
+            index = np.fromfile(self.index_path, dtype=np.float64)
+            if len(index) == expected_num:
+                return index
+
+        # インデックスがデータと一致しない場合は作り直す
+        index = np.array(self._view()["timestamp"][::self.index_interval], dtype=np.float64)
+        index.tofile(self.index_path)
+        return index
+
+    def _view(self):
+        """
+        全レコードのメモリマップ(読み込み専用)
+        """
+        data = self._data
+        if data is None:
+            if self._count == 0:
+                data = np.empty(0, dtype=self.dtype)
+            else:
+                data = np.memmap(self.data_path, dtype=self.dtype, mode="r", shape=(self._count,))
+            self._data = data
+        return data
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def last(self):
+        """
+        最後のレコード(レコードがない場合はNone)
+        """
+        if self._count == 0:
+            return None
+        return self._view()[-1]
+
+    def _search(self, timestamp):
+        """
+        timestamp以上となる最初のレコードの位置
+        """
+        index = self._index
+        # インデックスでブロックを絞り込み、ブロック内のみをメモリマップ上で二分探索する
+        block = int(np.searchsorted(index, timestamp, side="left"))
+        low = max(block - 1, 0) * self.index_interval
+        high = min(block * self.index_interval, self._count)
+        if high <= low:
+            return low
+        return low + int(np.searchsorted(self._view()["timestamp"][low:high], timestamp, side="left"))
+
+    def slice(self, start=None, end=None):
+        """
+        指定期間のレコードを取得する(コピーせずにメモリマップのビューを返す)
+        :param start: 開始日時(datetimeもしくはUNIX時間、省略時は先頭から)
+        :param end: 終了日時(datetimeもしくはUNIX時間、この時刻は含まない。省略時は末尾まで)
+        :return: 構造化配列のビュー
+        """
+        with self._lock:
+            data = self._view()
+            first = 0 if start is None else self._search(to_timestamp(start))
+            last = self._count if end is None else self._search(to_timestamp(end))
+        return data[first:max(first, last)]
+
+    def append(self, records):
+        """
+        レコードを追記する
+        :param records: dtypeの構造化配列(時刻順)
+        :return: 追記したレコード数
+        """
+        if len(records) == 0:
+            return 0
+        records = np.ascontiguousarray(records, dtype=self.dtype)
+
+        with self._lock:
+            if self._count > 0 and records["timestamp"][0] < self._view()["timestamp"][-1]:
+                raise ValueError("保存済のレコードより前の時刻のレコードは追記できません。")
+            self._write(records)
+        return len(records)
+
+    def append_new(self, records, is_new):
+        """
+        保存済の最後のレコードより後のレコードのみを追記する。
+        最後のレコードの確認と追記を同じロックの中で行うため、複数のスレッドから同時に呼び出してもよい
+        :param records: dtypeの構造化配列(時刻順)
+        :param is_new: is_new(records, last)。追記するレコードの真偽値の配列を返す関数(lastは最後のレコード)
+        :return: (追記したレコード数, 追記しなかったレコード)
+        """
+        records = np.ascontiguousarray(records, dtype=self.dtype)
+        with self._lock:
+            if self._count > 0:
+                mask = is_new(records, self._view()[-1])
+                skipped, records = records[~mask], records[mask]
+            else:
+                skipped = records[:0]
+            if len(records) > 0:
+                self._write(records)
+        return len(records), skipped
+
+    def _write(self, records):
+        with open(self.data_path, "ab") as f:
+            f.write(records.tobytes())
+
+        # インデックスの境界をまたいだレコードの時刻を追加する
+        first_position = -(-self._count // self.index_interval) * self.index_interval - self._count
+        new_index = np.array(records["timestamp"][first_position::self.index_interval], dtype=np.float64)
+        if len(new_index) > 0:
+            with open(self.index_path, "ab") as f:
+                f.write(new_index.tobytes())
+            self._index = np.concatenate([self._index, new_index])
+
+        self._count += len(records)
+        self._data = None
+
+    def stats(self):
+        """
+        レコード数・期間・ファイルサイズ
+        """
+        with self._lock:
+            data = self._view()
+            return {
+                "count": self._count,
+                "start": float(data["timestamp"][0]) if self._count > 0 else None,
+                "end": float(data["timestamp"][-1]) if self._count > 0 else None,
+                "bytes": self._count * self.dtype.itemsize,
+                "index_bytes": self._index.nbytes,
+            }
+
+
+def executions_to_records(records):
+    """
+    約定生データのリストをEXECUTION_DTYPEの構造化配列に変換する(時刻順に並べ替える)
+    :param records: 約定生データ(辞書)のリスト。数値は文字列でもよい
+    """
+    out = np.empty(len(records), dtype=EXECUTION_DTYPE)
+    out["timestamp"] = np.array([record["timestamp"] for record in records], dtype=np.float64)
+    out["price"] = np.array([record["price"] for record in records], dtype=np.float64)
+    out["quantity"] = np.array([record["quantity"] for record in records], dtype=np.float64)
+    out["id"] = np.fromiter((record["id"] for record in records), dtype=np.int64, count=len(records))
+    out["side"] = np.fromiter((SIDE_CODES[record["taker_side"]] for record in records), dtype=np.int8,
+                              count=len(records))
+    return out[np.lexsort((out["id"], out["timestamp"]))]
+
+
+def candlestick_to_records(raw_data):
+    """
+    ローソク足の生データをCANDLE_DTYPEの構造化配列に変換する(時刻順に並べ替える)
+    :param raw_data: [[UNIX時間, 始値, 高値, 低値, 終値, 出来高], ...]
+    """
+    values = np.asarray(raw_data, dtype=np.float64).reshape(-1, len(CANDLE_DTYPE.names))
+    values = values[np.argsort(values[:, 0], kind="stable")]
+    out = np.empty(len(values), dtype=CANDLE_DTYPE)
+    for i, name in enumerate(CANDLE_DTYPE.names):
+        out[name] = values[:, i]
+    return out
+
+
+class TickStore:
+    def __init__(self, directory, index_interval=DEFAULT_INDEX_INTERVAL):
+        """
+        通貨ごとの約定・ローソク足を固定長のバイナリで追記保存するストア。
+        ファイルはメモリマップで開くため、長期間のデータでも全体をメモリに読み込まずに期間を切り出せる
+        :param directory: 保存先ディレクトリ(通貨名/executions.bin, 通貨名/candlestick_1min.binなど)
+        :param index_interval: 疎なインデックスに登録するレコードの間隔
+        """
+        self.directory = directory
+        self.index_interval = index_interval
+        self._files = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _file(self, currency_name, name, dtype):
+        key = (currency_name, name)
+        with self._lock:
+            tick_file = self._files.get(key)
+            if tick_file is None:
+                path = os.path.join(self.directory, currency_name, name)
+                tick_file = TickFile(path, dtype, self.index_interval)
+                self._files[key] = tick_file
+        return tick_file
+
+    def executions_file(self, currency_name):
+        return self._file(currency_name, "executions", EXECUTION_DTYPE)
+
+    def candlestick_file(self, currency_name, candle_type):
+        return self._file(currency_name, "candlestick_" + candle_type, CANDLE_DTYPE)
+
+    @staticmethod
+    def _warn_backfill(tick_file, skipped, key, message):
+        """
+        追記しなかったレコードのうち保存されていないもの(保存済の期間より前の取得分)があれば警告する
+        """
+        if len(skipped) == 0:
+            return 0
+        timestamps = skipped["timestamp"]
+        stored = tick_file.slice(timestamps.min(), np.nextafter(timestamps.max(), np.inf))
+        missing_num = int(np.count_nonzero(~np.isin(skipped[key], stored[key])))
+        if missing_num > 0:
+            warnings.warn(message % missing_num)
+        return missing_num
+
+    def append_executions(self, currency_name, records):
+        """
+        約定を追記する。保存済の最後の約定以前(同じ時刻の場合はid以下)の約定は追記しない。
+        ファイルは時刻順の追記のみのため、保存済の期間より前の約定(後の期間を先に取得した場合など)は保存できず、警告を出す
+        :param currency_name: 通貨名
+        :param records: 約定生データ(辞書)のリストもしくはEXECUTION_DTYPEの構造化配列
+        :return: 追記した約定数
+        """
+        if len(records) == 0:
+            return 0
+        if not isinstance(records, np.ndarray):
+            records = executions_to_records(records)
+
+        def is_new(records, last):
+            return (records["timestamp"] > last["timestamp"]) | (
+                (records["timestamp"] == last["timestamp"]) & (records["id"] > last["id"])
+            )
+
+        tick_file = self.executions_file(currency_name)
+        appended, skipped = tick_file.append_new(records, is_new)
+        self._warn_backfill(tick_file, skipped, "id",
+                            "TickStoreは時刻順の追記のみのため、保存済の最後の約定より前の約定%d件を保存しませんでした。")
+        return appended
+
+    def append_candlestick(self, currency_name, candle_type, raw_data, now=None):
+        """
+        確定済のローソク足を追記する。保存済の最後の足以前の足と、終了時刻がnowより後の足は追記しない
+        :param currency_name: 通貨名
+        :param candle_type: ローソク足範囲(1min, 5min, 15min, 30min, 1hour)
+        :param raw_data: ローソク足の生データもしくはCANDLE_DTYPEの構造化配列
+        :param now: 現在のUNIX時間(省略時はtime.time())
+        :return: 追記した足の数
+        """
+        from .candles import parse_resolution
+
+        if len(raw_data) == 0:
+            return 0
+        records = raw_data if isinstance(raw_data, np.ndarray) else candlestick_to_records(raw_data)
+        now = time.time() if now is None else now
+
+        tick_file = self.candlestick_file(currency_name, candle_type)
+        records = records[records["timestamp"] + parse_resolution(candle_type) <= now]
+        appended, skipped = tick_file.append_new(records,
+                                                 lambda records, last: records["timestamp"] > last["timestamp"])
+        self._warn_backfill(tick_file, skipped, "timestamp",
+                            "TickStoreは時刻順の追記のみのため、保存済の最後の足より前の足%d本を保存しませんでした。")
+        return appended
+
+    def executions(self, currency_name, start=None, end=None):
+        """
+        指定期間の約定を取得する(メモリマップのビューを返すためコピーしない)
+        :param currency_name: 通貨名
+        :param start: 開始日時(datetimeもしくはUNIX時間)
+        :param end: 終了日時(datetimeもしくはUNIX時間、この時刻は含まない)
+        :return: timestamp, price, quantity, id, side(0: buy, 1: sell)の構造化配列
+        """
+        return self.executions_file(currency_name).slice(start, end)
+
+    def candlestick(self, currency_name, candle_type, start=None, end=None):
+        """
+        指定期間のローソク足を取得する(メモリマップのビューを返すためコピーしない)
+        :return: timestamp, open, high, low, close, volumeの構造化配列
+        """
+        return self.candlestick_file(currency_name, candle_type).slice(start, end)
+
+    def executions_dataframe(self, currency_name, start=None, end=None):
+        """
+        指定期間の約定をget_executionsと同じ列のDataFrameで取得する
+        :return: quantity, price(float64), taker_side(category), timestamp(datetime64)のDataFrame
+        """
+        import pandas as pd
+        from .parser import SIDE_CATEGORIES, timestamps_to_datetime
+
+        records = self.executions(currency_name, start, end)
+        return pd.DataFrame({
+            "quantity": np.array(records["quantity"]),
+            "price": np.array(records["price"]),
+            "taker_side": pd.Categorical.from_codes(records["side"], categories=SIDE_CATEGORIES),
+            "timestamp": timestamps_to_datetime(records["timestamp"]),
+        })
+
+    def candlestick_dataframe(self, currency_name, candle_type, start=None, end=None):
+        """
+        指定期間のローソク足をget_candlestick(is_index_datetime=False)と同じ列のDataFrameで取得する
+        """
+        import pandas as pd
+        from .parser import timestamps_to_datetime
+
+        records = self.candlestick(currency_name, candle_type, start, end)
+        output_df = pd.DataFrame({name: np.array(records[name]) for name in CANDLE_DTYPE.names[1:]})
+        output_df.insert(0, "datetime", timestamps_to_datetime(records["timestamp"]))
+        return output_df
+
+    def stats(self):
+        """
+        開いているファイルごとの統計情報 {(通貨名, 種類): {count, start, end, bytes, index_bytes}}
+        """
+        with self._lock:
+            files = dict(self._files)
+        return {key: tick_file.stats() for key, tick_file in files.items()}
@@ -1,17 +1,44 @@
+import datetime
+import time
+
+from .decoder import decode_response
+from .instrumentation import endpoint_name, get_instrumentation
+from .session import DEFAULT_ENDPOINT
+
 # 定数
 GOOD_CODE = "200"
 UNKNOWN_ERROR_CONT = "不明なエラーです。"
 
 
-def json_parse(request_result):
+class LiquidAPIError(Exception):
+    def __init__(self, message, status_code=None):
+        """
+        APIがエラーを返した場合の例外
+        :param message: エラー内容
+        :param status_code: HTTPステータスコード
+        """
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def json_parse(request_result, numeric_fields=None):
     """
     リクエスト結果のJSONデータをパースする。
     リクエストエラーがある場合は例外を起こす。
+    :param request_result: requests.Response
+    :param numeric_fields: floatに変換する項目名(Noneの場合は文字列のまま)
     """
     request_code = str(request_result.status_code)
     if request_code == GOOD_CODE:
-        # JSONデータをパース
-        return request_result.json()
+        # JSONデータをパース(本文のバイト列から直接デコードする)
+        instrumentation = get_instrumentation()
+        if instrumentation is None:
+            return decode_response(request_result, numeric_fields)
+
+        start = time.perf_counter()
+        parsed_data = decode_response(request_result, numeric_fields)
+        instrumentation.observe("json_decode_seconds", endpoint_name(request_result.url), time.perf_counter() - start)
+        return parsed_data
     else:
         # エラーコードに対応する文章を取得
         if request_code in ERROR_CODES:
@@ -21,22 +48,20 @@ def json_parse(request_result):
 
         # エラーコードと対応する文章を出力
         message = "Error Code:" + request_code + " Contents:" + error_contents
-        raise Exception(message)
+        raise LiquidAPIError(message, status_code=request_result.status_code)
 
 
 def url_add_currency(url, currency_name):
     """
-    URLに通貨IDを追加する
+    URLに通貨IDを追加する(通貨IDは使用中のProductCatalogから取得する)
     """
-    if currency_name in CURRENCY_ID:
-        url += CURRENCY_ID[currency_name]
-        return url
-    else:
-        raise ValueError("通貨名が不正です。")
+    from .products import get_product_catalog
 
+    return url + get_product_catalog().product_id(currency_name)
 
-def set_url(access_type, currency_name, resolution=None, max_data_num=1000):
-    url = "https://api.liquid.com/"
+
+def set_url(access_type, currency_name, resolution=None, max_data_num=1000, endpoint=DEFAULT_ENDPOINT):
+    url = endpoint
     if access_type == "ohlc":
         # ローソク足
         # https://api.liquid.com/products/{product_id}/ohlc?resolution={resolution}
@@ -56,6 +81,11 @@ def set_url(access_type, currency_name, resolution=None, max_data_num=1000):
         url = url_add_currency(url, currency_name)
         url += "/price_levels?full=0"
 
+    elif access_type == "products":
+        # 通貨ペアの一覧
+        # https://api.liquid.com/products
+        url += "products"
+
     elif access_type == "executions":
         # 約定情報
         # https://api.liquid.com/executions?product_id={product_id}&limit={limit}&page={page}
@@ -66,13 +96,25 @@ def set_url(access_type, currency_name, resolution=None, max_data_num=1000):
     return url
 
 
+def to_timestamp(value):
+    """
+    datetimeもしくはUNIX時間をUNIX時間(float)に変換する
+    """
+    if isinstance(value, datetime.datetime):
+        return value.timestamp()
+    return float(value)
+
+
 # エラーコードと出力文章の対応
 ERROR_CODES = {
     "404": "URLが存在しません。",
-    "414": "URLが長すぎます。"
+    "414": "URLが長すぎます。",
+    "429": "リクエスト数が上限を超えました。",
+    "500": "サーバ内部でエラーが発生しました。",
+    "503": "サービスが一時的に利用できません。",
 }
 
-# 通貨略称と通貨IDの対応
+# 通貨略称と通貨IDの対応(通貨ペアの一覧を取得しない場合に使用する)
 CURRENCY_ID = {
     "btc": "5",
     "eth": "29",
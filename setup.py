@@ -10,7 +10,7 @@ CONTENT_TYPE = "text/markdown"
 LICENSE = "MIT License"
 URL = "https://github.com/kitataku/python_liquid_api_tths"
 VERSION = python_liquid_api.__version__
-PYTHON_REQUIRES = ">=3.6"
+PYTHON_REQUIRES = ">=3.7"
 
 INSTALL_REQUIRES = [
     "PyJWT>=2.1.0",
@@ -19,6 +19,18 @@ INSTALL_REQUIRES = [
     "requests>=2.27.1",
 ]
 
+EXTRAS_REQUIRE = {
+    "cache": ["pyarrow>=6.0.0"],
+    "stream": ["websocket-client>=1.2.0"],
+    "fast": ["orjson>=3.6.0"],
+}
+
+ENTRY_POINTS = {
+    "console_scripts": [
+        "liquid-bulk-download=python_liquid_api.bulk:main",
+    ],
+}
+
 PACKAGES = [
     "python_liquid_api"
 ]
@@ -42,5 +54,7 @@ setup(
     version=VERSION,
     python_requires=PYTHON_REQUIRES,
     install_requires=INSTALL_REQUIRES,
+    extras_require=EXTRAS_REQUIRE,
+    entry_points=ENTRY_POINTS,
     packages=PACKAGES
 )